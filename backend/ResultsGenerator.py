@@ -4,10 +4,10 @@ import os
 import shutil
 from turtle import width
 from altair import Config
-from pandas import read_sql
 from backend.constants import CERTIFICATES_PATH, CLASS_TO_NUMBER, RESULTS_PATH
 from backend.data_processing import get_judge_labels
-from backend.sqlite_connections import SQliteConnectConnection, SQliteConnectCursor
+from backend.queries import fetch_all, fetch_column, fetch_one, read_dataframe
+from backend.report_manifest import ReportManifest, digest_of
 from datetime import datetime
 import PIL.Image
 import PIL.ImageFont
@@ -15,6 +15,9 @@ import PIL.ImageDraw
 from components.messages import show_arrow_message
 import logging
 from backend.config import CONFIG
+from numpy import ndarray
+from pandas import DataFrame
+from pandas.util import hash_pandas_object
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
@@ -29,34 +32,10 @@ class ResultsGenerator:
         self.certificateMaker = CertificateGenerator()
 
     def __get_distinct_category_from_participants(self) -> list[str]:
-        with SQliteConnectCursor() as cursor:
-            query = """
-            --sql
-            SELECT DISTINCT CATEGORY
-            FROM STUDENT, PARTICIPANT
-            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER 
-            AND PARTICIPANT.GRADE IS NOT NONE
-            ;
-            """
-            cursor.execute(query)
-            categories = [cat[0] for cat in cursor.fetchall()]
-        return categories
+        return fetch_column("judged_categories")
 
     def __get_distinct_events_from_category(self, category) -> list[str]:
-        with SQliteConnectCursor() as cursor:
-            query = """
-            --sql
-            SELECT DISTINCT EVENT_NAME
-            FROM STUDENT, PARTICIPANT
-            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-            AND STUDENT.CATEGORY = ?
-            AND PARTICIPANT.GRADE IS NOT NONE
-
-            ;
-            """
-            cursor.execute(query, (category,))
-            events = [event[0] for event in cursor.fetchall()]
-        return events
+        return fetch_column("judged_events_of_category", (category,))
 
     def __get_category_event_dictionary(self) -> dict[str, list[str]]:
         category_events = {
@@ -66,36 +45,24 @@ class ResultsGenerator:
         return category_events
 
     def __get_judge_labels_from_db(self):
-        with SQliteConnectCursor() as cursor:
-            query = """
-            --sql
-            SELECT NUMBER_OF_JUDGES 
-            FROM PARAMETER
-            ;
-            """
-            cursor.execute(query)
-            judge_no = cursor.fetchone()[0]
-            judge_labels = get_judge_labels(judge_no)
-        return judge_labels
-
-    def __create_event_report(self, conn, event: str, category: str):
-        query = f"""
-        --sql
-        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, TOTAL_MARKS, RANK
-        FROM STUDENT, PARTICIPANT
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        AND EVENT_NAME = ?
-        AND STUDENT.CATEGORY = ?
-        ORDER BY RANK DESC, CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
-        ;
-        """
-        data = read_sql(query, conn, params=(event, category))
+        judge_no = fetch_one("number_of_judges")[0]
+        return get_judge_labels(judge_no)
+
+    def __create_event_report(
+        self, event: str, category: str, results: DataFrame, rows: ndarray,
+        row_hashes: ndarray, manifest: ReportManifest,
+    ):
         event_report_path = (
             RESULTS_PATH
             + category
             + f"/{category.title()} - {event.title()} - Result.xlsx"
         )
+        digest = digest_of(event, list(results.columns), row_hashes[rows])
+        if not manifest.is_stale(event_report_path, digest):
+            return event_report_path
 
+        manifest.forget(event_report_path)
+        data = results.iloc[rows].drop(columns=["CATEGORY", "EVENT_NAME"])
         data.to_excel(
             excel_writer=event_report_path,
             sheet_name=event,
@@ -110,24 +77,25 @@ class ResultsGenerator:
             ],
             index=False,
         )
+        manifest.record(event_report_path, digest)
+        return event_report_path
 
-    def __create_judgement_sheets(self, conn, event: str, category: str):
-        query = f"""
-        --sql
-        SELECT '' AS CHESTNUMBER, STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, {self.judge_labels}, TOTAL_MARKS AS TOTAL, RANK
-        FROM STUDENT, PARTICIPANT
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        AND EVENT_NAME = ?
-        ORDER BY CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
-        ;
-        """
+    def __create_judgement_sheets(
+        self, event: str, category: str, judgement_sheets: DataFrame, rows: ndarray,
+        row_hashes: ndarray, manifest: ReportManifest,
+    ):
         judgement_sheet_path = (
             RESULTS_PATH
             + category
             + "/Judgement Sheets/"
             + f"{category.title()} - {event.title()} - Judgement Sheet.xlsx"
         )
-        data = read_sql(query, conn, params=(event,))
+        digest = digest_of(event, list(judgement_sheets.columns), row_hashes[rows])
+        if not manifest.is_stale(judgement_sheet_path, digest):
+            return judgement_sheet_path
+
+        manifest.forget(judgement_sheet_path)
+        data = judgement_sheets.iloc[rows].drop(columns=["EVENT_NAME"])
         data.to_excel(
             excel_writer=judgement_sheet_path,
             sheet_name=event,
@@ -143,27 +111,58 @@ class ResultsGenerator:
             + ["Total", "Rank"],
             index=False,
         )
+        manifest.record(judgement_sheet_path, digest)
+        return judgement_sheet_path
 
-    def __create_results_directory(self):
-        shutil.rmtree(RESULTS_PATH)
-        os.makedirs(RESULTS_PATH)
-
-    def generate(self, gen_all_certificates=False):
-        self.__create_results_directory()
-
-        with SQliteConnectConnection() as conn:
+    def generate(self, gen_all_certificates=False, on_progress=None):
+        """
+        rewrites only the result workbooks whose rows changed since the last
+        generation, per manifest.json, and removes those of events no longer judged.
+        the results and judgement sheets of every event are read and hashed in one
+        query each, and only the stale workbooks are cut from them.
+        on_progress(done, total, event) is called as each event is finished.
+        """
+        manifest = ReportManifest(RESULTS_PATH)
+        results = read_dataframe("results_of_events")
+        result_rows = results.groupby(["CATEGORY", "EVENT_NAME"], sort=False).indices
+        result_hashes = hash_pandas_object(results, index=False).to_numpy()
+        judgement_sheets = read_dataframe(
+            "result_judgement_sheets", judge_columns=self.judge_labels
+        )
+        judgement_sheet_rows = judgement_sheets.groupby("EVENT_NAME", sort=False).indices
+        judgement_sheet_hashes = hash_pandas_object(judgement_sheets, index=False).to_numpy()
+        paths = []
+        total = sum(len(events) for events in self.category_events.values())
+        done = 0
+        try:
             for category in self.category_events:
                 os.makedirs(RESULTS_PATH + category, exist_ok=True)
 
                 for event in self.category_events[category]:
                     if gen_all_certificates:
-                        self.certificateMaker.generate(category, event)
+                        self.certificateMaker.write_certificates(category, event)
 
-                    self.__create_event_report(conn, event, category)
+                    paths.append(
+                        self.__create_event_report(
+                            event, category, results, result_rows[(category, event)],
+                            result_hashes, manifest,
+                        )
+                    )
                     os.makedirs(
                         RESULTS_PATH + category + "/Judgement Sheets/", exist_ok=True
                     )
-                    self.__create_judgement_sheets(conn, event, category)
+                    paths.append(
+                        self.__create_judgement_sheets(
+                            event, category, judgement_sheets, judgement_sheet_rows[event],
+                            judgement_sheet_hashes, manifest,
+                        )
+                    )
+                    done += 1
+                    if on_progress is not None:
+                        on_progress(done, total, f"{category} - {event}")
+            manifest.prune(paths)
+        finally:
+            manifest.save()
 
 
 class CertificateGenerator:
@@ -219,49 +218,22 @@ class CertificateGenerator:
         return formatted_time
 
     def fetch_ranked_df(self, category, event_name):
-        with SQliteConnectConnection() as conn:
-            query = """
-            --sql
-            SELECT STUDENT_NAME, CLASS, DIVISION, CATEGORY, EVENT_NAME, RANK
-            FROM STUDENT, PARTICIPANT
-            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-            AND CATEGORY = ?
-            AND EVENT_NAME = ?
-            AND RANK IS NOT NULL
-            ;
-                """
-            df = read_sql(query, conn, params=(category, event_name))
-        
-        return df
+        return read_dataframe("ranked_participants", (category, event_name))
 
     def fetch_ranked_participants(self, category, event_name):
         final_data = []
-        with SQliteConnectCursor() as cursor:
-            cursor.execute(
-                """
-                --sql
-                SELECT STUDENT_NAME, CLASS, DIVISION, CATEGORY, EVENT_NAME, RANK
-                FROM STUDENT, PARTICIPANT
-                WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-                AND CATEGORY = ?
-                AND EVENT_NAME = ?
-                AND RANK IS NOT NULL
-                ;
-                """,
-                (category, event_name)
+        fetched_data = fetch_all("ranked_participants", (category, event_name))
+        for rec in fetched_data:
+            final_data.append(
+                {
+                    "name": rec[0],
+                    "class-division": self.class_division(rec[1], rec[2]),
+                    "category-event": self.category_event(rec[3], rec[4]),
+                    "prize": self.prize(rec[5]),
+                    "date": self.date(),
+                    "time": self.time()
+                }
             )
-            fetched_data = cursor.fetchall()
-            for rec in fetched_data:
-                final_data.append(
-                    {
-                        "name": rec[0],
-                        "class-division": self.class_division(rec[1], rec[2]),
-                        "category-event": self.category_event(rec[3], rec[4]),
-                        "prize": self.prize(rec[5]),
-                        "date": self.date(),
-                        "time": self.time()
-                    }
-                )
 
         return final_data
 
@@ -269,6 +241,14 @@ class CertificateGenerator:
         """
         Generates the certificates for respective events
         """
+        self.write_certificates(category, event_name)
+        show_arrow_message(f"Created Certificates")
+
+    def write_certificates(self, category:str, event_name:str) -> int:
+        """
+        writes the certificates of an event, without any messages, so it can run in a
+        background job; returns the number written
+        """
         records = self.fetch_ranked_participants( category, event_name)
         certificates_event_path = CERTIFICATES_PATH + category.title() + "/"+ event_name.title()
         shutil.rmtree(certificates_event_path, ignore_errors=True)
@@ -281,8 +261,29 @@ class CertificateGenerator:
             date = rec["date"]
             loc = certificates_event_path + f"/{category_event} - {prize} - {name}.png"
             self.create_certificate(name, class_division, category_event, prize, date, loc)
+        return len(records)
+
+    def write_all_certificates(self, category=None, event_name=None, on_progress=None) -> int:
+        """
+        writes the certificates of every judged event, or of those of a category or
+        of one event, calling on_progress(done, total, event) after each event
+        """
+        if category is None:
+            categories = fetch_column("judged_categories")
         else:
-            show_arrow_message(f"Created Certificates")
+            categories = [category]
+        category_events = [
+            (category, event)
+            for category in categories
+            for event in fetch_column("judged_events_of_category", (category,))
+            if event_name is None or event == event_name
+        ]
+        written = 0
+        for done, (category, event) in enumerate(category_events, start=1):
+            written += self.write_certificates(category, event)
+            if on_progress is not None:
+                on_progress(done, len(category_events), f"{category} - {event}")
+        return written
     
 
     
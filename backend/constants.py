@@ -3,6 +3,8 @@ DATABASE_DIRECTORY_PATH = "./databases/"
 DATABASE_EXTENSION = ".eventpro.db"
 SAVED_DATABASES_DIRECTORY_PATH = "./databases/archived/"
 INTERNALS_PATH = "./.internals/"
+JOURNAL_DIRECTORY_PATH = "./.internals/journal/"
+JOBS_DIRECTORY_PATH = "./.internals/jobs/"
 IMAGES_DIRECTORY_PATH = "./assets/"
 REPORTS_PATH = "./reports/"
 RESULTS_PATH = "./results/"
@@ -93,6 +95,10 @@ DEFAULT_HOUSES = [
     "Blue",
     "Green",
 ]
+DEFAULT_STANDING_POINTS = {
+    "RANK": {"FIRST": 5, "SECOND": 3, "THIRD": 1},
+    "GRADE": {"A": 5, "B": 3, "C": 1},
+}
 DEFAULT_PARAMETERS = {
     "number_of_categories": 5,
     "number_of_judges": 3,
@@ -112,3 +118,10 @@ DEFAULT_USERSDATA = {
 }
 AVATARS = "😊🤩😄😎🐍🤔😌😑😇🥹🐱🦁🐯🐼🐨🐰🐭🦜🪽🦋🕊️🦚❄️🔥☄️🌛🌞⭐🌈⚡"
 COOKIE_EXPIRY_DAYS = 1
+WRITE_BATCH_WINDOW_SECONDS = 0.005
+WRITE_BATCH_MAX_REQUESTS = 64
+STUDENT_CSV_CHUNK_ROWS = 2000
+STATEMENT_CACHE_SIZE = 256
+REPORT_WORKERS = None  # processes rendering report workbooks, None for one per core
+JOB_WORKERS = 2
+JOB_SAVE_INTERVAL_SECONDS = 1.0
@@ -1,9 +1,10 @@
-from io import StringIO
-from csv import reader as csv_reader
+from dataclasses import dataclass, field
 from streamlit import session_state
 import streamlit as st
 import pandas as pd
-from backend.constants import CLASS_TO_NUMBER
+from backend.constants import CLASS_TO_NUMBER, STUDENT_CSV_CHUNK_ROWS
+
+STUDENT_CSV_COLUMNS = ["admission_number", "name", "class_division"]
 
 
 def get_class_and_division(word: str):
@@ -31,26 +32,118 @@ def process_grade_marks(dataframe):
     return final_dict
 
 
-def process_student_data_from(csv_data, class_category_dict):
+@dataclass
+class StudentIngestionReport:
+    """students read from the uploaded csv, and the rows that were skipped with the reason"""
+
+    student_data: list[tuple] = field(default_factory=list)
+    errors: list[dict] = field(default_factory=list)
+
+    def add_errors(self, rows: pd.DataFrame, reason: str):
+        self.errors.extend(
+            {
+                "row": row_number,
+                "admission_number": admission_number,
+                "reason": reason,
+            }
+            for row_number, admission_number in zip(
+                rows.index + 1, rows["admission_number"]
+            )
+        )
+
+    def errors_dataframe(self):
+        return pd.DataFrame(self.errors, columns=["row", "admission_number", "reason"])
+
+
+def process_student_data_from(csv_data, class_category_dict) -> StudentIngestionReport:
+    """
+    reads the headerless ADMISSION_NUMBER, NAME, CLASS-DIVISION csv in chunks of
+    STUDENT_CSV_CHUNK_ROWS, so the upload is never decoded into memory at once.
+    invalid and duplicate rows are collected in the report instead of stopping the import,
+    and so are all rows of a csv with fewer columns, with the columns that are missing.
+    """
+    report = StudentIngestionReport()
+    admission_numbers = set()
+    total_size = getattr(csv_data, "size", None)
+    progress_bar = st.progress(0.0, text="Reading student data...")
+
     try:
-        student_data = []
-        file = StringIO(csv_data.getvalue().decode("utf-8"))
-        admn_nos = tuple()
-        for row in csv_reader(file):
-            admn_no = row[0]
-            name = row[1]
-            class_, division = get_class_and_division(row[2])
-            category = class_category_dict[class_]
-            if admn_no not in admn_nos:
-                student_data.append(
-                    (admn_no, name.title(), class_, division.upper(), None, category)
+        csv_data.seek(0)
+        number_of_columns = len(
+            pd.read_csv(csv_data, header=None, nrows=1, dtype=str, encoding="utf-8").columns
+        )
+        columns = STUDENT_CSV_COLUMNS[:number_of_columns]
+        missing_columns = STUDENT_CSV_COLUMNS[number_of_columns:]
+        csv_data.seek(0)
+        chunks = pd.read_csv(
+            csv_data,
+            header=None,
+            names=columns,
+            usecols=list(range(len(columns))),
+            dtype=str,
+            skipinitialspace=True,
+            keep_default_na=False,
+            chunksize=STUDENT_CSV_CHUNK_ROWS,
+            encoding="utf-8",
+        )
+        for chunk in chunks:
+            chunk = chunk.reindex(columns=STUDENT_CSV_COLUMNS, fill_value="")
+            chunk = chunk.fillna("").apply(lambda column: column.str.strip())
+            # like get_class_and_division, anything after a second "-" is ignored
+            class_division = chunk["class_division"].str.lower().str.split("-", expand=True)
+            class_division = class_division.reindex(columns=[0, 1], fill_value="").fillna("")
+            chunk["class"] = class_division[0].str.strip().map(CLASS_TO_NUMBER)
+            chunk["division"] = class_division[1].str.strip().str.upper()
+            chunk["category"] = chunk["class"].map(class_category_dict)
+
+            checks = [
+                (
+                    pd.Series(bool(missing_columns), index=chunk.index),
+                    f"missing columns: {', '.join(missing_columns)}",
+                ),
+                (chunk["admission_number"] == "", "missing admission number"),
+                (chunk["class"].isna(), "unknown class"),
+                (chunk["division"] == "", "missing division"),
+                (chunk["category"].isna(), "class has no category"),
+                (
+                    chunk["admission_number"].isin(admission_numbers)
+                    | chunk["admission_number"].duplicated(),
+                    "duplicate admission number",
+                ),
+            ]
+            invalid = pd.Series(False, index=chunk.index)
+            for failed, reason in checks:
+                failed = failed & ~invalid
+                report.add_errors(chunk[failed], reason)
+                invalid |= failed
+
+            valid = chunk[~invalid]
+            admission_numbers.update(valid["admission_number"])
+            report.student_data.extend(
+                zip(
+                    valid["admission_number"],
+                    valid["name"].str.title(),
+                    valid["class"],
+                    valid["division"],
+                    [None] * len(valid),
+                    valid["category"],
+                )
+            )
+            if total_size:
+                progress_bar.progress(
+                    min(csv_data.tell() / total_size, 1.0),
+                    text=f"Read {len(report.student_data)} students...",
                 )
-                st.toast(f"Added student: {admn_no}, {name}, {class_}, {division}, {category}")
-                admn_nos = (admn_no,)
-        return student_data
-    except Exception as e:
-        st.text(f"Error processing student data: {e}")
-        return []
+    except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+        report.errors.append(
+            {"row": None, "admission_number": None, "reason": f"unreadable csv: {e}"}
+        )
+
+    progress_bar.progress(
+        1.0,
+        text=f"Read {len(report.student_data)} students, skipped {len(report.errors)} rows",
+    )
+    return report
 
 
 def get_judge_labels(judge_no):
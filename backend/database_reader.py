@@ -1,145 +1,131 @@
-from pandas import DataFrame, read_sql
+import threading
+from functools import wraps
+from time import perf_counter
+from pandas import DataFrame
+from backend.database_writer import submit_write
 from backend.file_operations import get_current_database_path
-from backend.sqlite_connections import SQliteConnectCursor, SQliteConnectConnection
+from backend.migrations import create_participant_view, rebuild_house_standings
+from backend.queries import (
+    execute,
+    execute_many,
+    fetch_column,
+    fetch_one,
+    read_dataframe,
+)
+from backend.sqlite_connections import get_data_version
+from backend.submit_functions import recompute_results
 from components.messages import show_error_message, show_success_message
 
 
+class QueryCache:
+    """
+    Process-wide memo of the rarely changing DatabaseFetch lookups, shared by
+    every session. An entry is served only while the `PRAGMA data_version` of
+    its database is the one it was read under, so a commit from any session
+    invalidates it. The version includes the generation of the path, so entries
+    of a database that was closed and replaced under the same name are not served.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.entries: dict[tuple, tuple[tuple[int, int], object]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, file_path: str, compute):
+        data_version = get_data_version(file_path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == data_version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+        with self.lock:
+            self.entries[key] = (data_version, value)
+        return value
+
+    def forget(self, file_path: str):
+        """drops the entries of a database, eg. once it is closed to be removed or replaced"""
+        with self.lock:
+            self.entries = {
+                key: entry for key, entry in self.entries.items() if key[0] != file_path
+            }
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+QUERY_CACHE = QueryCache()
+
+
+def cached(method):
+    """serve a DatabaseFetch method from QUERY_CACHE; lists are copied so callers may modify them."""
+
+    @wraps(method)
+    def wrapper(self, *args):
+        value = QUERY_CACHE.get(
+            (self.path, method.__name__, args),
+            self.path,
+            lambda: method(self, *args),
+        )
+        return list(value) if isinstance(value, list) else value
+
+    return wrapper
+
+
+def get_cache_stats():
+    """hits and misses of the DatabaseFetch cache since the server started"""
+    return QUERY_CACHE.stats()
+
+
 class DatabaseFetch:
     def __init__(self) -> None:
         self.path = get_current_database_path()
 
     def get_events_from_category(self, category):
-        with SQliteConnectCursor() as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT DISTINCT EVENT_NAME 
-            FROM PARTICIPANT,STUDENT
-            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-            AND STUDENT.CATEGORY = ?
-            ;
-            """,
-                (category,),
-            )
-
-            eves = cursor.fetchall()
-        return [E[0] for E in eves]
+        return fetch_column("events_of_category", (category,), self.path)
 
+    @cached
     def get_parameters(self):
         """
         NUMBER_OF_JUDGES, MAX_MARKS_FOR_EACH_JUDGE, MIN_MARKS_FOR_PRIZE, MAXIMUM_EVENTS_FOR_PARTICIPATION, RESULTS_READY
         """
-        with SQliteConnectCursor(file_path=self.path) as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT NUMBER_OF_JUDGES, MAX_MARKS_FOR_EACH_JUDGE, MIN_MARKS_FOR_PRIZE, MAXIMUM_EVENTS_FOR_PARTICIPATION, RESULTS_READY
-            FROM PARAMETER
-            ;
-            """
-            )
-            data = cursor.fetchone()
-        return data
+        return fetch_one("parameters", file_path=self.path)
 
+    @cached
     def get_events(self):
-        with SQliteConnectCursor(self.path) as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT EVENT_NAME FROM EVENT_NAME
-            ;
-            """
-            )
-            eves = cursor.fetchall()
-        return [E[0] for E in eves]
+        return fetch_column("events", file_path=self.path)
 
+    @cached
     def get_categories(self):
-        with SQliteConnectCursor(self.path) as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT DISTINCT CATEGORY FROM CLASS_CATEGORY
-            ;
-            """
-            )
-            cats = cursor.fetchall()
-        return [cat[0] for cat in cats]
+        return fetch_column("categories", file_path=self.path)
 
+    @cached
     def get_classes(self):
-        with SQliteConnectCursor(self.path) as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT DISTINCT CLASS FROM CLASS_CATEGORY
-            ;
-            """
-            )
-            cats = cursor.fetchall()
-        return [cat[0] for cat in cats]
+        return fetch_column("classes", file_path=self.path)
 
+    @cached
     def get_houses(self):
-        with SQliteConnectCursor(self.path) as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT HOUSE FROM HOUSE
-            ;
-            """
-            )
-            houses = cursor.fetchall()
-        return [house[0] for house in houses]
+        return fetch_column("houses", file_path=self.path)
 
     def get_details_of_admission_number(self, admission_number):
         """
         STUDENT_NAME, CLASS, DIVISION, HOUSE,  events
         """
-        with SQliteConnectCursor(self.path) as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT STUDENT_NAME, CLASS, DIVISION, HOUSE
-            FROM STUDENT
-            WHERE ADMISSION_NUMBER = ?
-            ;
-            """,
-                (admission_number,),
-            )
-
-            name, class_, division, house = cursor.fetchone()
+        name, class_, division, house = fetch_one(
+            "student_details", (admission_number,), self.path
+        )
         EVENTS = self.get_events_from_database(admission_number)
         return name, class_, division, house, EVENTS
 
     def get_events_from_database(self, admission_number):
-        with SQliteConnectCursor(self.path) as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT EVENT_NAME
-            FROM PARTICIPANT
-            WHERE ADMISSION_NUMBER = ?
-            ;
-            """,
-                (admission_number,),
-            )
-
-            DATA = cursor.fetchall()
-            DATA = [d[0] for d in DATA]
-        return DATA
+        return fetch_column("events_of_student", (admission_number,), self.path)
 
+    @cached
     def get_all_admission_numbers(self):
-        with SQliteConnectCursor(self.path) as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT DISTINCT ADMISSION_NUMBER
-            FROM STUDENT
-            ;
-            """
-            )
-            cats = cursor.fetchall()
-
-            DATA = [cat[0] for cat in cats]
-        return DATA
+        return fetch_column("all_admission_numbers", file_path=self.path)
 
     def get_database_specs(self):
         """
@@ -147,43 +133,13 @@ class DatabaseFetch:
         MAX_MARKS_FOR_EACH_JUDGE, NUMBER_OF_JUDGES,
         MIN_MARKS_FOR_PRIZE, MAXIMUM_EVENTS_FOR_PARTICIPATION
         """
-        with SQliteConnectCursor() as cursor:
-            query = """
-            --sql
-            SELECT MAX_MARKS_FOR_EACH_JUDGE,
-            NUMBER_OF_JUDGES,
-            MIN_MARKS_FOR_PRIZE,
-            MAXIMUM_EVENTS_FOR_PARTICIPATION
-            FROM PARAMETER
-            ;
-            """
-
-            cursor.execute(query)
-            tup1 = cursor.fetchone()
-        return tup1
+        return fetch_one("database_specs", file_path=self.path)
 
     def get_participant_number(self):
-        with SQliteConnectCursor() as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT COUNT(DISTINCT ADMISSION_NUMBER) FROM PARTICIPANT
-            ;
-            """
-            )
-            a = cursor.fetchone()[0]
-        return a
+        return fetch_one("participant_count", file_path=self.path)[0]
 
     def get_distinct_events_in_participant_table(self):
-        with SQliteConnectCursor() as cursor:
-            cursor.execute(
-                """
-            --sql
-            SELECT DISTINCT EVENT_NAME FROM PARTICIPANT
-            ;
-            """
-            )
-            return [house[0] for house in cursor.fetchall()]
+        return fetch_column("participant_events", file_path=self.path)
 
 
 class DatabaseFetchDataframe:
@@ -191,64 +147,29 @@ class DatabaseFetchDataframe:
         self.database_path = get_current_database_path()
 
     def get_participant_df(self):
-        query = """
-        --sql
-        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE,CATEGORY, EVENT_NAME
-        FROM STUDENT, PARTICIPANT
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        ORDER BY CLASS, DIVISION, STUDENT_NAME
-        ;
-        """
-        with SQliteConnectConnection() as conn:
-            df = read_sql(query, conn)
-
-        return df
+        return read_dataframe("participants", file_path=self.database_path)
 
     def get_student_df(self):
-        query = """
-        --sql
-        SELECT ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, CATEGORY
-        FROM STUDENT
-        ORDER BY CLASS, DIVISION, STUDENT_NAME
-        ;
-        """
-        with SQliteConnectConnection() as conn:
-            df = read_sql(query, conn)
-
-        return df
+        return read_dataframe("students", file_path=self.database_path)
 
     def get_class_category_df(self):
-        with SQliteConnectConnection() as conn:
-            df = read_sql(
-                "SELECT * FROM CLASS_CATEGORY ",
-                con=conn,
-            )
-        return df
+        return read_dataframe("class_category", file_path=self.database_path)
 
     def get_grade_marks_df(self):
-        with SQliteConnectConnection() as conn:
-            df = read_sql(
-                "SELECT * FROM GRADE_MARKS ",
-                con=conn,
-            )
-        return df
+        return read_dataframe("grade_marks", file_path=self.database_path)
+
+    def get_standing_points_df(self):
+        return read_dataframe("standing_points", file_path=self.database_path)
+
+    def get_house_standings_df(self):
+        return read_dataframe("house_standings", file_path=self.database_path)
 
     def get_participants_from_event_category_df(self, category, event):
-        from pandas import read_sql
-
-        with SQliteConnectConnection() as conn:
-            query = """
-            --sql
-            SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE
-            FROM STUDENT, PARTICIPANT
-            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-            AND CATEGORY = ?
-            AND EVENT_NAME = ?
-            ORDER BY CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
-            ;
-            """
-            data = read_sql(query, conn, params=(category, event))
-            return data
+        return read_dataframe(
+            "participants_of_category_event",
+            (category, event),
+            self.database_path,
+        )
 
 
 class ParameterUpdator:
@@ -257,29 +178,15 @@ class ParameterUpdator:
 
     def update_events_to_parameters(self, df: DataFrame):
         data = df.to_dict(orient="records")
-        with SQliteConnectConnection() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                --sql
-                DELETE FROM EVENT_NAME
-                ;
-                """
-            )
-            conn.commit()
 
-            for record in data:
-                cur.execute(
-                    """
-                    --sql
-                    INSERT INTO EVENT_NAME
-                    VALUES (?)
-                    ;
-                    """,
-                    (record["EVENT_NAME"],),
-                )
+        def update(cursor):
+            execute(cursor, "delete_events")
+            execute_many(
+                cursor, "insert_event", [(record["EVENT_NAME"],) for record in data]
+            )
 
-            show_success_message("The events have been updated")
+        submit_write(update).result()
+        show_success_message("The events have been updated")
 
     def update_grades_min_marks(self, df: DataFrame):
         data = df.to_dict(orient="records")
@@ -288,26 +195,38 @@ class ParameterUpdator:
             show_error_message("The marks should be in descending order...")
             return
 
-        with SQliteConnectCursor() as cursor:
-            cursor.execute(
-                """
-                --sql
-                DELETE FROM GRADE_MARKS
-                ;
-                """
+        def update(cursor):
+            execute(cursor, "delete_grade_marks")
+            execute_many(
+                cursor,
+                "insert_grade_marks",
+                [(record["GRADE"], record["MIN_MARKS"]) for record in data],
+            )
+            return recompute_results(cursor)
+
+        changed_rows = submit_write(update).result()
+        show_success_message(
+            f"The Grades have been updated. {changed_rows} results were recomputed."
+        )
+
+    def update_standing_points(self, df: DataFrame):
+        df = df.dropna(subset=["KIND", "VALUE"]).assign(POINTS=df["POINTS"].fillna(0))
+        data = df.to_dict(orient="records")
+        if len({(rec["KIND"], rec["VALUE"]) for rec in data}) != len(data):
+            show_error_message("Each rank and grade can be given points only once...")
+            return
+
+        def update(cursor):
+            execute(cursor, "delete_standing_points")
+            execute_many(
+                cursor,
+                "insert_standing_points",
+                [(rec["KIND"], rec["VALUE"], int(rec["POINTS"])) for rec in data],
             )
+            rebuild_house_standings(cursor)
 
-            for record in data:
-                cursor.execute(
-                    """
-                    --sql
-                    INSERT INTO GRADE_MARKS
-                    VALUES (?, ?)
-                    ;
-                    """,
-                    (record["GRADE"], record["MIN_MARKS"]),
-                )
-            show_success_message("The Grades have been updated.")
+        submit_write(update).result()
+        show_success_message("The house points have been updated.")
 
     def update_other_parameters(
         self,
@@ -315,19 +234,12 @@ class ParameterUpdator:
         min_marks_for_prize,
         total_marks,
         max_no_of_events,
+        number_of_judges=None,
     ):
-        with SQliteConnectCursor() as cursor:
-            cursor.execute(
-                """
-                --sql
-                UPDATE PARAMETER
-                SET 
-                MAX_MARKS_FOR_EACH_JUDGE = ?,
-                MIN_MARKS_FOR_PRIZE = ?,
-                TOTAL_MARKS = ?,
-                MAXIMUM_EVENTS_FOR_PARTICIPATION = ?
-                ;
-                """,
+        def update(cursor):
+            execute(
+                cursor,
+                "update_parameters",
                 (
                     max_marks_for_each_judge,
                     min_marks_for_prize,
@@ -335,4 +247,20 @@ class ParameterUpdator:
                     max_no_of_events,
                 ),
             )
-        show_success_message("Parameters have been updated")
+            if number_of_judges is not None:
+                execute(cursor, "update_number_of_judges", (number_of_judges,))
+                create_participant_view(cursor, number_of_judges)
+            return recompute_results(cursor)
+
+        changed_rows = submit_write(update).result()
+        show_success_message(
+            f"Parameters have been updated. {changed_rows} results were recomputed."
+        )
+
+    def recompute_results(self):
+        """recomputes every grade and rank in one transaction and reports the time taken"""
+        start = perf_counter()
+        changed_rows = submit_write(recompute_results).result()
+        show_success_message(
+            f"{changed_rows} results were recomputed in {perf_counter() - start:.2f} seconds."
+        )
@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+from concurrent.futures import Future
+from queue import Empty, Queue
+from time import monotonic
+from typing import Any, Callable
+from backend.constants import (
+    STATEMENT_CACHE_SIZE,
+    WRITE_BATCH_MAX_REQUESTS,
+    WRITE_BATCH_WINDOW_SECONDS,
+)
+from backend.file_operations import get_current_database_path
+from backend.migrations import upgrade_database
+
+
+STOP = object()
+
+
+def fail_future(future: Future, error: BaseException):
+    """fails a future that is not finished or cancelled yet"""
+    if future.done():
+        return
+    if future.running() or future.set_running_or_notify_cancel():
+        future.set_exception(error)
+
+
+class DatabaseWriter:
+    """
+    A single background thread that applies every write to one database.
+    Writes from all sessions are queued as callables taking a cursor; whatever
+    arrives within WRITE_BATCH_WINDOW_SECONDS of the first queued write is
+    committed in one transaction. Each write runs inside its own savepoint, so
+    a failing write only fails its own future and leaves the rest of the batch
+    intact. If the writer itself fails, eg. the database cannot be opened, every
+    queued write fails with the error and the writer is dropped from WRITERS, so
+    the next write starts a new one.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.requests: Queue = Queue()
+        self.thread = threading.Thread(
+            target=self.__run, name=f"writer:{file_path}", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, write: Callable[[sqlite3.Cursor], Any]) -> Future:
+        future = Future()
+        self.requests.put((future, write))
+        return future
+
+    def stop(self):
+        self.requests.put(STOP)
+        self.thread.join()
+
+    def __run(self):
+        batch = []
+        try:
+            self.__serve(batch)
+        except Exception as error:
+            with WRITERS_LOCK:
+                if WRITERS.get(self.file_path) is self:
+                    del WRITERS[self.file_path]
+            for future, _ in batch:
+                fail_future(future, error)
+            while True:
+                try:
+                    request = self.requests.get_nowait()
+                except Empty:
+                    break
+                if request is not STOP:
+                    fail_future(request[0], error)
+
+    def __serve(self, batch: list):
+        """applies the queued writes until stopped; batch holds the requests being applied"""
+        upgrade_database(self.file_path)
+        connection = sqlite3.connect(
+            database=self.file_path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        try:
+            stopping = False
+            while not stopping:
+                batch.clear()
+                request = self.requests.get()
+                if request is STOP:
+                    break
+                batch.append(request)
+                deadline = monotonic() + WRITE_BATCH_WINDOW_SECONDS
+                while len(batch) < WRITE_BATCH_MAX_REQUESTS:
+                    try:
+                        request = self.requests.get(timeout=max(deadline - monotonic(), 0))
+                    except Empty:
+                        break
+                    if request is STOP:
+                        stopping = True
+                        break
+                    batch.append(request)
+                self.__apply(connection, batch)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def __apply(connection: sqlite3.Connection, batch: list):
+        cursor = connection.cursor()
+        outcomes = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for future, write in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT WRITE_REQUEST")
+                try:
+                    outcomes.append((future, write(cursor), None))
+                except Exception as error:
+                    cursor.execute("ROLLBACK TO WRITE_REQUEST")
+                    outcomes.append((future, None, error))
+                cursor.execute("RELEASE WRITE_REQUEST")
+            cursor.execute("COMMIT")
+        except Exception as error:
+            if connection.in_transaction:
+                cursor.execute("ROLLBACK")
+            for future, _ in batch:
+                fail_future(future, error)
+            return
+        finally:
+            cursor.close()
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+WRITERS: dict[str, DatabaseWriter] = {}
+WRITERS_LOCK = threading.Lock()
+
+
+def submit_write(write: Callable[[sqlite3.Cursor], Any], file_path=None) -> Future:
+    """queue `write(cursor)` on the writer of the database and return its future."""
+    file_path = file_path or get_current_database_path()
+    with WRITERS_LOCK:
+        writer = WRITERS.get(file_path)
+        if writer is None:
+            writer = WRITERS[file_path] = DatabaseWriter(file_path)
+        # queued under the lock, so a failed writer drops no write queued after it drained
+        return writer.submit(write)
+
+
+def stop_writer(file_path: str):
+    """apply the queued writes, then stop the writer of the database."""
+    with WRITERS_LOCK:
+        writer = WRITERS.pop(file_path, None)
+    if writer is not None:
+        writer.stop()
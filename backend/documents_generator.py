@@ -1,307 +1,319 @@
-from pandas import read_sql
-import os, shutil
+from pandas import DataFrame
+from pandas.util import hash_pandas_object
 from backend.constants import REPORTS_PATH
 from backend.data_processing import get_judge_labels
-from backend.excel_writer import ExcelDataframeWriter
-from backend.sqlite_connections import SQliteConnectConnection, SQliteConnectCursor
+from backend.queries import fetch_one, read_dataframe
+from backend.report_manifest import ReportManifest, digest_of
+from backend.report_workers import (
+    OUTPUT_FORMATS,
+    REPORT_FORMAT_VERSION,
+    WorkbookPlan,
+    get_output_formats,
+    write_workbooks,
+)
+
+
+PRIZES = ["FIRST", "SECOND", "THIRD", "CONSOLATION"]
+STUDENT_COLUMNS = {
+    "ADMISSION_NUMBER": "Admn. No",
+    "STUDENT_NAME": "Name",
+    "CLASS": "Class",
+    "DIVISION": "Division",
+    "HOUSE": "House",
+}
+RESULT_COLUMNS = {
+    "RANK": "Rank",
+    "GRADE": "Grade",
+    "TOTAL_MARKS": "Total Marks",
+    "DISQUALIFIED": "Disqualified",
+}
+WORKBOOK_NAMES = {
+    "event_participant_count": "{category}/Event Participant Count.xlsx",
+    "category_reports": "{category}/{category} - Category Report.xlsx",
+    "prize_winners": "{category}/{category} - Prize Winners.xlsx",
+    "judgement_sheets": "{category}/Judgement Sheets/{category} - Judgement Sheet.xlsx",
+    "event_reports": "{category}/{category} - Event Report.xlsx",
+}
+
+
+def split_by_category_event(dataframe: DataFrame, snapshot: DataFrame) -> dict:
+    """{category: {event: rows}} of dataframe, whose index is that of its rows in snapshot"""
+    split = {}
+    for (category, event), rows in dataframe.groupby(
+        [snapshot["CATEGORY"], snapshot["EVENT_NAME"]]
+    ):
+        split.setdefault(category, {})[event] = rows
+    return split
 
 
 class ReportGenerator:
+    """
+    every report is cut from one snapshot of STUDENT joined with PARTICIPANT, read
+    once per generation, so the number of queries does not grow with the events.
+    the columns of a kind of sheet are picked and renamed once for the snapshot and
+    then split by category and event.
+    output_format is xlsx, or csv, csv.gz or parquet for a directory per workbook with
+    a file per sheet, named after the format, eg. "Category 1 - Prize Winners (csv)",
+    so switching formats writes new workbooks and prunes those of the old format.
+    """
+
     def __init__(
-        self, category_based_report_needed: bool, judgement_sheets_needed: bool, prize_winners_report_needed: bool = False
+        self, category_based_report_needed: bool, judgement_sheets_needed: bool, prize_winners_report_needed: bool = False, workers=None, output_format: str = "xlsx"
     ) -> None:
-        self.categories = self.__get_distinct_category_from_participants()
-        self.category_events = self.__get_category_event_dictionary()
-        self.judge_labels = self.__get_judge_labels_from_db()
-
+        if output_format not in get_output_formats():
+            raise ValueError(
+                f"output format {output_format!r} is not one of {get_output_formats()}"
+            )
         self.category_based_report_needed = category_based_report_needed
         self.judgement_sheets_needed = judgement_sheets_needed
         self.prize_winners_report_needed = prize_winners_report_needed
+        self.workers = workers
+        self.output_format = output_format
 
-    def __get_distinct_category_from_participants(self) -> list[str]:
-        with SQliteConnectCursor() as cursor:
-            query = """
-            --sql
-            SELECT DISTINCT CATEGORY
-            FROM STUDENT, PARTICIPANT
-            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER 
-            ;
-            """
-            cursor.execute(query)
-            categories = [cat[0] for cat in cursor.fetchall()]
-        return categories
+    def __get_judge_labels_from_db(self):
+        judge_no = fetch_one("number_of_judges")[0]
+        return get_judge_labels(judge_no)
 
-    def __get_distinct_events_from_category(self, category) -> list[str]:
-        with SQliteConnectCursor() as cursor:
-            query = """
-            --sql
-            SELECT DISTINCT EVENT_NAME
-            FROM STUDENT, PARTICIPANT
-            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-            AND STUDENT.CATEGORY = ?
-            ;
-            """
-            cursor.execute(query, (category,))
-            events = [event[0] for event in cursor.fetchall()]
-        return events
+    def load_snapshot(self) -> DataFrame:
+        """every participation with its student, ordered by class, division and name"""
+        self.judge_labels = self.__get_judge_labels_from_db()
+        return read_dataframe("report_snapshot", judge_columns=self.judge_labels)
 
-    def __get_category_event_dictionary(self) -> dict[str, list[str]]:
-        category_events = {
-            category: self.__get_distinct_events_from_category(category)
-            for category in self.categories
+    def generate_reports(self, on_progress=None) -> int:
+        """
+        rewrites only the workbooks whose input rows changed since they were last
+        written, per manifest.json, and removes those no longer produced. on_progress
+        (written, total, path) is called as each workbook is written. returns the
+        number of workbooks written.
+        """
+        snapshot = self.load_snapshot()
+        digests = self.input_digests(snapshot)
+        manifest = ReportManifest(REPORTS_PATH)
+        manifest.prune(digests, OUTPUT_FORMATS[self.output_format])
+        stale_paths = {path for path, digest in digests.items() if manifest.is_stale(path, digest)}
+        stale_categories = {
+            category
+            for category in snapshot["CATEGORY"].unique()
+            if any(path in stale_paths for path in self.workbook_paths(category))
         }
-        return category_events
+        stale_plans = [
+            plan
+            for plan in self.plan_reports(snapshot, stale_categories)
+            if plan.path in stale_paths
+        ]
+        for plan in stale_plans:
+            manifest.forget(plan.path)
 
-    def __get_judge_labels_from_db(self):
-        with SQliteConnectCursor() as cursor:
-            query = """
-            --sql
-            SELECT NUMBER_OF_JUDGES 
-            FROM PARAMETER
-            ;
-            """
-            cursor.execute(query)
-            judge_no = cursor.fetchone()[0]
-            judge_labels = get_judge_labels(judge_no)
-        return judge_labels
+        def record(written, total, path):
+            manifest.record(path, digests[path])
+            if on_progress is not None:
+                on_progress(written, total, path)
 
-    def create_reports_directory(self):
-        shutil.rmtree(REPORTS_PATH, ignore_errors=True)
-        os.makedirs(REPORTS_PATH)
+        try:
+            write_workbooks(stale_plans, self.workers, record)
+        finally:
+            manifest.save()
+        return len(stale_plans)
 
-    def generate_reports(self):
-        self.create_reports_directory()
+    def workbook_path(self, workbook: str, category: str) -> str:
+        path = REPORTS_PATH + WORKBOOK_NAMES[workbook].format(category=category.title())
+        if self.output_format != "xlsx":
+            return path.removesuffix(".xlsx") + f" ({self.output_format})"
+        return path
 
-        with SQliteConnectConnection() as conn:
-            for category in self.category_events:
-                os.makedirs(REPORTS_PATH + category.title(), exist_ok=True)
-                self.create_event_participant_count_report(conn, category)
-
-                if self.category_based_report_needed:
-                    self.create_category_reports(conn, category)
-                
-                if self.prize_winners_report_needed:
-                    self.prize_winners_report(conn, category)
-
-                if self.judgement_sheets_needed:
-                    self.create_judgement_sheets(conn, category)
+    def new_plan(self, workbook: str, category: str) -> WorkbookPlan:
+        return WorkbookPlan(
+            self.workbook_path(workbook, category), output_format=self.output_format
+        )
 
-                self.create_event_reports(conn, category)
-    
-    def create_event_participant_count_report(self, conn, category):
-        query = """
-        --sql
-        SELECT EVENT_NAME, COUNT(PARTICIPANT.ADMISSION_NUMBER) AS "Participant Count"
-        FROM PARTICIPANT, STUDENT
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        GROUP BY EVENT_NAME
-        ORDER BY EVENT_NAME ASC;
-        """
-        event_participant_count_path = REPORTS_PATH + category.title() + "/Event Participant Count.xlsx"
-        os.makedirs(os.path.dirname(event_participant_count_path), exist_ok=True)
-        df = read_sql(query, conn)
-        
-        with ExcelDataframeWriter(event_participant_count_path) as xl_obj:
-            xl_obj.generate_doc(
-                df,
-                category.title(),
-                "Event Participant Count - " + category.title(),
+    def workbook_columns(self) -> dict[str, list[str]]:
+        """the snapshot columns each workbook of a category is cut from, for the workbooks needed"""
+        event_columns = list(STUDENT_COLUMNS) + ["EVENT_NAME"]
+        workbook_columns = {"event_reports": event_columns}
+        if self.category_based_report_needed:
+            workbook_columns["category_reports"] = event_columns
+        if self.prize_winners_report_needed:
+            workbook_columns["prize_winners"] = event_columns + list(RESULT_COLUMNS)
+        if self.judgement_sheets_needed:
+            workbook_columns["judgement_sheets"] = (
+                event_columns
+                + self.judge_labels.split(", ")
+                + ["TOTAL_MARKS", "GRADE", "RANK", "DISQUALIFIED", "REMARKS"]
             )
+        return workbook_columns
 
-    def create_category_reports(self, conn, category):
-        q1 = """
-        --sql
-        SELECT PARTICIPANT.ADMISSION_NUMBER AS "Admn. No", 
-        STUDENT_NAME as "Name", 
-        CLASS as "Class", 
-        DIVISION as "Division", 
-        HOUSE as "House", 
-        GROUP_CONCAT(EVENT_NAME, '  |  ') AS "Events"
-        FROM STUDENT, PARTICIPANT
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        GROUP BY PARTICIPANT.ADMISSION_NUMBER
-        HAVING CATEGORY = ?
-        ORDER BY CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
-        ;
-        """
-        q2 = """
-        --sql
-        SELECT PARTICIPANT.ADMISSION_NUMBER AS "Admn. No", 
-        STUDENT_NAME as "Name", 
-        CLASS as "Class", 
-        DIVISION as "Division", 
-        HOUSE as "House", 
-        EVENT_NAME as "Event Name"
-        FROM STUDENT, PARTICIPANT
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        AND CATEGORY = ?
-        ORDER BY EVENT_NAME ASC, CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
-        ;
+    def workbook_paths(self, category: str) -> list[str]:
+        return [
+            self.workbook_path(workbook, category)
+            for workbook in ["event_participant_count", *self.workbook_columns()]
+        ]
+
+    def input_digests(self, snapshot: DataFrame) -> dict[str, str]:
         """
-        q3 = """
-        --sql
-        SELECT EVENT_NAME AS "Event Name",
-        COUNT(STUDENT.ADMISSION_NUMBER) AS "Participant Count"
-        FROM STUDENT, PARTICIPANT
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        GROUP BY CATEGORY, EVENT_NAME
-        HAVING CATEGORY = ?
-        ORDER BY EVENT_NAME ASC, CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
-        ;
+        the digest of the input rows of every workbook, by path. the rows of each
+        workbook's columns are hashed once for the snapshot, and then combined per
+        category, so nothing has to be planned to find the workbooks that changed.
         """
-        category_report_path = (
-            REPORTS_PATH
-            + category.title()
-            + f"/{category.title()} - Category Report.xlsx"
+        rows_of_category = snapshot.groupby("CATEGORY", sort=False).indices
+        count_digest = digest_of(
+            REPORT_FORMAT_VERSION, self.event_participant_count(snapshot)
         )
+        digests = {
+            self.workbook_path("event_participant_count", category): count_digest
+            for category in rows_of_category
+        }
+        for workbook, columns in self.workbook_columns().items():
+            row_hashes = hash_pandas_object(snapshot[columns], index=False).to_numpy()
+            for category, rows in rows_of_category.items():
+                digests[self.workbook_path(workbook, category)] = digest_of(
+                    REPORT_FORMAT_VERSION, workbook, columns, row_hashes[rows]
+                )
+        return digests
 
-        df1 = read_sql(q1, conn, params=(category,))
-        df2 = read_sql(q2, conn, params=(category,))
-        df3 = read_sql(q3, conn, params=(category,))
-
-        with ExcelDataframeWriter(category_report_path) as xl_obj:
-            xl_obj.generate_doc(
-                df1, f"{category.title()} - Students", category.title() + " - Students"
-            )
-            xl_obj.generate_doc(
-                df2, f"{category.title()} - All Events", category.title() + " - Events"
+    def plan_reports(self, snapshot: DataFrame, categories=None) -> list[WorkbookPlan]:
+        """the workbooks of every category, or only of the given categories"""
+        event_participant_count = self.event_participant_count(snapshot)
+        if categories is not None:
+            snapshot = snapshot[snapshot["CATEGORY"].isin(categories)]
+        event_participants = split_by_category_event(
+            snapshot[list(STUDENT_COLUMNS)].rename(columns=STUDENT_COLUMNS), snapshot
+        )
+        if self.prize_winners_report_needed:
+            prize_winners = self.prize_winners(snapshot)
+            no_prize_winners = prize_winners.iloc[:0]
+            prize_winners = split_by_category_event(prize_winners, snapshot)
+        if self.judgement_sheets_needed:
+            judgement_sheets = split_by_category_event(
+                self.judgement_sheet_columns(snapshot), snapshot
             )
-            xl_obj.generate_doc(
-                df3,
-                f"{category.title()} - Statistics",
-                category.title() + " - Statistics",
+
+        plans = []
+        for category, participations in snapshot.groupby("CATEGORY", sort=False):
+            plans.append(
+                self.event_participant_count_report(category, event_participant_count)
             )
+            if self.category_based_report_needed:
+                plans.append(self.category_reports(category, participations))
 
-    def create_event_reports(self, conn, category: str, prize_winners: bool = False):
-        events = self.__get_distinct_events_from_category(category)
-        query = """
-        --sql
-        SELECT 
-        STUDENT.ADMISSION_NUMBER AS "Admn. No", 
-        STUDENT_NAME AS "Name", 
-        CLASS AS "Class", 
-        DIVISION AS "Division", 
-        HOUSE AS "House"
-        FROM STUDENT, PARTICIPANT
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        AND EVENT_NAME = ?
-        AND STUDENT.CATEGORY = ?
-        ORDER BY CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
-        ;
-        """
-        q3 = """
-        --sql
-        SELECT 
-        PARTICIPANT.ADMISSION_NUMBER AS "Admn. No",
-        STUDENT_NAME AS "Name",
-        CLASS AS "Class",
-        DIVISION AS "Division",
-        HOUSE AS "House",
-        RANK AS "Rank",
-        GRADE AS "Grade",
-        TOTAL_MARKS AS "Total Marks",
-        DISQUALIFIED AS "Disqualified"
-        FROM PARTICIPANT, STUDENT
-        WHERE PARTICIPANT.ADMISSION_NUMBER = STUDENT.ADMISSION_NUMBER
-        AND EVENT_NAME = ?
-        AND CATEGORY = ?
-        ORDER BY CLASS ASC, DIVISION ASC, STUDENT_NAME ASC;
-        """#prize winners
-        event_path = (
-            REPORTS_PATH + category.title() + f"/{category.title()} - Event Report.xlsx"
+            if self.prize_winners_report_needed:
+                plans.append(
+                    self.prize_winners_report(
+                        category,
+                        {
+                            event: prize_winners.get(category, {}).get(
+                                event, no_prize_winners
+                            )
+                            for event in event_participants[category]
+                        },
+                    )
+                )
+
+            if self.judgement_sheets_needed:
+                plans.append(self.judgement_sheets(category, judgement_sheets[category]))
+
+            plans.append(self.event_reports(category, event_participants[category]))
+        return plans
+
+    def event_participant_count(self, snapshot: DataFrame) -> DataFrame:
+        return (
+            snapshot.groupby("EVENT_NAME")
+            .size()
+            .rename("Participant Count")
+            .reset_index()
         )
-        prize_path = (
-            REPORTS_PATH + category.title() + f"/{category.title()} - Prize Winners.xlsx"
+
+    def prize_winners(self, snapshot: DataFrame) -> DataFrame:
+        return (
+            snapshot[snapshot["RANK"].isin(PRIZES)]
+            .sort_values(
+                ["TOTAL_MARKS", "STUDENT_NAME"], ascending=[False, True], kind="stable"
+            )[list(STUDENT_COLUMNS) + list(RESULT_COLUMNS)]
+            .rename(columns=STUDENT_COLUMNS | RESULT_COLUMNS)
         )
 
-        with ExcelDataframeWriter(event_path) as xl_obj:
-            for event in sorted(events):
-                df = read_sql(query, conn, params=(event, category))
-                xl_obj.generate_doc(
-                    dataframe=df,
-                    sheet_title=event.strip().title(),
-                    report_title=str(category + " - " + event).title(),
-                )
-                if prize_winners:
-                    df2 = read_sql(q3, conn, params=(event, category))
-                    xl_obj.generate_doc(
-                        dataframe=df2,
-                        sheet_title=event.strip().title() + " - Prize Winners",
-                        report_title=str(category + " - " + event).title() + " - Prize Winners",
-                    )
-    def prize_winners_report(self, conn, category: str):
-        query = """
-        --sql
-        SELECT 
-        PARTICIPANT.ADMISSION_NUMBER AS "Admn. No",
-        STUDENT_NAME AS "Name",
-        CLASS AS "Class",
-        DIVISION AS "Division",
-        HOUSE AS "House",
-        RANK AS "Rank",
-        GRADE AS "Grade",
-        TOTAL_MARKS AS "Total Marks",
-        DISQUALIFIED AS "Disqualified"
-        FROM PARTICIPANT, STUDENT
-        WHERE PARTICIPANT.ADMISSION_NUMBER = STUDENT.ADMISSION_NUMBER
-        AND CATEGORY = ?
-        AND EVENT_NAME = ?
-        AND RANK IN ('FIRST', 'SECOND', 'THIRD', 'CONSOLATION')
-        AND EVENT_NAME IS NOT NULL
-        ORDER BY MARKS DESC, STUDENT_NAME ASC;
-        """
-        prize_winners_path = (
-            REPORTS_PATH + category.title() + f"/{category.title()} - Prize Winners.xlsx"
+    def judgement_sheet_columns(self, snapshot: DataFrame) -> DataFrame:
+        sheet_columns = (
+            {**STUDENT_COLUMNS, "ADMISSION_NUMBER": "Admn. No."}
+            | {judge: judge for judge in self.judge_labels.split(", ")}
+            | {
+                "TOTAL_MARKS": "Total Marks",
+                "GRADE": "Grade",
+                "RANK": "Rank",
+                "DISQUALIFIED": "Disqualified",
+                "REMARKS": "Remarks",
+            }
         )
-        
-        
-        
-        with ExcelDataframeWriter(prize_winners_path) as xl_obj:
-            for event in sorted(self.__get_distinct_events_from_category(category)):
-                df = read_sql(query, conn, params=(category, event))
-                xl_obj.generate_doc(
-                    dataframe=df,
-                    sheet_title=event.title() ,
-                    report_title=category.title() + " - Prize Winners"
-                )
+        return snapshot[list(sheet_columns)].rename(columns=sheet_columns)
 
-    def create_judgement_sheets(self, conn, category: str):
-        os.makedirs(REPORTS_PATH + category.title() + "/Judgement Sheets/")
-        query = f"""
-        --sql
-        SELECT STUDENT.ADMISSION_NUMBER as "Admn. No.", 
-        STUDENT_NAME as "Name",
-        CLASS as "Class", 
-        DIVISION as "Division", 
-        HOUSE as "House", 
-        {self.judge_labels.title()}, 
-        TOTAL_MARKS AS "Total Marks",
-        GRADE as "Grade" ,
-        RANK as "Rank",
-        DISQUALIFIED as "Disqualified",
-        REMARKS as "Remarks"
-        FROM STUDENT, PARTICIPANT
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        AND EVENT_NAME = ?
-        AND CATEGORY = ?
-        ORDER BY CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
-        ;
-        """
-        
-        judgement_sheet_path = (
-            REPORTS_PATH
-            + category.title()
-            + "/Judgement Sheets/"
-            + f"{category.title()} - Judgement Sheet.xlsx"
+    def event_participant_count_report(self, category, event_participant_count):
+        plan = self.new_plan("event_participant_count", category)
+        plan.add_sheet(
+            event_participant_count,
+            category.title(),
+            "Event Participant Count - " + category.title(),
         )
-        
+        return plan
 
-        with ExcelDataframeWriter(judgement_sheet_path) as xl_obj:
-            for event in sorted(self.__get_distinct_events_from_category(category)):
-                data = read_sql(query, conn, params=(event, category))
-                xl_obj.generate_doc(
-                    dataframe=data,
-                    sheet_title=event.title(),
-                    report_title=f"{category.title()} - {event.title()}",
-                )
-                
+    def category_reports(self, category, participations: DataFrame):
+        plan = self.new_plan("category_reports", category)
+        students = (
+            participations.groupby("ADMISSION_NUMBER", sort=False)
+            .agg(
+                STUDENT_NAME=("STUDENT_NAME", "first"),
+                CLASS=("CLASS", "first"),
+                DIVISION=("DIVISION", "first"),
+                HOUSE=("HOUSE", "first"),
+                EVENTS=("EVENT_NAME", "  |  ".join),
+            )
+            .reset_index()
+            .rename(columns=STUDENT_COLUMNS | {"EVENTS": "Events"})
+        )
+        events = participations.sort_values("EVENT_NAME", kind="stable")[
+            list(STUDENT_COLUMNS) + ["EVENT_NAME"]
+        ].rename(columns=STUDENT_COLUMNS | {"EVENT_NAME": "Event Name"})
+        statistics = (
+            participations.groupby("EVENT_NAME")
+            .size()
+            .rename("Participant Count")
+            .reset_index()
+            .rename(columns={"EVENT_NAME": "Event Name"})
+        )
+
+        plan.add_sheet(
+            students, f"{category.title()} - Students", category.title() + " - Students"
+        )
+        plan.add_sheet(
+            events, f"{category.title()} - All Events", category.title() + " - Events"
+        )
+        plan.add_sheet(
+            statistics,
+            f"{category.title()} - Statistics",
+            category.title() + " - Statistics",
+        )
+        return plan
+
+    def event_reports(self, category: str, events: dict):
+        plan = self.new_plan("event_reports", category)
+        for event, participants in events.items():
+            plan.add_sheet(
+                participants,
+                event.strip().title(),
+                str(category + " - " + event).title(),
+            )
+        return plan
+
+    def prize_winners_report(self, category: str, events: dict):
+        plan = self.new_plan("prize_winners", category)
+        for event, winners in events.items():
+            plan.add_sheet(winners, event.title(), category.title() + " - Prize Winners")
+        return plan
+
+    def judgement_sheets(self, category: str, events: dict):
+        plan = self.new_plan("judgement_sheets", category)
+        for event, sheet in events.items():
+            plan.add_sheet(
+                sheet,
+                event.title(),
+                f"{category.title()} - {event.title()}",
+            )
+        return plan
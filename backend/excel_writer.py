@@ -1,47 +1,99 @@
-from pandas import DataFrame
-import pandas as pd
+"""
+Writes report sheets with xlsxwriter in constant_memory mode.
+
+Rows are streamed to the sheet one at a time, from a DataFrame or straight from a
+cursor or any other row iterator, and xlsxwriter flushes each row to disk once
+the next one starts, so memory stays flat however large the sheet is. Column
+widths are measured on a bounded sample of the first rows instead of autofit,
+which needs every cell in memory, and formats are created once per workbook.
+A workbook written to a file object instead, eg. for a download, is built in memory.
+"""
+from itertools import chain, islice
+from math import isnan
+from pandas import DataFrame, isna
 import xlsxwriter as xl
 
+WIDTH_SAMPLE_ROWS = 200
+MIN_COLUMN_WIDTH = 8
+MAX_COLUMN_WIDTH = 60
+FORMATS = {
+    "title": {"bold": True, "font_size": 14},
+    "header": {"bold": True, "bottom": 1},
+}
+
+
+def to_cell_value(value):
+    if value is None or (isinstance(value, float) and isnan(value)):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    if isna(value):
+        return None
+    return value
+
+
+def get_column_widths(columns, sample_rows) -> list[int]:
+    widths = [len(str(column)) for column in columns]
+    for row in sample_rows:
+        for number, value in enumerate(row):
+            if value is not None:
+                widths[number] = max(widths[number], len(str(value)))
+    return [min(max(width + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH) for width in widths]
+
 
 class ExcelDataframeWriter:
     def __init__(self, path) -> None:
-        self.writer = pd.ExcelWriter(path, mode="w", engine="xlsxwriter")
+        """path is a file path, or a file object such as BytesIO to write in memory"""
+        if isinstance(path, str):
+            options = {"constant_memory": True}
+        else:
+            options = {"in_memory": True}
+        self.workbook = xl.Workbook(path, options)
+        self.formats = {}
+
+    def get_format(self, name: str):
+        if name not in self.formats:
+            self.formats[name] = self.workbook.add_format(FORMATS[name])
+        return self.formats[name]
 
     def generate_doc(self, dataframe: DataFrame, sheet_title: str, report_title: str):
-        dataframe.to_excel(
-            excel_writer=self.writer,
-            sheet_name=sheet_title,
-            startrow=2,
-            header=False,
-            index=False,
+        self.generate_rows(
+            dataframe.itertuples(index=False, name=None),
+            list(dataframe.columns),
+            sheet_title,
+            report_title,
         )
 
-        column_settings = [{"header": column} for column in dataframe.columns]
-        workbook: xl.Workbook = self.writer.book  # type: ignore
-        worksheet: xl.Workbook.worksheet_class = self.writer.sheets[sheet_title]
-        max_row, max_col = dataframe.shape
+    def generate_rows(self, rows, columns: list, sheet_title: str, report_title: str):
+        """
+        writes a sheet of a title row, a bold header with a filter, and rows, which
+        can be a cursor or any iterator of tuples in the order of columns.
+        """
+        worksheet = self.workbook.add_worksheet(sheet_title)
+        rows = ([to_cell_value(value) for value in row] for row in rows)
+        sample_rows = list(islice(rows, WIDTH_SAMPLE_ROWS))
+        max_col = len(columns)
+
         title = report_title.title()
-        format = workbook.add_format({"bold": True, "font_size": 14})
-        worksheet.merge_range(
-            first_row=0,
-            first_col=0,
-            last_col=max_col - 1,
-            last_row=0,
-            data=title,
-            cell_format=format,
-        )
-        column_settings = [{"header": column} for column in dataframe.columns]
-        worksheet.add_table(
-            1, 0, max_row + 1, max_col - 1, {"columns": column_settings}
-        )
-        worksheet.set_column(0, max_col - 1, 12)
-        worksheet.autofit()
+        if max_col > 1:
+            worksheet.merge_range(0, 0, 0, max_col - 1, title, self.get_format("title"))
+        else:
+            worksheet.write(0, 0, title, self.get_format("title"))
+        worksheet.write_row(1, 0, [str(column) for column in columns], self.get_format("header"))
+
+        last_row = 1
+        for last_row, row in enumerate(chain(sample_rows, rows), start=2):
+            worksheet.write_row(last_row, 0, row)
+
+        worksheet.autofilter(1, 0, last_row, max_col - 1)
+        for number, width in enumerate(get_column_widths(columns, sample_rows)):
+            worksheet.set_column(number, number, width)
 
     def close(self):
-        self.writer.close()
+        self.workbook.close()
 
     def __enter__(self, *args, **kwargs):
         return self
 
     def __exit__(self, *args, **kwargs):
-        self.writer.close()
+        self.workbook.close()
@@ -1,4 +1,4 @@
-from pandas import DataFrame
+from pandas import DataFrame, isna
 import os
 import yaml
 from backend.constants import (
@@ -108,14 +108,19 @@ def get_current_database_path():
 
 
 def delete_database_permanent():
+    from backend.sqlite_connections import close_connections
+
     database_path = get_current_database_path()
+    close_connections(database_path)
     os.remove(database_path)
 
 
 def archive_database():
     from shutil import move
+    from backend.sqlite_connections import close_connections
 
     database_path = DATABASE_DIRECTORY_PATH + str(get_current_database_name())
+    close_connections(database_path)
     new_path = SAVED_DATABASES_DIRECTORY_PATH
     move(database_path, new_path)
 
@@ -131,6 +136,9 @@ def push_edits_to_users_yaml(df):
             "password": dictionary["password"][index],
             "user_type": dictionary["user_type"][index],
         }
+        judge_id = dictionary.get("judge_id", {}).get(index)
+        if not isna(judge_id):
+            final_dict[dictionary["username"][index]]["judge_id"] = int(judge_id)
 
     with open(INTERNALS_PATH + "users.yaml", "w") as file:
         dump(final_dict, file)
@@ -154,6 +162,7 @@ def get_user_data_as_dataframe():
         "name": [data[username]["name"] for username in data],
         "password": [data[username]["password"] for username in data],
         "user_type": [data[username]["user_type"] for username in data],
+        "judge_id": [data[username].get("judge_id") for username in data],
     }
     return DataFrame(nd)
 
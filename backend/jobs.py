@@ -0,0 +1,278 @@
+"""
+Background jobs for report, result and certificate generation.
+
+Generation is queued to a pool of JOB_WORKERS threads owned by the server process
+instead of running inside a Streamlit script, so it keeps going through reruns and
+closed tabs, and many admins can queue work without waiting for each other. Jobs
+writing the same output directory run one after another: a job is handed to the
+pool only once the jobs queued before it for its directories have finished, so it
+never holds a worker while it waits.
+
+The state of every job is kept in memory for the jobs page to poll, and saved as
+one JSON file per job under JOBS_DIRECTORY_PATH, at most every
+JOB_SAVE_INTERVAL_SECONDS while it runs, so the history survives a restart of the
+server. Jobs that were queued or running when the server stopped are marked
+interrupted. A job is cancelled between two of its steps. A job records the
+database that was current when it was queued, and fails instead of running if
+another database has been made current by the time its turn comes.
+"""
+import json
+import os
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from time import monotonic
+from uuid import uuid4
+from backend.constants import (
+    CERTIFICATES_PATH,
+    JOB_SAVE_INTERVAL_SECONDS,
+    JOB_WORKERS,
+    JOBS_DIRECTORY_PATH,
+    REPORTS_PATH,
+    RESULTS_PATH,
+)
+from backend.file_operations import get_current_database_path
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+FINISHED = (DONE, FAILED, CANCELLED, INTERRUPTED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class DatabaseChanged(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    kind: str
+    title: str
+    parameters: dict
+    submitted_by: str
+    id: str = field(default_factory=lambda: uuid4().hex[:12])
+    status: str = QUEUED
+    done: int = 0
+    total: int = 0
+    step: str = ""
+    error: str = ""
+    submitted_at: str = field(default_factory=lambda: now())
+    started_at: str = ""
+    finished_at: str = ""
+    cancel_requested: bool = False
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+
+def now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def generate_reports(job, on_progress):
+    from backend.documents_generator import ReportGenerator
+
+    ReportGenerator(
+        category_based_report_needed=job.parameters.get("category_based_report_needed", True),
+        judgement_sheets_needed=job.parameters.get("judgement_sheets_needed", True),
+        prize_winners_report_needed=job.parameters.get("prize_winners_report_needed", False),
+        output_format=job.parameters.get("output_format", "xlsx"),
+    ).generate_reports(on_progress)
+
+
+def generate_results(job, on_progress):
+    from backend.ResultsGenerator import ResultsGenerator
+
+    ResultsGenerator().generate(
+        job.parameters.get("gen_all_certificates", False), on_progress
+    )
+
+
+def generate_certificates(job, on_progress):
+    from backend.ResultsGenerator import CertificateGenerator
+
+    CertificateGenerator().write_all_certificates(
+        job.parameters.get("category"), job.parameters.get("event"), on_progress
+    )
+
+
+# kind: (function(job, on_progress), the output directories it writes)
+JOB_KINDS = {
+    "reports": (generate_reports, lambda parameters: [REPORTS_PATH]),
+    "results": (
+        generate_results,
+        lambda parameters: [RESULTS_PATH]
+        + ([CERTIFICATES_PATH] if parameters.get("gen_all_certificates") else []),
+    ),
+    "certificates": (generate_certificates, lambda parameters: [CERTIFICATES_PATH]),
+}
+
+
+class JobRunner:
+    def __init__(self, workers: int = JOB_WORKERS) -> None:
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.jobs: dict[str, Job] = {}
+        # a job's future is set running when a worker starts it, and done when it finishes
+        self.futures: dict[str, Future] = {}
+        # the future of the job queued last for each output directory
+        self.last_writers: dict[str, Future] = {}
+        self.saved_at: dict[str, float] = {}
+        self.__load()
+
+    def submit(self, kind: str, title: str, submitted_by: str, **parameters) -> Job:
+        """
+        queues a job against the current database, or returns the same job if it is
+        already queued
+        """
+        parameters["database_path"] = get_current_database_path()
+        with self.lock:
+            for job in self.jobs.values():
+                if job.status == QUEUED and (job.kind, job.parameters) == (kind, parameters):
+                    return job
+            job = Job(kind, title, parameters, submitted_by)
+            self.jobs[job.id] = job
+            self.__save(job)
+            future = self.futures[job.id] = Future()
+            previous = set()
+            for path in JOB_KINDS[kind][1](parameters):
+                path = os.path.normpath(path)
+                if path in self.last_writers:
+                    previous.add(self.last_writers[path])
+                self.last_writers[path] = future
+        self.__start_after(job, future, previous)
+        return job
+
+    def __start_after(self, job: Job, future: Future, previous: set[Future]):
+        """hands job to the pool once every future in previous is done"""
+        waiting = set(previous)
+        waiting_lock = threading.Lock()
+
+        def on_done(done_future):
+            with waiting_lock:
+                waiting.discard(done_future)
+                ready = not waiting
+            if ready:
+                self.executor.submit(self.__start, job, future)
+
+        if not previous:
+            self.executor.submit(self.__start, job, future)
+        for previous_future in previous:
+            previous_future.add_done_callback(on_done)
+
+    def cancel(self, job_id: str):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return
+            job.cancel_requested = True
+            if not self.futures[job_id].running():
+                # its future stays pending, so the jobs after it still wait for those before it
+                self.__finish(job, CANCELLED)
+
+    def list_jobs(self) -> list[Job]:
+        """copies of every job, latest first"""
+        with self.lock:
+            jobs = [Job(**asdict(job)) for job in self.jobs.values()]
+        return sorted(jobs, key=lambda job: job.submitted_at, reverse=True)
+
+    def clear_finished(self):
+        with self.lock:
+            for job in [job for job in self.jobs.values() if job.status in FINISHED]:
+                del self.jobs[job.id]
+                self.futures.pop(job.id, None)
+                self.saved_at.pop(job.id, None)
+                try:
+                    os.remove(self.__path(job.id))
+                except OSError:
+                    pass
+
+    def __start(self, job: Job, future: Future):
+        """runs job in a worker, unless it was cancelled while it waited for its turn"""
+        with self.lock:
+            cancelled = job.status == CANCELLED
+            if not cancelled:
+                future.set_running_or_notify_cancel()
+        try:
+            if not cancelled:
+                self.__run(job)
+        finally:
+            future.set_result(None)
+
+    def __run(self, job: Job):
+        function = JOB_KINDS[job.kind][0]
+        try:
+            with self.lock:
+                if job.cancel_requested:
+                    raise JobCancelled()
+                if job.parameters.get("database_path") != get_current_database_path():
+                    raise DatabaseChanged(
+                        "The current database changed after this job was queued, "
+                        "queue it again to run it on the current database."
+                    )
+                job.status, job.started_at, job.step = RUNNING, now(), "Starting"
+                self.__save(job)
+
+            def on_progress(done, total, step):
+                with self.lock:
+                    if job.cancel_requested:
+                        raise JobCancelled()
+                    job.done, job.total, job.step = done, total, str(step)
+                    if monotonic() - self.saved_at.get(job.id, 0) >= JOB_SAVE_INTERVAL_SECONDS:
+                        self.__save(job)
+
+            function(job, on_progress)
+            status = DONE
+        except JobCancelled:
+            status = CANCELLED
+        except DatabaseChanged as error:
+            job.error = str(error)
+            status = FAILED
+        except Exception:
+            job.error = traceback.format_exc(limit=5)
+            status = FAILED
+        with self.lock:
+            self.__finish(job, status)
+
+    def __finish(self, job: Job, status: str):
+        job.status, job.finished_at = status, now()
+        self.__save(job)
+
+    def __path(self, job_id: str) -> str:
+        return os.path.join(JOBS_DIRECTORY_PATH, f"{job_id}.json")
+
+    def __save(self, job: Job):
+        os.makedirs(JOBS_DIRECTORY_PATH, exist_ok=True)
+        path = self.__path(job.id)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(asdict(job), file)
+        os.replace(path + ".tmp", path)
+        self.saved_at[job.id] = monotonic()
+
+    def __load(self):
+        """the jobs of earlier runs of the server; those it did not finish are interrupted"""
+        if not os.path.isdir(JOBS_DIRECTORY_PATH):
+            return
+        for file in os.listdir(JOBS_DIRECTORY_PATH):
+            if not file.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(JOBS_DIRECTORY_PATH, file), encoding="utf-8") as job_file:
+                    job = Job(**json.load(job_file))
+            except (OSError, ValueError, TypeError):
+                continue
+            self.jobs[job.id] = job
+            if job.status not in FINISHED:
+                self.__finish(job, INTERRUPTED)
+
+
+JOB_RUNNER = JobRunner()
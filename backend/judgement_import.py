@@ -0,0 +1,358 @@
+"""
+Import of judgement sheet workbooks filled in offline by the judges.
+
+Accepts the sheets exported by the report and results generators: any number of
+workbooks, each with one event per worksheet. Workbooks are streamed row by row
+in openpyxl's read-only mode, the marks of every sheet are validated together
+and all events are written and rescored in one transaction.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from backend.database_writer import submit_write
+from backend.queries import execute, execute_many, fetch_all, read_cursor_dataframe
+from backend.scoring import CONSOLATION, score_judgements
+from backend.submit_functions import to_sql_value
+
+
+HEADER_SEARCH_ROWS = 5
+ADMISSION_NUMBER_HEADERS = {"admnno", "admissionnumber"}
+TRUE_VALUES = {"true", "1", "yes", "y"}
+FALSE_VALUES = {"false", "0", "no", "n"}
+
+
+def normalize_header(value) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(value).casefold()) if value is not None else ""
+
+
+def normalize_admission_number(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() if value is not None else ""
+
+
+def parse_disqualified(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    text = str(value).strip().casefold()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    return None
+
+
+@dataclass
+class JudgementImportReport:
+    """marks read from the workbooks, the sheets they came from, and the rows and sheets that were skipped"""
+
+    judge_labels: list[str]
+    marks: pd.DataFrame = field(default_factory=pd.DataFrame)
+    sheets: list[dict] = field(default_factory=list)
+    errors: list[dict] = field(default_factory=list)
+
+    def add_errors(self, rows: pd.DataFrame, reason: str):
+        self.errors.extend(
+            {
+                "file": rec["FILE"],
+                "sheet": rec["SHEET"],
+                "row": rec["ROW"],
+                "admission_number": rec["ADMISSION_NUMBER"],
+                "reason": reason,
+            }
+            for rec in rows.to_dict(orient="records")
+        )
+
+    def add_sheet_error(self, file_name: str, sheet_name: str, reason: str):
+        self.errors.append(
+            {
+                "file": file_name,
+                "sheet": sheet_name,
+                "row": None,
+                "admission_number": None,
+                "reason": reason,
+            }
+        )
+
+    def errors_dataframe(self):
+        return pd.DataFrame(
+            self.errors, columns=["file", "sheet", "row", "admission_number", "reason"]
+        )
+
+    def sheets_dataframe(self):
+        return pd.DataFrame(self.sheets, columns=["file", "sheet", "event", "rows"])
+
+
+class EventMatcher:
+    """
+    finds the event of a worksheet from its title, ignoring case and punctuation;
+    titles cut to Excel's 31 characters match the one event they are a prefix of.
+    """
+
+    def __init__(self, events: list[str]) -> None:
+        self.events = {normalize_header(event): event for event in events}
+
+    def match(self, sheet_title: str):
+        title = normalize_header(sheet_title)
+        if title in self.events:
+            return self.events[title]
+        candidates = [
+            event for key, event in self.events.items() if title and key.startswith(title)
+        ]
+        return candidates[0] if len(candidates) == 1 else None
+
+
+def read_worksheet_rows(worksheet, judge_ids: dict, report, file_name, event):
+    """
+    yields one record per filled row below the header row of the worksheet.
+    judge_ids maps judge numbers to JUDGE labels of the database.
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    columns = None
+    for row_number, row in enumerate(rows, start=1):
+        headers = [normalize_header(value) for value in row]
+        if any(header in ADMISSION_NUMBER_HEADERS for header in headers):
+            columns = headers
+            break
+        if row_number >= HEADER_SEARCH_ROWS:
+            break
+    if columns is None:
+        report.add_sheet_error(file_name, worksheet.title, "no admission number header row")
+        return
+
+    admission_column = next(
+        index for index, header in enumerate(columns) if header in ADMISSION_NUMBER_HEADERS
+    )
+    judge_columns = {}
+    for index, header in enumerate(columns):
+        judge = re.fullmatch(r"judge(\d+)", header)
+        if judge is None:
+            continue
+        if int(judge.group(1)) not in judge_ids:
+            report.add_sheet_error(
+                file_name, worksheet.title, f"the database has no {header.upper()}"
+            )
+            return
+        if judge_ids[int(judge.group(1))] in judge_columns.values():
+            report.add_sheet_error(file_name, worksheet.title, f"{header.upper()} appears twice")
+            return
+        judge_columns[index] = judge_ids[int(judge.group(1))]
+    if not judge_columns:
+        report.add_sheet_error(file_name, worksheet.title, "no JUDGE columns")
+        return
+    disqualified_column = columns.index("disqualified") if "disqualified" in columns else None
+    remarks_column = columns.index("remarks") if "remarks" in columns else None
+
+    for row_number, row in enumerate(rows, start=row_number + 1):
+        if admission_column >= len(row) or row[admission_column] in (None, ""):
+            continue
+        record = {
+            "FILE": file_name,
+            "SHEET": worksheet.title,
+            "ROW": row_number,
+            "ADMISSION_NUMBER": normalize_admission_number(row[admission_column]),
+            "EVENT_NAME": event,
+            "DISQUALIFIED": None,
+            "REMARKS": None,
+        }
+        for index, label in judge_columns.items():
+            record[label] = row[index] if index < len(row) else None
+        if disqualified_column is not None and disqualified_column < len(row):
+            record["DISQUALIFIED"] = parse_disqualified(row[disqualified_column])
+        if remarks_column is not None and remarks_column < len(row):
+            remarks = row[remarks_column]
+            record["REMARKS"] = None if remarks is None else str(remarks)
+        yield record
+
+
+def read_judgement_workbooks(
+    files,
+    events: list[str],
+    number_of_judges: int,
+    max_marks_for_each_judge,
+    file_path=None,
+) -> JudgementImportReport:
+    """
+    reads every worksheet of the uploaded workbooks. rows with marks that are not
+    numbers, outside 0 to max_marks_for_each_judge, of students who are not
+    participants of the sheet's event, or repeated for the same event are
+    collected in the report instead of stopping the import.
+    """
+    judge_ids = {number: f"JUDGE{number}" for number in range(1, number_of_judges + 1)}
+    report = JudgementImportReport(judge_labels=list(judge_ids.values()))
+    matcher = EventMatcher(events)
+    records = []
+    for file in files:
+        file_name = getattr(file, "name", str(file))
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                event = matcher.match(worksheet.title)
+                if event is None:
+                    report.add_sheet_error(
+                        file_name, worksheet.title, "the sheet name is not an event"
+                    )
+                    continue
+                sheet_records = list(
+                    read_worksheet_rows(worksheet, judge_ids, report, file_name, event)
+                )
+                records.extend(sheet_records)
+                report.sheets.append(
+                    {
+                        "file": file_name,
+                        "sheet": worksheet.title,
+                        "event": event,
+                        "rows": len(sheet_records),
+                    }
+                )
+        finally:
+            workbook.close()
+
+    marks = pd.DataFrame(
+        records,
+        columns=["FILE", "SHEET", "ROW", "ADMISSION_NUMBER", "EVENT_NAME"]
+        + report.judge_labels
+        + ["DISQUALIFIED", "REMARKS"],
+    )
+    report.marks = validate_marks(marks, report, max_marks_for_each_judge, file_path)
+    return report
+
+
+def validate_marks(
+    marks: pd.DataFrame,
+    report: JudgementImportReport,
+    max_marks_for_each_judge,
+    file_path=None,
+) -> pd.DataFrame:
+    judge_labels = report.judge_labels
+    raw = marks[judge_labels]
+    numeric = raw.apply(pd.to_numeric, errors="coerce")
+    blank = raw.isna() | raw.apply(lambda column: column.astype(str).str.strip() == "")
+
+    not_a_number = (numeric.isna() & ~blank).any(axis=1)
+    report.add_errors(marks[not_a_number], "marks are not a number")
+
+    out_of_range = (
+        (numeric < 0) | (numeric > max_marks_for_each_judge)
+    ).any(axis=1) & ~not_a_number
+    report.add_errors(
+        marks[out_of_range], f"marks must be between 0 and {max_marks_for_each_judge}"
+    )
+
+    participations = pd.DataFrame(
+        fetch_all("participations", file_path=file_path),
+        columns=["ADMISSION_NUMBER", "EVENT_NAME"],
+    )
+    keys = pd.MultiIndex.from_frame(marks[["ADMISSION_NUMBER", "EVENT_NAME"]])
+    not_participant = ~keys.isin(pd.MultiIndex.from_frame(participations))
+    report.add_errors(marks[not_participant], "not a participant of the event")
+
+    repeated = marks.duplicated(["ADMISSION_NUMBER", "EVENT_NAME"], keep=False)
+    report.add_errors(marks[repeated], "appears more than once for the event")
+
+    valid = ~(not_a_number | out_of_range | not_participant | repeated)
+    marks = marks[valid].copy()
+    marks[judge_labels] = numeric[valid]
+    return marks.reset_index(drop=True)
+
+
+def import_judgement_marks(
+    report: JudgementImportReport, file_path=None
+) -> tuple[int, int]:
+    """
+    writes the valid marks of the report, then rescores every category/event they
+    touched whose marks are now complete, all in one transaction. consolation is
+    kept for events that already awarded it. returns the number of marks written
+    and of events rescored.
+    """
+    marks = report.marks
+    judge_labels = report.judge_labels
+    judge_marks = (
+        marks.melt(
+            id_vars=["ADMISSION_NUMBER", "EVENT_NAME"],
+            value_vars=judge_labels,
+            var_name="JUDGE_ID",
+            value_name="MARKS",
+        )
+        .dropna(subset=["MARKS"])
+        .assign(JUDGE_ID=lambda df: df["JUDGE_ID"].str.removeprefix("JUDGE").astype(int))
+    )
+    mark_rows = [
+        (admission_number, event, judge_id, to_sql_value(mark))
+        for admission_number, event, judge_id, mark in judge_marks.itertuples(index=False)
+    ]
+    disqualified = marks.dropna(subset=["DISQUALIFIED"])
+    remarks = marks.dropna(subset=["REMARKS"])
+    events = sorted(marks["EVENT_NAME"].unique().tolist())
+
+    def write(cursor):
+        execute_many(cursor, "upsert_judge_mark", mark_rows)
+        execute_many(
+            cursor,
+            "update_participant_disqualified",
+            disqualified[["DISQUALIFIED", "ADMISSION_NUMBER", "EVENT_NAME"]].itertuples(
+                index=False, name=None
+            ),
+        )
+        execute_many(
+            cursor,
+            "update_participant_remarks",
+            remarks[["REMARKS", "ADMISSION_NUMBER", "EVENT_NAME"]].itertuples(
+                index=False, name=None
+            ),
+        )
+        return rescore_complete_events(cursor, events, judge_labels)
+
+    rescored = submit_write(write, file_path).result() if events else 0
+    return len(mark_rows), rescored
+
+
+def rescore_complete_events(cursor, events: list[str], judge_labels: list[str]) -> int:
+    sheets = read_cursor_dataframe(
+        cursor,
+        "judgement_sheets_of_events",
+        (json.dumps(events),),
+        judge_columns=", ".join(judge_labels),
+    )
+    groups = [sheets["CATEGORY"], sheets["EVENT_NAME"]]
+    incomplete = sheets[judge_labels].isna().any(axis=1).groupby(groups).transform("any")
+    sheets = sheets[~incomplete]
+    if sheets.empty:
+        return 0
+
+    _, _, min_marks_for_prize = execute(cursor, "judging_parameters").fetchone()
+    grade_minmarks = dict(execute(cursor, "grade_marks_ascending").fetchall())
+    consolation_allowed = (
+        (sheets["RANK"] == CONSOLATION)
+        .groupby([sheets["CATEGORY"], sheets["EVENT_NAME"]])
+        .transform("any")
+        .to_numpy()
+    )
+    scored = score_judgements(
+        sheets,
+        judge_labels,
+        grade_minmarks,
+        min_marks_for_prize,
+        consolation_allowed,
+        by=["CATEGORY", "EVENT_NAME"],
+    )
+    changed = np.zeros(len(sheets), dtype=bool)
+    for column in ["GRADE", "RANK"]:
+        same = (scored[column] == sheets[column]) | (
+            scored[column].isna() & sheets[column].isna()
+        )
+        changed |= ~same.to_numpy()
+    execute_many(
+        cursor,
+        "update_participant_grade_rank",
+        [
+            (to_sql_value(grade), to_sql_value(rank), admission_number, event)
+            for grade, rank, admission_number, event in scored.loc[
+                changed, ["GRADE", "RANK", "ADMISSION_NUMBER", "EVENT_NAME"]
+            ].itertuples(index=False)
+        ],
+    )
+    return int(sheets.groupby(["CATEGORY", "EVENT_NAME"]).ngroups)
@@ -0,0 +1,161 @@
+"""
+Autosave journal of the judgement sheets that are being edited.
+
+Every cell edit of a sheet is appended as one JSON line to a journal file of its
+database, category, event and key column, keyed by the row's ADMISSION_NUMBER (or
+HOUSE for group events) so it survives reordering of the sheet, and the individual
+and group sheets of an event never share a journal. Appends are queued to one
+background thread, so typing never waits for the disk. When the sheet is opened
+again the journal is replayed onto it and rewritten with only the latest value of
+each cell; it is removed once the sheet is submitted. A journal file that cannot
+be written is reported by the page instead of losing the edits silently.
+"""
+import json
+import os
+import threading
+from hashlib import sha1
+from queue import Queue
+from pandas import DataFrame, Series, isna
+from backend.constants import JOURNAL_DIRECTORY_PATH
+
+
+class JournalWriter:
+    """a daemon thread applying queued appends, rewrites and removals of journal files in order"""
+
+    def __init__(self) -> None:
+        self.requests: Queue = Queue()
+        # path -> the error of its last failed request, until a request on it succeeds
+        self.errors: dict[str, str] = {}
+        self.thread = threading.Thread(
+            target=self.__run, name="judgement-journal", daemon=True
+        )
+        self.thread.start()
+
+    def append(self, path: str, lines: list[str]):
+        self.requests.put(("a", path, lines))
+
+    def rewrite(self, path: str, lines: list[str]):
+        self.requests.put(("w", path, lines))
+
+    def remove(self, path: str):
+        self.requests.put(("remove", path, None))
+
+    def flush(self):
+        """wait until every queued request has been written"""
+        self.requests.join()
+
+    def __run(self):
+        while True:
+            mode, path, lines = self.requests.get()
+            try:
+                if mode == "remove":
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, mode, encoding="utf-8") as file:
+                        file.writelines(lines)
+                self.errors.pop(path, None)
+            except OSError as error:
+                self.errors[path] = str(error)
+            finally:
+                self.requests.task_done()
+
+
+JOURNAL_WRITER = JournalWriter()
+
+
+def to_json_value(value):
+    if isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def is_same_value(a, b) -> bool:
+    return (isna(a) and isna(b)) or (not isna(a) and not isna(b) and a == b)
+
+
+class JudgementJournal:
+    def __init__(self, database_path: str, category, event, key_column: str) -> None:
+        digest = sha1(f"{category}\x1f{event}\x1f{key_column}".encode()).hexdigest()[:16]
+        self.path = os.path.join(
+            JOURNAL_DIRECTORY_PATH, os.path.basename(database_path), digest + ".jsonl"
+        )
+        self.key_column = key_column
+        self.dataframe: DataFrame | None = None
+        self.recorded_rows: dict[int, dict] = {}
+
+    def replay(self, dataframe: DataFrame) -> DataFrame:
+        """
+        a copy of the sheet with the journaled edits applied; the journal is then
+        compacted to the latest value of each cell and new edits are recorded
+        relative to the returned sheet.
+        """
+        JOURNAL_WRITER.flush()
+        cells = self.__read()
+        sheet = dataframe.copy()
+        rows = {key: position for position, key in enumerate(sheet[self.key_column])}
+        for column in {column for _, column in cells}:
+            if column not in sheet.columns:
+                continue
+            values = sheet[column].to_numpy(dtype=object).copy()
+            for (key, cell_column), value in cells.items():
+                if cell_column == column and key in rows:
+                    values[rows[key]] = value
+            sheet[column] = Series(values, index=sheet.index).infer_objects()
+
+        if cells:
+            JOURNAL_WRITER.rewrite(
+                self.path,
+                [self.__line(key, column, value) for (key, column), value in cells.items()],
+            )
+        self.dataframe = sheet
+        self.recorded_rows = {}
+        return sheet
+
+    def record(self, edited_rows: dict):
+        """appends the cells whose value changed since the previous `edited_rows` of the editor"""
+        edited_rows = {int(position): edits for position, edits in edited_rows.items()}
+        lines = []
+        for position in set(edited_rows) | set(self.recorded_rows):
+            edits = edited_rows.get(position, {})
+            recorded = self.recorded_rows.get(position, {})
+            for column in set(edits) | set(recorded):
+                value = self.__value(position, column, edits)
+                if not is_same_value(value, self.__value(position, column, recorded)):
+                    key = self.dataframe[self.key_column].iat[position]
+                    lines.append(self.__line(key, column, value))
+        self.recorded_rows = {position: dict(edits) for position, edits in edited_rows.items()}
+        if lines:
+            JOURNAL_WRITER.append(self.path, lines)
+
+    @property
+    def error(self) -> str | None:
+        """why the last write of the journal failed, if it did"""
+        return JOURNAL_WRITER.errors.get(self.path)
+
+    def clear(self):
+        self.recorded_rows = {}
+        JOURNAL_WRITER.remove(self.path)
+
+    def __value(self, position: int, column: str, edits: dict):
+        if column in edits:
+            return edits[column]
+        return self.dataframe[column].iat[position]
+
+    @staticmethod
+    def __line(key, column, value) -> str:
+        return json.dumps({"k": to_json_value(key), "c": column, "v": to_json_value(value)}) + "\n"
+
+    def __read(self) -> dict[tuple, object]:
+        cells = {}
+        if not os.path.exists(self.path):
+            return cells
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                cells[(entry["k"], entry["c"])] = entry["v"]
+        return cells
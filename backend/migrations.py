@@ -0,0 +1,735 @@
+"""
+Schema migrations for eventpro databases.
+
+Every database carries its schema version in `PRAGMA user_version`. Each entry of
+MIGRATIONS upgrades a database by one version, so the version of a database is
+the number of migrations already applied to it. Pending migrations run in one
+transaction the first time a database is opened by the process.
+"""
+import os
+import sqlite3
+import threading
+from backend.constants import DEFAULT_STANDING_POINTS
+
+
+def add_covering_indexes(cursor: sqlite3.Cursor):
+    """indexes for the category/event and event/rank access paths of the reports and judgement pages"""
+    cursor.execute(
+        """
+        --sql
+        CREATE INDEX IF NOT EXISTS STUDENT_CATEGORY_INDEX
+        ON STUDENT (CATEGORY, ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE)
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE INDEX IF NOT EXISTS PARTICIPANT_EVENT_INDEX
+        ON PARTICIPANT (EVENT_NAME, ADMISSION_NUMBER)
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE INDEX IF NOT EXISTS PARTICIPANT_EVENT_RANK_INDEX
+        ON PARTICIPANT (EVENT_NAME, RANK, ADMISSION_NUMBER, TOTAL_MARKS, GRADE, DISQUALIFIED)
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE INDEX IF NOT EXISTS EVENT_NAME_INDEX
+        ON EVENT_NAME (EVENT_NAME)
+        ;
+        """
+    )
+    cursor.execute("ANALYZE")
+
+
+def create_participant_view(cursor: sqlite3.Cursor, number_of_judges: int):
+    """
+    (re)creates PARTICIPANT as a view over PARTICIPANT_ENTRY and JUDGE_MARK with one
+    JUDGE{n} column per judge and TOTAL_MARKS summed from the marks, in the column
+    order of the former PARTICIPANT table. INSTEAD OF triggers route inserts,
+    updates and deletes on the view to the underlying tables.
+    """
+    judge_ids = range(1, number_of_judges + 1)
+    mark_of_entry = """
+        JUDGE_MARK.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+        AND JUDGE_MARK.EVENT_NAME = PARTICIPANT_ENTRY.EVENT_NAME"""
+    judge_columns = "".join(
+        f"""
+        (SELECT MARKS FROM JUDGE_MARK WHERE {mark_of_entry}
+        AND JUDGE_ID = {judge_id}) AS JUDGE{judge_id},"""
+        for judge_id in judge_ids
+    )
+    insert_marks = "".join(
+        f"""
+        INSERT INTO JUDGE_MARK (ADMISSION_NUMBER, EVENT_NAME, JUDGE_ID, MARKS)
+        SELECT NEW.ADMISSION_NUMBER, NEW.EVENT_NAME, {judge_id}, NEW.JUDGE{judge_id}
+        WHERE NEW.JUDGE{judge_id} IS NOT NULL;"""
+        for judge_id in judge_ids
+    )
+    update_marks = "".join(
+        f"""
+        INSERT INTO JUDGE_MARK (ADMISSION_NUMBER, EVENT_NAME, JUDGE_ID, MARKS)
+        SELECT NEW.ADMISSION_NUMBER, NEW.EVENT_NAME, {judge_id}, NEW.JUDGE{judge_id}
+        WHERE NEW.JUDGE{judge_id} IS NOT NULL AND NEW.JUDGE{judge_id} IS NOT OLD.JUDGE{judge_id}
+        ON CONFLICT (ADMISSION_NUMBER, EVENT_NAME, JUDGE_ID) DO UPDATE SET MARKS = excluded.MARKS;
+        DELETE FROM JUDGE_MARK
+        WHERE NEW.JUDGE{judge_id} IS NULL
+        AND ADMISSION_NUMBER = NEW.ADMISSION_NUMBER
+        AND EVENT_NAME = NEW.EVENT_NAME
+        AND JUDGE_ID = {judge_id};"""
+        for judge_id in judge_ids
+    )
+
+    cursor.execute("DROP VIEW IF EXISTS PARTICIPANT")
+    cursor.execute(
+        f"""
+        --sql
+        CREATE VIEW PARTICIPANT AS
+        SELECT PARTICIPANT_ENTRY.ADMISSION_NUMBER,
+        PARTICIPANT_ENTRY.EVENT_NAME,{judge_columns}
+        (SELECT SUM(MARKS) FROM JUDGE_MARK WHERE {mark_of_entry}
+        AND JUDGE_ID <= {number_of_judges}) AS TOTAL_MARKS,
+        PARTICIPANT_ENTRY.GRADE,
+        PARTICIPANT_ENTRY.RANK,
+        PARTICIPANT_ENTRY.DISQUALIFIED,
+        PARTICIPANT_ENTRY.REMARKS
+        FROM PARTICIPANT_ENTRY
+        ;
+        """
+    )
+    cursor.execute(
+        f"""
+        --sql
+        CREATE TRIGGER PARTICIPANT_INSERT INSTEAD OF INSERT ON PARTICIPANT
+        BEGIN
+        INSERT INTO PARTICIPANT_ENTRY (ADMISSION_NUMBER, EVENT_NAME, GRADE, RANK, DISQUALIFIED, REMARKS)
+        VALUES (
+            NEW.ADMISSION_NUMBER, NEW.EVENT_NAME, NEW.GRADE, NEW.RANK,
+            COALESCE(NEW.DISQUALIFIED, 0), COALESCE(NEW.REMARKS, '')
+        );{insert_marks}
+        END
+        ;
+        """
+    )
+    cursor.execute(
+        f"""
+        --sql
+        CREATE TRIGGER PARTICIPANT_UPDATE INSTEAD OF UPDATE ON PARTICIPANT
+        BEGIN
+        UPDATE JUDGE_MARK
+        SET ADMISSION_NUMBER = NEW.ADMISSION_NUMBER, EVENT_NAME = NEW.EVENT_NAME
+        WHERE ADMISSION_NUMBER = OLD.ADMISSION_NUMBER
+        AND EVENT_NAME = OLD.EVENT_NAME
+        AND (NEW.ADMISSION_NUMBER IS NOT OLD.ADMISSION_NUMBER OR NEW.EVENT_NAME IS NOT OLD.EVENT_NAME);
+        UPDATE PARTICIPANT_ENTRY
+        SET ADMISSION_NUMBER = NEW.ADMISSION_NUMBER,
+        EVENT_NAME = NEW.EVENT_NAME,
+        GRADE = NEW.GRADE,
+        RANK = NEW.RANK,
+        DISQUALIFIED = NEW.DISQUALIFIED,
+        REMARKS = NEW.REMARKS
+        WHERE ADMISSION_NUMBER = OLD.ADMISSION_NUMBER
+        AND EVENT_NAME = OLD.EVENT_NAME;{update_marks}
+        END
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE TRIGGER PARTICIPANT_DELETE INSTEAD OF DELETE ON PARTICIPANT
+        BEGIN
+        DELETE FROM JUDGE_MARK
+        WHERE ADMISSION_NUMBER = OLD.ADMISSION_NUMBER
+        AND EVENT_NAME = OLD.EVENT_NAME;
+        DELETE FROM PARTICIPANT_ENTRY
+        WHERE ADMISSION_NUMBER = OLD.ADMISSION_NUMBER
+        AND EVENT_NAME = OLD.EVENT_NAME;
+        END
+        ;
+        """
+    )
+
+
+def move_judge_marks_to_judge_mark_table(cursor: sqlite3.Cursor):
+    """
+    splits the wide PARTICIPANT table into PARTICIPANT_ENTRY and a long-format
+    JUDGE_MARK table with one row per judge per participant, and replaces
+    PARTICIPANT with a compatibility view.
+    """
+    cursor.execute("PRAGMA table_info(PARTICIPANT)")
+    judge_ids = sorted(
+        int(column[1].removeprefix("JUDGE"))
+        for column in cursor.fetchall()
+        if column[1].startswith("JUDGE")
+    )
+    cursor.execute("SELECT NUMBER_OF_JUDGES FROM PARAMETER")
+    parameter = cursor.fetchone()
+    number_of_judges = max(judge_ids + [parameter[0] if parameter else 0])
+
+    cursor.execute(
+        """
+        --sql
+        CREATE TABLE JUDGE_MARK(
+            ADMISSION_NUMBER TEXT,
+            EVENT_NAME TEXT,
+            JUDGE_ID INT,
+            MARKS INT,
+            PRIMARY KEY(ADMISSION_NUMBER, EVENT_NAME, JUDGE_ID)
+        )
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE INDEX JUDGE_MARK_EVENT_INDEX
+        ON JUDGE_MARK (EVENT_NAME, JUDGE_ID)
+        ;
+        """
+    )
+    for judge_id in judge_ids:
+        cursor.execute(
+            f"""
+            --sql
+            INSERT INTO JUDGE_MARK (ADMISSION_NUMBER, EVENT_NAME, JUDGE_ID, MARKS)
+            SELECT ADMISSION_NUMBER, EVENT_NAME, {judge_id}, JUDGE{judge_id}
+            FROM PARTICIPANT
+            WHERE JUDGE{judge_id} IS NOT NULL
+            ;
+            """
+        )
+
+    cursor.execute(
+        """
+        --sql
+        CREATE TABLE PARTICIPANT_ENTRY(
+            ADMISSION_NUMBER TEXT,
+            EVENT_NAME TEXT,
+            GRADE INT,
+            RANK TEXT,
+            DISQUALIFIED BOOLEAN DEFAULT 0,
+            REMARKS TEXT DEFAULT "",
+            PRIMARY KEY(ADMISSION_NUMBER, EVENT_NAME)
+        )
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        INSERT INTO PARTICIPANT_ENTRY
+        SELECT ADMISSION_NUMBER, EVENT_NAME, GRADE, RANK, DISQUALIFIED, REMARKS
+        FROM PARTICIPANT
+        ;
+        """
+    )
+    cursor.execute("DROP TABLE PARTICIPANT")
+    cursor.execute(
+        """
+        --sql
+        CREATE INDEX PARTICIPANT_ENTRY_EVENT_INDEX
+        ON PARTICIPANT_ENTRY (EVENT_NAME, ADMISSION_NUMBER)
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE INDEX PARTICIPANT_ENTRY_EVENT_RANK_INDEX
+        ON PARTICIPANT_ENTRY (EVENT_NAME, RANK, ADMISSION_NUMBER, GRADE, DISQUALIFIED)
+        ;
+        """
+    )
+    create_participant_view(cursor, number_of_judges)
+    cursor.execute("ANALYZE")
+
+
+def add_participant_entry_version(cursor: sqlite3.Cursor):
+    """
+    a VERSION counter on PARTICIPANT_ENTRY, bumped by triggers whenever a mark or
+    a result of the entry changes, so concurrent judges can detect each other's saves.
+    """
+    cursor.execute(
+        """
+        --sql
+        ALTER TABLE PARTICIPANT_ENTRY ADD COLUMN VERSION INT NOT NULL DEFAULT 0
+        ;
+        """
+    )
+    bump_version = """
+        UPDATE PARTICIPANT_ENTRY SET VERSION = VERSION + 1
+        WHERE ADMISSION_NUMBER = {row}.ADMISSION_NUMBER
+        AND EVENT_NAME = {row}.EVENT_NAME;"""
+    for trigger, event, row in (
+        ("JUDGE_MARK_INSERT_VERSION", "INSERT", "NEW"),
+        ("JUDGE_MARK_UPDATE_VERSION", "UPDATE OF MARKS", "NEW"),
+        ("JUDGE_MARK_DELETE_VERSION", "DELETE", "OLD"),
+    ):
+        cursor.execute(
+            f"""
+            --sql
+            CREATE TRIGGER {trigger} AFTER {event} ON JUDGE_MARK
+            BEGIN{bump_version.format(row=row)}
+            END
+            ;
+            """
+        )
+    cursor.execute(
+        """
+        --sql
+        CREATE TRIGGER PARTICIPANT_ENTRY_VERSION
+        AFTER UPDATE OF GRADE, RANK, DISQUALIFIED, REMARKS ON PARTICIPANT_ENTRY
+        BEGIN
+        UPDATE PARTICIPANT_ENTRY SET VERSION = OLD.VERSION + 1
+        WHERE rowid = NEW.rowid;
+        END
+        ;
+        """
+    )
+
+
+def add_group_judgement_tables(cursor: sqlite3.Cursor):
+    """
+    GROUP_JUDGEMENT and GROUP_MARK hold the results and judge marks of each house
+    in a group event once; they are copied to the house's participants on submit.
+    """
+    cursor.execute(
+        """
+        --sql
+        CREATE TABLE GROUP_JUDGEMENT(
+            CATEGORY TEXT,
+            EVENT_NAME TEXT,
+            HOUSE TEXT,
+            GRADE INT,
+            RANK TEXT,
+            DISQUALIFIED BOOLEAN DEFAULT 0,
+            REMARKS TEXT DEFAULT "",
+            PRIMARY KEY(CATEGORY, EVENT_NAME, HOUSE)
+        )
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE TABLE GROUP_MARK(
+            CATEGORY TEXT,
+            EVENT_NAME TEXT,
+            HOUSE TEXT,
+            JUDGE_ID INT,
+            MARKS INT,
+            PRIMARY KEY(CATEGORY, EVENT_NAME, HOUSE, JUDGE_ID)
+        )
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE INDEX IF NOT EXISTS STUDENT_CATEGORY_HOUSE_INDEX
+        ON STUDENT (CATEGORY, HOUSE, ADMISSION_NUMBER)
+        ;
+        """
+    )
+
+
+def standing_points_of(row: str) -> str:
+    """the house points earned by the rank and grade of an entry or group judgement row"""
+    return f"""CASE WHEN {row}.DISQUALIFIED THEN 0 ELSE
+        COALESCE((SELECT POINTS FROM STANDING_POINTS WHERE KIND = 'RANK' AND VALUE = {row}.RANK), 0)
+        + COALESCE((SELECT POINTS FROM STANDING_POINTS WHERE KIND = 'GRADE' AND VALUE = {row}.GRADE), 0)
+        END"""
+
+
+def standing_rank_of(row: str) -> str:
+    return f"CASE WHEN {row}.DISQUALIFIED THEN NULL ELSE {row}.RANK END"
+
+
+def is_judged_as_group(student: str, entry: str) -> str:
+    """whether the entry is judged with its house in GROUP_JUDGEMENT, which then earns its points once"""
+    return f"""EXISTS (SELECT 1 FROM GROUP_JUDGEMENT
+        WHERE GROUP_JUDGEMENT.CATEGORY = {student}.CATEGORY
+        AND GROUP_JUDGEMENT.EVENT_NAME = {entry}.EVENT_NAME
+        AND GROUP_JUDGEMENT.HOUSE = {student}.HOUSE)"""
+
+
+def add_to_house_standings(rows: str, sign: int) -> str:
+    """adds (sign 1) or takes back (sign -1) the points and prizes of rows of HOUSE, RANK, POINTS"""
+    return f"""
+        INSERT INTO HOUSE_STANDINGS (HOUSE, POINTS, FIRSTS, SECONDS, THIRDS)
+        SELECT HOUSE, {sign} * TOTAL(POINTS), {sign} * TOTAL(RANK = 'FIRST'),
+        {sign} * TOTAL(RANK = 'SECOND'), {sign} * TOTAL(RANK = 'THIRD')
+        FROM ({rows})
+        WHERE HOUSE IS NOT NULL
+        GROUP BY HOUSE
+        ON CONFLICT (HOUSE) DO UPDATE SET
+        POINTS = POINTS + excluded.POINTS,
+        FIRSTS = FIRSTS + excluded.FIRSTS,
+        SECONDS = SECONDS + excluded.SECONDS,
+        THIRDS = THIRDS + excluded.THIRDS;"""
+
+
+def entry_rows(entry: str) -> str:
+    """the standing row of one PARTICIPANT_ENTRY row, unless it is judged as a group"""
+    return f"""
+        SELECT STUDENT.HOUSE AS HOUSE, {standing_rank_of(entry)} AS RANK,
+        {standing_points_of(entry)} AS POINTS
+        FROM STUDENT
+        WHERE STUDENT.ADMISSION_NUMBER = {entry}.ADMISSION_NUMBER
+        AND NOT {is_judged_as_group("STUDENT", entry)}"""
+
+
+def student_entry_rows(student: str) -> str:
+    """the standing rows of the entries of one STUDENT row that are not judged as a group"""
+    return f"""
+        SELECT {student}.HOUSE AS HOUSE, {standing_rank_of("PARTICIPANT_ENTRY")} AS RANK,
+        {standing_points_of("PARTICIPANT_ENTRY")} AS POINTS
+        FROM PARTICIPANT_ENTRY
+        WHERE PARTICIPANT_ENTRY.ADMISSION_NUMBER = {student}.ADMISSION_NUMBER
+        AND NOT {is_judged_as_group(student, "PARTICIPANT_ENTRY")}"""
+
+
+def group_member_rows(group: str) -> str:
+    """the standing rows of the entries of the members of one GROUP_JUDGEMENT row"""
+    return f"""
+        SELECT STUDENT.HOUSE AS HOUSE, {standing_rank_of("PARTICIPANT_ENTRY")} AS RANK,
+        {standing_points_of("PARTICIPANT_ENTRY")} AS POINTS
+        FROM STUDENT, PARTICIPANT_ENTRY
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+        AND STUDENT.CATEGORY = {group}.CATEGORY
+        AND STUDENT.HOUSE = {group}.HOUSE
+        AND PARTICIPANT_ENTRY.EVENT_NAME = {group}.EVENT_NAME"""
+
+
+def group_rows(group: str) -> str:
+    return f"""
+        SELECT {group}.HOUSE AS HOUSE, {standing_rank_of(group)} AS RANK,
+        {standing_points_of(group)} AS POINTS"""
+
+
+def rebuild_house_standings(cursor: sqlite3.Cursor):
+    """recounts HOUSE_STANDINGS from every result, eg. after STANDING_POINTS changed"""
+    cursor.execute("DELETE FROM HOUSE_STANDINGS")
+    cursor.execute(
+        """
+        --sql
+        INSERT INTO HOUSE_STANDINGS (HOUSE)
+        SELECT DISTINCT HOUSE FROM HOUSE WHERE HOUSE IS NOT NULL
+        ;
+        """
+    )
+    cursor.execute(
+        add_to_house_standings(
+            f"""
+            SELECT STUDENT.HOUSE AS HOUSE, {standing_rank_of("PARTICIPANT_ENTRY")} AS RANK,
+            {standing_points_of("PARTICIPANT_ENTRY")} AS POINTS
+            FROM STUDENT, PARTICIPANT_ENTRY
+            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+            AND NOT {is_judged_as_group("STUDENT", "PARTICIPANT_ENTRY")}""",
+            1,
+        )
+    )
+    cursor.execute(
+        add_to_house_standings(
+            f"""
+            SELECT HOUSE, {standing_rank_of("GROUP_JUDGEMENT")} AS RANK,
+            {standing_points_of("GROUP_JUDGEMENT")} AS POINTS
+            FROM GROUP_JUDGEMENT""",
+            1,
+        )
+    )
+
+
+def add_house_standings(cursor: sqlite3.Cursor):
+    """
+    HOUSE_STANDINGS keeps the points and prizes of each house up to date through
+    triggers on the results, with the points of each rank and grade configured in
+    STANDING_POINTS. a group judgement earns its house points once, instead of
+    once per member.
+    """
+    cursor.execute(
+        """
+        --sql
+        CREATE TABLE STANDING_POINTS(
+            KIND TEXT,
+            VALUE TEXT,
+            POINTS INT NOT NULL DEFAULT 0,
+            PRIMARY KEY(KIND, VALUE)
+        )
+        ;
+        """
+    )
+    cursor.executemany(
+        "INSERT INTO STANDING_POINTS (KIND, VALUE, POINTS) VALUES (?, ?, ?)",
+        [
+            (kind, value, points)
+            for kind, points_of_value in DEFAULT_STANDING_POINTS.items()
+            for value, points in points_of_value.items()
+        ],
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE TABLE HOUSE_STANDINGS(
+            HOUSE TEXT PRIMARY KEY,
+            POINTS INT NOT NULL DEFAULT 0,
+            FIRSTS INT NOT NULL DEFAULT 0,
+            SECONDS INT NOT NULL DEFAULT 0,
+            THIRDS INT NOT NULL DEFAULT 0
+        )
+        ;
+        """
+    )
+
+    triggers = {
+        "PARTICIPANT_ENTRY_INSERT_STANDINGS": (
+            "AFTER INSERT ON PARTICIPANT_ENTRY",
+            add_to_house_standings(entry_rows("NEW"), 1),
+        ),
+        "PARTICIPANT_ENTRY_UPDATE_STANDINGS": (
+            """AFTER UPDATE OF ADMISSION_NUMBER, EVENT_NAME, GRADE, RANK, DISQUALIFIED
+            ON PARTICIPANT_ENTRY""",
+            add_to_house_standings(entry_rows("OLD"), -1)
+            + add_to_house_standings(entry_rows("NEW"), 1),
+        ),
+        "PARTICIPANT_ENTRY_DELETE_STANDINGS": (
+            "AFTER DELETE ON PARTICIPANT_ENTRY",
+            add_to_house_standings(entry_rows("OLD"), -1),
+        ),
+        "STUDENT_UPDATE_STANDINGS": (
+            "AFTER UPDATE OF ADMISSION_NUMBER, HOUSE, CATEGORY ON STUDENT",
+            add_to_house_standings(student_entry_rows("OLD"), -1)
+            + add_to_house_standings(student_entry_rows("NEW"), 1),
+        ),
+        "STUDENT_DELETE_STANDINGS": (
+            "AFTER DELETE ON STUDENT",
+            add_to_house_standings(student_entry_rows("OLD"), -1),
+        ),
+        "GROUP_JUDGEMENT_INSERT_STANDINGS": (
+            "AFTER INSERT ON GROUP_JUDGEMENT",
+            add_to_house_standings(group_member_rows("NEW"), -1)
+            + add_to_house_standings(group_rows("NEW"), 1),
+        ),
+        "GROUP_JUDGEMENT_UPDATE_STANDINGS": (
+            "AFTER UPDATE ON GROUP_JUDGEMENT",
+            add_to_house_standings(group_rows("OLD"), -1)
+            + add_to_house_standings(group_member_rows("OLD"), 1)
+            + add_to_house_standings(group_member_rows("NEW"), -1)
+            + add_to_house_standings(group_rows("NEW"), 1),
+        ),
+        "GROUP_JUDGEMENT_DELETE_STANDINGS": (
+            "AFTER DELETE ON GROUP_JUDGEMENT",
+            add_to_house_standings(group_rows("OLD"), -1)
+            + add_to_house_standings(group_member_rows("OLD"), 1),
+        ),
+    }
+    for trigger, (event, statements) in triggers.items():
+        cursor.execute(
+            f"""
+            --sql
+            CREATE TRIGGER {trigger} {event}
+            BEGIN{statements}
+            END
+            ;
+            """
+        )
+    rebuild_house_standings(cursor)
+
+
+def mark_results_changed(rows: str) -> str:
+    """gives the events of rows of CATEGORY, EVENT_NAME the next CHANGE_NUMBER in RESULT_CHANGE"""
+    return f"""
+        INSERT INTO RESULT_CHANGE (CATEGORY, EVENT_NAME, CHANGE_NUMBER)
+        SELECT CATEGORY, EVENT_NAME,
+        (SELECT COALESCE(MAX(CHANGE_NUMBER), 0) + 1 FROM RESULT_CHANGE)
+        FROM ({rows})
+        WHERE CATEGORY IS NOT NULL
+        ON CONFLICT (CATEGORY, EVENT_NAME) DO UPDATE SET
+        CHANGE_NUMBER = excluded.CHANGE_NUMBER;"""
+
+
+def entry_event_rows(entry: str) -> str:
+    return f"""
+        SELECT STUDENT.CATEGORY AS CATEGORY, {entry}.EVENT_NAME AS EVENT_NAME
+        FROM STUDENT
+        WHERE STUDENT.ADMISSION_NUMBER = {entry}.ADMISSION_NUMBER"""
+
+
+def student_event_rows(student: str) -> str:
+    """the events in which one STUDENT row has a result"""
+    return f"""
+        SELECT {student}.CATEGORY AS CATEGORY, EVENT_NAME
+        FROM PARTICIPANT_ENTRY
+        WHERE ADMISSION_NUMBER = {student}.ADMISSION_NUMBER
+        AND (GRADE IS NOT NULL OR RANK IS NOT NULL)"""
+
+
+def add_result_changes(cursor: sqlite3.Cursor):
+    """
+    RESULT_CHANGE numbers the events in the order their results last changed, through
+    triggers, so a results board asks for the events changed since the number it
+    last saw instead of reading every result again.
+    """
+    cursor.execute(
+        """
+        --sql
+        CREATE TABLE RESULT_CHANGE(
+            CATEGORY TEXT,
+            EVENT_NAME TEXT,
+            CHANGE_NUMBER INT NOT NULL,
+            PRIMARY KEY(CATEGORY, EVENT_NAME)
+        )
+        ;
+        """
+    )
+    cursor.execute(
+        """
+        --sql
+        CREATE INDEX RESULT_CHANGE_NUMBER_INDEX ON RESULT_CHANGE (CHANGE_NUMBER)
+        ;
+        """
+    )
+    has_result = "{row}.GRADE IS NOT NULL OR {row}.RANK IS NOT NULL"
+    triggers = {
+        "PARTICIPANT_ENTRY_INSERT_RESULT_CHANGE": (
+            f"AFTER INSERT ON PARTICIPANT_ENTRY WHEN {has_result.format(row='NEW')}",
+            mark_results_changed(entry_event_rows("NEW")),
+        ),
+        "PARTICIPANT_ENTRY_UPDATE_RESULT_CHANGE": (
+            """AFTER UPDATE OF GRADE, RANK, DISQUALIFIED ON PARTICIPANT_ENTRY
+            WHEN OLD.ADMISSION_NUMBER IS NEW.ADMISSION_NUMBER
+            AND OLD.EVENT_NAME IS NEW.EVENT_NAME
+            AND (OLD.GRADE IS NOT NEW.GRADE
+            OR OLD.RANK IS NOT NEW.RANK
+            OR OLD.DISQUALIFIED IS NOT NEW.DISQUALIFIED)""",
+            mark_results_changed(entry_event_rows("NEW")),
+        ),
+        "PARTICIPANT_ENTRY_MOVE_RESULT_CHANGE": (
+            """AFTER UPDATE OF ADMISSION_NUMBER, EVENT_NAME ON PARTICIPANT_ENTRY
+            WHEN OLD.ADMISSION_NUMBER IS NOT NEW.ADMISSION_NUMBER
+            OR OLD.EVENT_NAME IS NOT NEW.EVENT_NAME""",
+            mark_results_changed(entry_event_rows("OLD"))
+            + mark_results_changed(entry_event_rows("NEW")),
+        ),
+        "PARTICIPANT_ENTRY_DELETE_RESULT_CHANGE": (
+            f"AFTER DELETE ON PARTICIPANT_ENTRY WHEN {has_result.format(row='OLD')}",
+            mark_results_changed(entry_event_rows("OLD")),
+        ),
+        "STUDENT_UPDATE_RESULT_CHANGE": (
+            """AFTER UPDATE OF ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, CATEGORY
+            ON STUDENT""",
+            mark_results_changed(student_event_rows("OLD"))
+            + mark_results_changed(student_event_rows("NEW")),
+        ),
+    }
+    for trigger, (event, statements) in triggers.items():
+        cursor.execute(
+            f"""
+            --sql
+            CREATE TRIGGER {trigger} {event}
+            BEGIN{statements}
+            END
+            ;
+            """
+        )
+    cursor.execute(
+        """
+        --sql
+        INSERT INTO RESULT_CHANGE (CATEGORY, EVENT_NAME, CHANGE_NUMBER)
+        SELECT CATEGORY, EVENT_NAME, ROW_NUMBER() OVER (ORDER BY CATEGORY, EVENT_NAME)
+        FROM (
+            SELECT DISTINCT STUDENT.CATEGORY, PARTICIPANT_ENTRY.EVENT_NAME
+            FROM STUDENT, PARTICIPANT_ENTRY
+            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+            AND STUDENT.CATEGORY IS NOT NULL
+            AND (PARTICIPANT_ENTRY.GRADE IS NOT NULL OR PARTICIPANT_ENTRY.RANK IS NOT NULL)
+        )
+        ;
+        """
+    )
+
+
+def add_student_insert_standings(cursor: sqlite3.Cursor):
+    """
+    counts the entries of a student inserted after them, eg. entries imported before
+    the student row, in HOUSE_STANDINGS, and recounts the standings once for those
+    inserted before this trigger existed.
+    """
+    cursor.execute(
+        f"""
+        --sql
+        CREATE TRIGGER STUDENT_INSERT_STANDINGS AFTER INSERT ON STUDENT
+        BEGIN{add_to_house_standings(student_entry_rows("NEW"), 1)}
+        END
+        ;
+        """
+    )
+    rebuild_house_standings(cursor)
+
+
+MIGRATIONS = [
+    add_covering_indexes,
+    move_judge_marks_to_judge_mark_table,
+    add_participant_entry_version,
+    add_group_judgement_tables,
+    add_house_standings,
+    add_result_changes,
+    add_student_insert_standings,
+]
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(cursor: sqlite3.Cursor) -> int:
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+
+def apply_migrations(cursor: sqlite3.Cursor):
+    """apply the pending migrations with the cursor, inside the caller's transaction"""
+    version = get_schema_version(cursor)
+    for migration in MIGRATIONS[version:]:
+        migration(cursor)
+    cursor.execute(f"PRAGMA user_version = {LATEST_VERSION}")
+
+
+def migrate(file_path: str):
+    connection = sqlite3.connect(database=file_path, isolation_level=None)
+    try:
+        cursor = connection.cursor()
+        if get_schema_version(cursor) >= LATEST_VERSION:
+            return
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            apply_migrations(cursor)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        connection.close()
+
+
+MIGRATED_DATABASES: set[str] = set()
+MIGRATION_LOCK = threading.Lock()
+
+
+def upgrade_database(file_path: str):
+    """migrate the database to the latest schema, once per process"""
+    with MIGRATION_LOCK:
+        if file_path in MIGRATED_DATABASES or not os.path.exists(file_path):
+            return
+        migrate(file_path)
+        MIGRATED_DATABASES.add(file_path)
+
+
+def forget_database(file_path: str):
+    with MIGRATION_LOCK:
+        MIGRATED_DATABASES.discard(file_path)
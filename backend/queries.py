@@ -0,0 +1,703 @@
+"""
+Every query the application runs against an eventpro database, registered by name.
+
+Queries are always executed with bound parameters through the functions of this
+module, so their text never changes between calls and sqlite3 can reuse the
+prepared statement from its cache. Templates in braces are only ever filled
+with column lists generated by the application (eg. the JUDGE{n} columns),
+never with user input. Each execution is timed and counted per query name in
+QUERY_STATS.
+"""
+import sqlite3
+import threading
+from time import perf_counter
+from pandas import DataFrame, read_sql
+from backend.sqlite_connections import get_connection
+
+
+QUERIES = {
+    # ---------------------------------------------------------------- lookups
+    "parameters": """
+        --sql
+        SELECT NUMBER_OF_JUDGES, MAX_MARKS_FOR_EACH_JUDGE, MIN_MARKS_FOR_PRIZE, MAXIMUM_EVENTS_FOR_PARTICIPATION, RESULTS_READY
+        FROM PARAMETER
+        ;
+    """,
+    "database_specs": """
+        --sql
+        SELECT MAX_MARKS_FOR_EACH_JUDGE,
+        NUMBER_OF_JUDGES,
+        MIN_MARKS_FOR_PRIZE,
+        MAXIMUM_EVENTS_FOR_PARTICIPATION
+        FROM PARAMETER
+        ;
+    """,
+    "judging_parameters": """
+        --sql
+        SELECT NUMBER_OF_JUDGES, MAX_MARKS_FOR_EACH_JUDGE, MIN_MARKS_FOR_PRIZE
+        FROM PARAMETER
+        ;
+    """,
+    "number_of_judges": """
+        --sql
+        SELECT NUMBER_OF_JUDGES
+        FROM PARAMETER
+        ;
+    """,
+    "events": """
+        --sql
+        SELECT EVENT_NAME FROM EVENT_NAME
+        ;
+    """,
+    "distinct_events": """
+        --sql
+        SELECT DISTINCT EVENT_NAME FROM EVENT_NAME
+        ;
+    """,
+    "categories": """
+        --sql
+        SELECT DISTINCT CATEGORY FROM CLASS_CATEGORY
+        ;
+    """,
+    "classes": """
+        --sql
+        SELECT DISTINCT CLASS FROM CLASS_CATEGORY
+        ;
+    """,
+    "class_category": """
+        --sql
+        SELECT CLASS, CATEGORY FROM CLASS_CATEGORY
+        ;
+    """,
+    "houses": """
+        --sql
+        SELECT HOUSE FROM HOUSE
+        ;
+    """,
+    "grade_marks": """
+        --sql
+        SELECT GRADE, MIN_MARKS FROM GRADE_MARKS
+        ;
+    """,
+    "standing_points": """
+        --sql
+        SELECT KIND, VALUE, POINTS FROM STANDING_POINTS ORDER BY KIND DESC, POINTS DESC
+        ;
+    """,
+    "grade_marks_ascending": """
+        --sql
+        SELECT GRADE, MIN_MARKS FROM GRADE_MARKS ORDER BY MIN_MARKS ASC
+        ;
+    """,
+    # --------------------------------------------------------------- students
+    "all_admission_numbers": """
+        --sql
+        SELECT DISTINCT ADMISSION_NUMBER
+        FROM STUDENT
+        ;
+    """,
+    "student_details": """
+        --sql
+        SELECT STUDENT_NAME, CLASS, DIVISION, HOUSE
+        FROM STUDENT
+        WHERE ADMISSION_NUMBER = ?
+        ;
+    """,
+    "students": """
+        --sql
+        SELECT ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, CATEGORY
+        FROM STUDENT
+        ORDER BY CLASS, DIVISION, STUDENT_NAME
+        ;
+    """,
+    "all_students": """
+        --sql
+        SELECT * FROM STUDENT
+        ;
+    """,
+    "update_student": """
+        --sql
+        UPDATE STUDENT
+        SET STUDENT_NAME = ?,
+        CLASS = ?,
+        DIVISION = ?,
+        HOUSE = ?,
+        CATEGORY = ?
+        WHERE ADMISSION_NUMBER = ?
+        ;
+    """,
+    "update_student_house": """
+        --sql
+        UPDATE STUDENT
+        SET HOUSE = ?
+        WHERE ADMISSION_NUMBER = ?
+        ;
+    """,
+    # ----------------------------------------------------------- participants
+    "events_of_category": """
+        --sql
+        SELECT DISTINCT EVENT_NAME
+        FROM PARTICIPANT,STUDENT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        AND STUDENT.CATEGORY = ?
+        ;
+    """,
+    "events_of_student": """
+        --sql
+        SELECT EVENT_NAME
+        FROM PARTICIPANT
+        WHERE ADMISSION_NUMBER = ?
+        ;
+    """,
+    "participant_count": """
+        --sql
+        SELECT COUNT(DISTINCT ADMISSION_NUMBER) FROM PARTICIPANT
+        ;
+    """,
+    "participant_events": """
+        --sql
+        SELECT DISTINCT EVENT_NAME FROM PARTICIPANT
+        ;
+    """,
+    "participants": """
+        --sql
+        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE,CATEGORY, EVENT_NAME
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        ORDER BY CLASS, DIVISION, STUDENT_NAME
+        ;
+    """,
+    "participants_of_category_event": """
+        --sql
+        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        AND CATEGORY = ?
+        AND EVENT_NAME = ?
+        ORDER BY CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
+        ;
+    """,
+    "results_of_category_event": """
+        --sql
+        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, TOTAL_MARKS, GRADE, RANK, DISQUALIFIED, REMARKS
+        FROM PARTICIPANT, STUDENT
+        WHERE PARTICIPANT.ADMISSION_NUMBER = STUDENT.ADMISSION_NUMBER
+        AND CATEGORY = ?
+        AND EVENT_NAME = ?
+        ORDER BY TOTAL_MARKS DESC
+        ;
+    """,
+    "delete_participations_of_student": """
+        --sql
+        DELETE FROM PARTICIPANT WHERE ADMISSION_NUMBER = ?
+        ;
+    """,
+    "insert_participation": """
+        --sql
+        INSERT INTO PARTICIPANT (ADMISSION_NUMBER, EVENT_NAME)
+        VALUES (?, ?)
+        ;
+    """,
+    # -------------------------------------------------------------- judgement
+    "judgement_sheet_of_category_event": """
+        --sql
+        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, {judge_columns}, TOTAL_MARKS, GRADE, RANK, DISQUALIFIED, REMARKS
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        AND CATEGORY = ?
+        AND EVENT_NAME = ?
+        ;
+    """,
+    "group_judgement_sheet_of_category_event": """
+        --sql
+        SELECT HOUSES.HOUSE, {group_judge_columns},
+        COALESCE(GROUP_JUDGEMENT.DISQUALIFIED, 0) AS DISQUALIFIED,
+        COALESCE(GROUP_JUDGEMENT.REMARKS, '') AS REMARKS
+        FROM (
+            SELECT DISTINCT HOUSE
+            FROM STUDENT, PARTICIPANT_ENTRY
+            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+            AND CATEGORY = ?1
+            AND EVENT_NAME = ?2
+            AND HOUSE IS NOT NULL
+        ) AS HOUSES
+        LEFT JOIN GROUP_JUDGEMENT
+        ON GROUP_JUDGEMENT.CATEGORY = ?1
+        AND GROUP_JUDGEMENT.EVENT_NAME = ?2
+        AND GROUP_JUDGEMENT.HOUSE = HOUSES.HOUSE
+        LEFT JOIN GROUP_MARK
+        ON GROUP_MARK.CATEGORY = ?1
+        AND GROUP_MARK.EVENT_NAME = ?2
+        AND GROUP_MARK.HOUSE = HOUSES.HOUSE
+        GROUP BY HOUSES.HOUSE
+        ORDER BY HOUSES.HOUSE
+        ;
+    """,
+    "upsert_group_mark": """
+        --sql
+        INSERT INTO GROUP_MARK (CATEGORY, EVENT_NAME, HOUSE, JUDGE_ID, MARKS)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (CATEGORY, EVENT_NAME, HOUSE, JUDGE_ID)
+        DO UPDATE SET MARKS = excluded.MARKS
+        ;
+    """,
+    "upsert_group_judgement": """
+        --sql
+        INSERT INTO GROUP_JUDGEMENT (CATEGORY, EVENT_NAME, HOUSE, GRADE, RANK, DISQUALIFIED, REMARKS)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (CATEGORY, EVENT_NAME, HOUSE)
+        DO UPDATE SET GRADE = excluded.GRADE,
+        RANK = excluded.RANK,
+        DISQUALIFIED = excluded.DISQUALIFIED,
+        REMARKS = excluded.REMARKS
+        ;
+    """,
+    "propagate_group_marks": """
+        --sql
+        INSERT INTO JUDGE_MARK (ADMISSION_NUMBER, EVENT_NAME, JUDGE_ID, MARKS)
+        SELECT PARTICIPANT_ENTRY.ADMISSION_NUMBER, PARTICIPANT_ENTRY.EVENT_NAME,
+        GROUP_MARK.JUDGE_ID, GROUP_MARK.MARKS
+        FROM GROUP_MARK, STUDENT, PARTICIPANT_ENTRY
+        WHERE GROUP_MARK.CATEGORY = ?1
+        AND GROUP_MARK.EVENT_NAME = ?2
+        AND STUDENT.CATEGORY = GROUP_MARK.CATEGORY
+        AND STUDENT.HOUSE = GROUP_MARK.HOUSE
+        AND PARTICIPANT_ENTRY.ADMISSION_NUMBER = STUDENT.ADMISSION_NUMBER
+        AND PARTICIPANT_ENTRY.EVENT_NAME = GROUP_MARK.EVENT_NAME
+        ON CONFLICT (ADMISSION_NUMBER, EVENT_NAME, JUDGE_ID)
+        DO UPDATE SET MARKS = excluded.MARKS
+        WHERE MARKS IS NOT excluded.MARKS
+        ;
+    """,
+    "propagate_group_judgement": """
+        --sql
+        UPDATE PARTICIPANT_ENTRY
+        SET GRADE = GROUP_JUDGEMENT.GRADE,
+        RANK = GROUP_JUDGEMENT.RANK,
+        DISQUALIFIED = GROUP_JUDGEMENT.DISQUALIFIED,
+        REMARKS = GROUP_JUDGEMENT.REMARKS
+        FROM GROUP_JUDGEMENT, STUDENT
+        WHERE GROUP_JUDGEMENT.CATEGORY = ?1
+        AND GROUP_JUDGEMENT.EVENT_NAME = ?2
+        AND STUDENT.CATEGORY = GROUP_JUDGEMENT.CATEGORY
+        AND STUDENT.HOUSE = GROUP_JUDGEMENT.HOUSE
+        AND PARTICIPANT_ENTRY.ADMISSION_NUMBER = STUDENT.ADMISSION_NUMBER
+        AND PARTICIPANT_ENTRY.EVENT_NAME = GROUP_JUDGEMENT.EVENT_NAME
+        AND (
+            PARTICIPANT_ENTRY.GRADE IS NOT GROUP_JUDGEMENT.GRADE
+            OR PARTICIPANT_ENTRY.RANK IS NOT GROUP_JUDGEMENT.RANK
+            OR PARTICIPANT_ENTRY.DISQUALIFIED IS NOT GROUP_JUDGEMENT.DISQUALIFIED
+            OR PARTICIPANT_ENTRY.REMARKS IS NOT GROUP_JUDGEMENT.REMARKS
+        )
+        ;
+    """,
+    "upsert_judge_mark": """
+        --sql
+        INSERT INTO JUDGE_MARK (ADMISSION_NUMBER, EVENT_NAME, JUDGE_ID, MARKS)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (ADMISSION_NUMBER, EVENT_NAME, JUDGE_ID)
+        DO UPDATE SET MARKS = excluded.MARKS
+        ;
+    """,
+    "delete_judge_mark": """
+        --sql
+        DELETE FROM JUDGE_MARK
+        WHERE ADMISSION_NUMBER = ? AND EVENT_NAME = ? AND JUDGE_ID = ?
+        ;
+    """,
+    "update_participant_result": """
+        --sql
+        UPDATE PARTICIPANT_ENTRY
+        SET GRADE = ?,
+        RANK = ?,
+        DISQUALIFIED = ?,
+        REMARKS = ?
+        WHERE ADMISSION_NUMBER = ?
+        AND EVENT_NAME = ?
+        ;
+    """,
+    "judge_sheet_of_category_event": """
+        --sql
+        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION,
+        (SELECT MARKS FROM JUDGE_MARK
+        WHERE JUDGE_MARK.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+        AND JUDGE_MARK.EVENT_NAME = PARTICIPANT_ENTRY.EVENT_NAME
+        AND JUDGE_ID = ?) AS MARKS,
+        VERSION
+        FROM STUDENT, PARTICIPANT_ENTRY
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+        AND CATEGORY = ?
+        AND EVENT_NAME = ?
+        ORDER BY CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
+        ;
+    """,
+    "update_participant_grade_rank": """
+        --sql
+        UPDATE PARTICIPANT_ENTRY
+        SET GRADE = ?,
+        RANK = ?
+        WHERE ADMISSION_NUMBER = ?
+        AND EVENT_NAME = ?
+        ;
+    """,
+    "changed_rows": """
+        --sql
+        SELECT changes()
+        ;
+    """,
+    "recompute_participant_results": """
+        --sql
+        WITH MARKS AS (
+            SELECT ADMISSION_NUMBER, EVENT_NAME,
+            SUM(MARKS) AS TOTAL_MARKS, COUNT(MARKS) AS JUDGED_BY
+            FROM JUDGE_MARK
+            WHERE JUDGE_ID <= (SELECT NUMBER_OF_JUDGES FROM PARAMETER)
+            GROUP BY ADMISSION_NUMBER, EVENT_NAME
+        ),
+        ENTRIES AS (
+            SELECT PARTICIPANT_ENTRY.ADMISSION_NUMBER, PARTICIPANT_ENTRY.EVENT_NAME, CATEGORY,
+            COALESCE(MARKS.TOTAL_MARKS, 0) AS TOTAL_MARKS,
+            COALESCE(MARKS.JUDGED_BY, 0) = (SELECT NUMBER_OF_JUDGES FROM PARAMETER) AS COMPLETE,
+            COALESCE(DISQUALIFIED = 0, 0) AS ELIGIBLE,
+            GRADE IS NOT NULL AS GRADED,
+            COALESCE(RANK = 'CONSOLATION', 0) AS CONSOLATION
+            FROM PARTICIPANT_ENTRY
+            JOIN STUDENT ON STUDENT.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+            LEFT JOIN MARKS
+            ON MARKS.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+            AND MARKS.EVENT_NAME = PARTICIPANT_ENTRY.EVENT_NAME
+        ),
+        PLACES AS (
+            SELECT ADMISSION_NUMBER, EVENT_NAME, TOTAL_MARKS,
+            MIN(COMPLETE) OVER EVENT = 1 OR MAX(GRADED) OVER EVENT = 1 AS JUDGED,
+            MAX(CONSOLATION) OVER EVENT AS CONSOLATION_ALLOWED,
+            CASE WHEN ELIGIBLE THEN DENSE_RANK() OVER (
+                PARTITION BY CATEGORY, EVENT_NAME, ELIGIBLE
+                ORDER BY TOTAL_MARKS DESC
+            ) END AS PLACE
+            FROM ENTRIES
+            WINDOW EVENT AS (PARTITION BY CATEGORY, EVENT_NAME)
+        ),
+        GRADE_BANDS AS (
+            SELECT GRADE,
+            LAG(MIN_MARKS) OVER (ORDER BY MIN_MARKS ASC) AS FROM_MARKS,
+            CASE WHEN ROW_NUMBER() OVER (ORDER BY MIN_MARKS DESC) > 1 THEN MIN_MARKS END AS BELOW_MARKS
+            FROM GRADE_MARKS
+        ),
+        RESULTS AS (
+            SELECT ADMISSION_NUMBER, EVENT_NAME, GRADE_BANDS.GRADE,
+            CASE
+                WHEN PLACE IS NULL OR PLACE > 3 THEN NULL
+                WHEN TOTAL_MARKS < (SELECT MIN_MARKS_FOR_PRIZE FROM PARAMETER)
+                THEN CASE WHEN CONSOLATION_ALLOWED THEN 'CONSOLATION' END
+                WHEN PLACE = 1 THEN 'FIRST'
+                WHEN PLACE = 2 THEN 'SECOND'
+                ELSE 'THIRD'
+            END AS RANK
+            FROM PLACES
+            LEFT JOIN GRADE_BANDS
+            ON (FROM_MARKS IS NULL OR TOTAL_MARKS >= FROM_MARKS)
+            AND (BELOW_MARKS IS NULL OR TOTAL_MARKS < BELOW_MARKS)
+            WHERE JUDGED
+        )
+        UPDATE PARTICIPANT_ENTRY
+        SET GRADE = RESULTS.GRADE,
+        RANK = RESULTS.RANK
+        FROM RESULTS
+        WHERE PARTICIPANT_ENTRY.ADMISSION_NUMBER = RESULTS.ADMISSION_NUMBER
+        AND PARTICIPANT_ENTRY.EVENT_NAME = RESULTS.EVENT_NAME
+        AND (
+            PARTICIPANT_ENTRY.GRADE IS NOT RESULTS.GRADE
+            OR PARTICIPANT_ENTRY.RANK IS NOT RESULTS.RANK
+        )
+        ;
+    """,
+    "refresh_group_judgement_results": """
+        --sql
+        UPDATE GROUP_JUDGEMENT
+        SET GRADE = MEMBERS.GRADE,
+        RANK = MEMBERS.RANK
+        FROM (
+            SELECT CATEGORY, EVENT_NAME, HOUSE, MAX(GRADE) AS GRADE, MAX(RANK) AS RANK
+            FROM STUDENT, PARTICIPANT_ENTRY
+            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT_ENTRY.ADMISSION_NUMBER
+            GROUP BY CATEGORY, EVENT_NAME, HOUSE
+        ) AS MEMBERS
+        WHERE GROUP_JUDGEMENT.CATEGORY = MEMBERS.CATEGORY
+        AND GROUP_JUDGEMENT.EVENT_NAME = MEMBERS.EVENT_NAME
+        AND GROUP_JUDGEMENT.HOUSE = MEMBERS.HOUSE
+        AND (
+            GROUP_JUDGEMENT.GRADE IS NOT MEMBERS.GRADE
+            OR GROUP_JUDGEMENT.RANK IS NOT MEMBERS.RANK
+        )
+        ;
+    """,
+    "participations": """
+        --sql
+        SELECT ADMISSION_NUMBER, EVENT_NAME FROM PARTICIPANT_ENTRY
+        ;
+    """,
+    "judgement_sheets_of_events": """
+        --sql
+        SELECT STUDENT.ADMISSION_NUMBER, CATEGORY, EVENT_NAME, {judge_columns}, TOTAL_MARKS, GRADE, RANK, DISQUALIFIED
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        AND EVENT_NAME IN (SELECT value FROM json_each(?))
+        ;
+    """,
+    "update_participant_disqualified": """
+        --sql
+        UPDATE PARTICIPANT_ENTRY
+        SET DISQUALIFIED = ?
+        WHERE ADMISSION_NUMBER = ?
+        AND EVENT_NAME = ?
+        ;
+    """,
+    "update_participant_remarks": """
+        --sql
+        UPDATE PARTICIPANT_ENTRY
+        SET REMARKS = ?
+        WHERE ADMISSION_NUMBER = ?
+        AND EVENT_NAME = ?
+        ;
+    """,
+    # ------------------------------------------------------------- parameters
+    "delete_events": """
+        --sql
+        DELETE FROM EVENT_NAME
+        ;
+    """,
+    "insert_event": """
+        --sql
+        INSERT INTO EVENT_NAME
+        VALUES (?)
+        ;
+    """,
+    "delete_grade_marks": """
+        --sql
+        DELETE FROM GRADE_MARKS
+        ;
+    """,
+    "insert_grade_marks": """
+        --sql
+        INSERT INTO GRADE_MARKS
+        VALUES (?, ?)
+        ;
+    """,
+    "delete_standing_points": """
+        --sql
+        DELETE FROM STANDING_POINTS
+        ;
+    """,
+    "insert_standing_points": """
+        --sql
+        INSERT INTO STANDING_POINTS (KIND, VALUE, POINTS)
+        VALUES (?, ?, ?)
+        ;
+    """,
+    "update_parameters": """
+        --sql
+        UPDATE PARAMETER
+        SET
+        MAX_MARKS_FOR_EACH_JUDGE = ?,
+        MIN_MARKS_FOR_PRIZE = ?,
+        TOTAL_MARKS = ?,
+        MAXIMUM_EVENTS_FOR_PARTICIPATION = ?
+        ;
+    """,
+    "update_number_of_judges": """
+        --sql
+        UPDATE PARAMETER
+        SET NUMBER_OF_JUDGES = ?
+        ;
+    """,
+    # ---------------------------------------------------------------- reports
+    "report_snapshot": """
+        --sql
+        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, CATEGORY, EVENT_NAME,
+        {judge_columns}, TOTAL_MARKS, GRADE, RANK, DISQUALIFIED, REMARKS
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        ORDER BY CLASS ASC, DIVISION ASC, STUDENT_NAME ASC, EVENT_NAME ASC
+        ;
+    """,
+    # ---------------------------------------------------------------- results
+    "judged_categories": """
+        --sql
+        SELECT DISTINCT CATEGORY
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        AND PARTICIPANT.GRADE IS NOT NULL
+        ;
+    """,
+    "judged_events_of_category": """
+        --sql
+        SELECT DISTINCT EVENT_NAME
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        AND STUDENT.CATEGORY = ?
+        AND PARTICIPANT.GRADE IS NOT NULL
+        ;
+    """,
+    "results_of_events": """
+        --sql
+        SELECT STUDENT.CATEGORY, EVENT_NAME,
+        STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, TOTAL_MARKS, RANK
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        ORDER BY STUDENT.CATEGORY, EVENT_NAME, RANK DESC, CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
+        ;
+    """,
+    "result_judgement_sheets": """
+        --sql
+        SELECT EVENT_NAME,
+        '' AS CHESTNUMBER, STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, {judge_columns}, TOTAL_MARKS AS TOTAL, RANK
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        ORDER BY EVENT_NAME, CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
+        ;
+    """,
+    "ranked_participants": """
+        --sql
+        SELECT STUDENT_NAME, CLASS, DIVISION, CATEGORY, EVENT_NAME, RANK
+        FROM STUDENT, PARTICIPANT
+        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
+        AND CATEGORY = ?
+        AND EVENT_NAME = ?
+        AND RANK IS NOT NULL
+        ;
+    """,
+    "house_standings": """
+        --sql
+        SELECT HOUSE, POINTS, FIRSTS, SECONDS, THIRDS
+        FROM HOUSE_STANDINGS
+        ORDER BY POINTS DESC, FIRSTS DESC, SECONDS DESC, THIRDS DESC, HOUSE ASC
+        ;
+    """,
+    "last_result_change": """
+        --sql
+        SELECT COALESCE(MAX(CHANGE_NUMBER), 0)
+        FROM RESULT_CHANGE
+        ;
+    """,
+    "result_changes_since": """
+        --sql
+        SELECT CATEGORY, EVENT_NAME, CHANGE_NUMBER
+        FROM RESULT_CHANGE
+        WHERE CHANGE_NUMBER > ?
+        ORDER BY CHANGE_NUMBER ASC
+        ;
+    """,
+    "board_winners_of_category_event": """
+        --sql
+        SELECT STUDENT_NAME, CLASS, DIVISION, HOUSE, RANK, GRADE
+        FROM PARTICIPANT_ENTRY, STUDENT
+        WHERE PARTICIPANT_ENTRY.ADMISSION_NUMBER = STUDENT.ADMISSION_NUMBER
+        AND CATEGORY = ?
+        AND EVENT_NAME = ?
+        AND RANK IN ('FIRST', 'SECOND', 'THIRD', 'CONSOLATION')
+        AND NOT COALESCE(DISQUALIFIED, 0)
+        ORDER BY CASE RANK WHEN 'FIRST' THEN 1 WHEN 'SECOND' THEN 2 WHEN 'THIRD' THEN 3 ELSE 4 END,
+        CLASS ASC, DIVISION ASC, STUDENT_NAME ASC
+        ;
+    """,
+}
+
+
+class QueryStats:
+    """call count, total time and rows returned (or changed) per query name"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.stats: dict[str, list] = {}
+
+    def record(self, name: str, seconds: float, rows: int):
+        with self.lock:
+            stats = self.stats.setdefault(name, [0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += max(rows, 0)
+
+    def as_dataframe(self) -> DataFrame:
+        with self.lock:
+            records = [
+                {
+                    "query": name,
+                    "calls": calls,
+                    "total_ms": round(seconds * 1000, 2),
+                    "mean_ms": round(seconds * 1000 / calls, 3),
+                    "rows": rows,
+                }
+                for name, (calls, seconds, rows) in self.stats.items()
+            ]
+        return DataFrame(
+            records, columns=["query", "calls", "total_ms", "mean_ms", "rows"]
+        ).sort_values("total_ms", ascending=False)
+
+
+QUERY_STATS = QueryStats()
+
+
+def get_query(name: str, **template) -> str:
+    query = QUERIES[name]
+    return query.format(**template) if template else query
+
+
+def execute(cursor: sqlite3.Cursor, name: str, parameters=(), **template):
+    """run a registered query on the cursor, eg. inside a write submitted to the writer"""
+    start = perf_counter()
+    cursor.execute(get_query(name, **template), parameters)
+    QUERY_STATS.record(name, perf_counter() - start, cursor.rowcount)
+    return cursor
+
+
+def execute_many(cursor: sqlite3.Cursor, name: str, seq_of_parameters, **template):
+    start = perf_counter()
+    cursor.executemany(get_query(name, **template), seq_of_parameters)
+    QUERY_STATS.record(name, perf_counter() - start, cursor.rowcount)
+    return cursor
+
+
+def read_cursor_dataframe(
+    cursor: sqlite3.Cursor, name: str, parameters=(), **template
+) -> DataFrame:
+    """read a registered query into a DataFrame through the cursor, eg. inside a write"""
+    execute(cursor, name, parameters, **template)
+    return DataFrame(
+        cursor.fetchall(), columns=[column[0] for column in cursor.description]
+    )
+
+
+def fetch_all(name: str, parameters=(), file_path=None, **template) -> list:
+    start = perf_counter()
+    cursor = get_connection(file_path).execute(get_query(name, **template), parameters)
+    rows = cursor.fetchall()
+    cursor.close()
+    QUERY_STATS.record(name, perf_counter() - start, len(rows))
+    return rows
+
+
+def fetch_one(name: str, parameters=(), file_path=None, **template):
+    start = perf_counter()
+    cursor = get_connection(file_path).execute(get_query(name, **template), parameters)
+    row = cursor.fetchone()
+    cursor.close()
+    QUERY_STATS.record(name, perf_counter() - start, int(row is not None))
+    return row
+
+
+def fetch_column(name: str, parameters=(), file_path=None, **template) -> list:
+    return [row[0] for row in fetch_all(name, parameters, file_path, **template)]
+
+
+def read_dataframe(name: str, parameters=(), file_path=None, **template) -> DataFrame:
+    start = perf_counter()
+    dataframe = read_sql(
+        get_query(name, **template), get_connection(file_path), params=parameters
+    )
+    QUERY_STATS.record(name, perf_counter() - start, len(dataframe))
+    return dataframe
+
+
+def get_query_stats() -> DataFrame:
+    return QUERY_STATS.as_dataframe()
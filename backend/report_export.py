@@ -0,0 +1,75 @@
+"""
+One-click ZIP export of the reports, results and certificates.
+
+The report workbooks are rendered from the database straight into an in-memory
+ZIP, without being written to the reports directory first, so the export works
+even when the output directories are read-only. The results and certificates
+already generated on the server are added as they are. xlsx and png files are
+already deflate-compressed, so they are stored instead of being compressed again.
+"""
+import os
+import time
+from io import BytesIO
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
+from backend.constants import CERTIFICATES_PATH, RESULTS_PATH
+from backend.documents_generator import ReportGenerator
+from backend.report_manifest import MANIFEST_FILE
+from backend.report_workers import render_workbook, run_workbooks
+
+STORED_EXTENSIONS = {".xlsx", ".png", ".jpg", ".jpeg", ".zip"}
+
+
+def get_archive_name(path: str) -> str:
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def add_to_archive(archive: ZipFile, path: str, data: bytes):
+    info = ZipInfo(get_archive_name(path), date_time=time.localtime()[:6])
+    if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+        info.compress_type = ZIP_STORED
+    else:
+        info.compress_type = ZIP_DEFLATED
+    archive.writestr(info, data)
+
+
+def get_generated_files(*directories) -> list[str]:
+    return [
+        os.path.join(root, file)
+        for directory in directories
+        for root, _, files in os.walk(directory)
+        for file in sorted(files)
+        if file != MANIFEST_FILE
+    ]
+
+
+def export_all_reports(workers=None, on_progress=None) -> bytes:
+    """
+    a ZIP of every report workbook, rendered from the current database, with the
+    generated results and certificates. on_progress(added, total, path) is called
+    as each file is added.
+    """
+    generator = ReportGenerator(
+        category_based_report_needed=True,
+        judgement_sheets_needed=True,
+        prize_winners_report_needed=True,
+        workers=workers,
+    )
+    plans = generator.plan_reports(generator.load_snapshot())
+    generated_files = get_generated_files(RESULTS_PATH, CERTIFICATES_PATH)
+    total = len(plans) + len(generated_files)
+
+    buffer = BytesIO()
+    with ZipFile(buffer, "w") as archive:
+        added = 0
+        for path, data in run_workbooks(render_workbook, plans, workers):
+            add_to_archive(archive, path, data)
+            added += 1
+            if on_progress is not None:
+                on_progress(added, total, path)
+        for path in generated_files:
+            with open(path, "rb") as file:
+                add_to_archive(archive, path, file.read())
+            added += 1
+            if on_progress is not None:
+                on_progress(added, total, path)
+    return buffer.getvalue()
@@ -0,0 +1,96 @@
+"""
+Manifest of the generated report and result workbooks.
+
+`manifest.json` in an output directory maps the path of every workbook written
+there, a file or a directory of sheet files, to a digest of the input rows it was written from. A generation
+rewrites only the workbooks whose digest changed or whose file is missing, and
+removes the files of workbooks it no longer produces, eg. of a deleted event,
+instead of deleting and rebuilding the whole directory.
+"""
+import json
+import os
+from hashlib import sha1
+from numpy import ndarray
+from pandas import DataFrame
+from pandas.util import hash_pandas_object
+
+MANIFEST_FILE = "manifest.json"
+
+
+def digest_of(*items) -> str:
+    """a digest of dataframes (their columns and rows), arrays and plain values, in order"""
+    digest = sha1()
+    for item in items:
+        if isinstance(item, DataFrame):
+            digest.update(json.dumps([str(column) for column in item.columns]).encode())
+            digest.update(hash_pandas_object(item, index=False).to_numpy().tobytes())
+        elif isinstance(item, ndarray):
+            digest.update(item.tobytes())
+        else:
+            digest.update(json.dumps(item, default=str).encode())
+    return digest.hexdigest()
+
+
+class ReportManifest:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                self.digests: dict[str, str] = json.load(file)
+        except (OSError, ValueError):
+            self.digests = {}
+
+    def key(self, path: str) -> str:
+        return os.path.relpath(path, self.directory).replace(os.sep, "/")
+
+    def is_stale(self, path: str, digest: str) -> bool:
+        return self.digests.get(self.key(path)) != digest or not os.path.exists(path)
+
+    def forget(self, path: str):
+        """drops the workbook before it is rewritten, so a failed write is retried"""
+        self.digests.pop(self.key(path), None)
+
+    def record(self, path: str, digest: str):
+        self.digests[self.key(path)] = digest
+
+    def is_kept(self, key: str, keep: set, sheet_extension: str = "") -> bool:
+        """
+        whether key is one of keep, or a file with sheet_extension in one of them, eg.
+        a sheet of a csv workbook
+        """
+        if key in keep:
+            return True
+        directory = key.rpartition("/")[0]
+        while directory:
+            if directory in keep:
+                return key.endswith(sheet_extension)
+            directory = directory.rpartition("/")[0]
+        return False
+
+    def prune(self, paths, sheet_extension: str = "") -> list[str]:
+        """
+        removes every file under the directory that is not one of paths, or a file with
+        sheet_extension in one of them; returns them
+        """
+        keep = {self.key(path) for path in paths} | {MANIFEST_FILE}
+        removed = []
+        for root, directories, files in os.walk(self.directory, topdown=False):
+            for file in files:
+                file_path = os.path.join(root, file)
+                if not self.is_kept(self.key(file_path), keep, sheet_extension):
+                    os.remove(file_path)
+                    removed.append(file_path)
+            for directory in directories:
+                directory_path = os.path.join(root, directory)
+                if not os.listdir(directory_path):
+                    os.rmdir(directory_path)
+        self.digests = {key: self.digests[key] for key in self.digests if key in keep}
+        return removed
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(self.digests, file, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.path)
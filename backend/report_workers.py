@@ -0,0 +1,137 @@
+"""
+Renders report workbooks in worker processes.
+
+Each workbook is an independent file, and rendering it with xlsxwriter is CPU
+bound, so the workbooks of a generation are written by a ProcessPoolExecutor, one
+task per workbook, largest first. Workers are spawned instead of forked, since the
+server process runs threads, and they import only this module and the excel
+writer. Completed workbooks are reported as each worker finishes. Workbooks can
+also be rendered in memory, eg. straight into a ZIP export.
+
+A workbook can instead be written as a directory with one CSV, gzipped CSV or
+Parquet file per sheet, for consumers that only need the data. These hold the
+same rows and headers as the sheets, without the title row and formatting.
+"""
+import os
+import re
+import shutil
+from importlib.util import find_spec
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from pandas import DataFrame
+from backend.constants import REPORT_WORKERS
+from backend.excel_writer import ExcelDataframeWriter
+
+# part of every workbook digest, change it when the layout of the workbooks changes
+REPORT_FORMAT_VERSION = 2
+# output format: extension of the file of a workbook, or of each of its sheets
+OUTPUT_FORMATS = {
+    "xlsx": ".xlsx",
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "parquet": ".parquet",
+}
+# mtime 0 keeps the gzip bytes the same for the same rows
+GZIP_OPTIONS = {"method": "gzip", "compresslevel": 6, "mtime": 0}
+
+
+def get_output_formats() -> list[str]:
+    """the output formats that can be written here, parquet only when pyarrow is installed"""
+    return [
+        output_format
+        for output_format in OUTPUT_FORMATS
+        if output_format != "parquet" or find_spec("pyarrow") is not None
+    ]
+
+
+def get_sheet_file_name(sheet_title: str, output_format: str) -> str:
+    return re.sub(r'[\\/:*?"<>|]', "-", sheet_title).strip() + OUTPUT_FORMATS[output_format]
+
+
+@dataclass
+class WorkbookPlan:
+    """
+    a workbook to write, as its path and its (dataframe, sheet title, report title)
+    sheets. the path of a workbook in any format but xlsx is a directory of its sheets.
+    """
+
+    path: str
+    sheets: list[tuple[DataFrame, str, str]] = field(default_factory=list)
+    output_format: str = "xlsx"
+
+    def add_sheet(self, dataframe: DataFrame, sheet_title: str, report_title: str):
+        self.sheets.append((dataframe, sheet_title, report_title))
+
+    def rows(self) -> int:
+        return sum(len(dataframe) for dataframe, *_ in self.sheets)
+
+
+def write_workbook(plan: WorkbookPlan) -> str:
+    if plan.output_format != "xlsx":
+        return write_sheet_files(plan)
+    os.makedirs(os.path.dirname(plan.path), exist_ok=True)
+    with ExcelDataframeWriter(plan.path) as xl_obj:
+        for dataframe, sheet_title, report_title in plan.sheets:
+            xl_obj.generate_doc(dataframe, sheet_title, report_title)
+    return plan.path
+
+
+def write_sheet_files(plan: WorkbookPlan) -> str:
+    """rewrites the directory of the workbook with a file per sheet"""
+    shutil.rmtree(plan.path, ignore_errors=True)
+    os.makedirs(plan.path)
+    for dataframe, sheet_title, _ in plan.sheets:
+        path = os.path.join(plan.path, get_sheet_file_name(sheet_title, plan.output_format))
+        if plan.output_format == "parquet":
+            dataframe.to_parquet(path, index=False)
+        elif plan.output_format == "csv.gz":
+            dataframe.to_csv(path, index=False, compression=GZIP_OPTIONS)
+        else:
+            dataframe.to_csv(path, index=False)
+    return plan.path
+
+
+def render_workbook(plan: WorkbookPlan) -> tuple[str, bytes]:
+    """the path and contents of the workbook, rendered in memory without touching disk"""
+    buffer = BytesIO()
+    with ExcelDataframeWriter(buffer) as xl_obj:
+        for dataframe, sheet_title, report_title in plan.sheets:
+            xl_obj.generate_doc(dataframe, sheet_title, report_title)
+    return plan.path, buffer.getvalue()
+
+
+def get_number_of_workers(workers=None) -> int:
+    return max(1, workers or REPORT_WORKERS or os.cpu_count() or 1)
+
+
+def run_workbooks(task, plans: list[WorkbookPlan], workers=None):
+    """
+    runs task on every plan with up to `workers` processes (REPORT_WORKERS, or one
+    per core, when not given), largest first, and yields the results as each one
+    finishes. one worker runs them in this process.
+    """
+    plans = sorted(plans, key=WorkbookPlan.rows, reverse=True)
+    workers = min(get_number_of_workers(workers), len(plans))
+    if workers <= 1:
+        for plan in plans:
+            yield task(plan)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    try:
+        futures = [executor.submit(task, plan) for plan in plans]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def write_workbooks(plans: list[WorkbookPlan], workers=None, on_progress=None):
+    """writes the workbooks, calling on_progress(written, total, path) as each one is written"""
+    for written, path in enumerate(
+        run_workbooks(write_workbook, plans, workers), start=1
+    ):
+        if on_progress is not None:
+            on_progress(written, len(plans), path)
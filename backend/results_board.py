@@ -0,0 +1,63 @@
+"""
+Incremental state of a live results board.
+
+A board polls `PRAGMA data_version`, which costs no table reads, and only when the
+database has changed since its last poll it asks RESULT_CHANGE for the events whose
+results changed after the last CHANGE_NUMBER it saw. Only the winners of those
+events are read again, with the house standings, which are one row per house.
+The board starts over when the database was closed and possibly replaced, or when
+RESULT_CHANGE was numbered again from the start.
+"""
+from pandas import DataFrame
+from backend.queries import fetch_all, fetch_one, read_dataframe
+from backend.sqlite_connections import get_data_version
+
+
+class ResultsBoard:
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.data_version = None
+        self.reset()
+
+    def reset(self):
+        self.change_number = 0
+        self.standings = DataFrame()
+        # (category, event) -> winners, in the order the results last changed
+        self.winners: dict[tuple[str, str], DataFrame] = {}
+
+    def refresh(self) -> list[tuple[str, str]]:
+        """reads what changed since the last refresh; returns the events read again"""
+        data_version = get_data_version(self.file_path)
+        if data_version == self.data_version:
+            return []
+        generation, _ = data_version
+        if self.data_version is not None and generation != self.data_version[0]:
+            self.reset()
+        self.data_version = data_version
+        if fetch_one("last_result_change", file_path=self.file_path)[0] < self.change_number:
+            self.reset()
+
+        changed_events = []
+        for category, event, change_number in fetch_all(
+            "result_changes_since", (self.change_number,), self.file_path
+        ):
+            winners = read_dataframe(
+                "board_winners_of_category_event", (category, event), self.file_path
+            )
+            self.winners.pop((category, event), None)
+            if not winners.empty:
+                self.winners[(category, event)] = winners
+            self.change_number = change_number
+            changed_events.append((category, event))
+
+        self.standings = read_dataframe("house_standings", file_path=self.file_path)
+        return changed_events
+
+    def latest_results(self, category=None, limit=None) -> list:
+        """(category, event, winners) of the events judged last first, of one category if given"""
+        results = [
+            (event_category, event, winners)
+            for (event_category, event), winners in reversed(self.winners.items())
+            if category is None or event_category == category
+        ]
+        return results[:limit]
@@ -0,0 +1,253 @@
+"""
+Scoring of a judged event: totals, grades, dense ranks, prize labels and the
+consolation rule, computed over whole NumPy columns at once. Used by both the
+individual and the group judgement pages.
+"""
+from bisect import bisect_left, insort
+import numpy as np
+from pandas import DataFrame
+
+
+RANK_LABELS = np.array([None, "FIRST", "SECOND", "THIRD"], dtype=object)
+CONSOLATION = "CONSOLATION"
+
+
+def total_marks(dataframe: DataFrame, judge_labels: list):
+    """the sum of the judges' marks of each row, missing marks counting as zero"""
+    return dataframe[judge_labels].sum(axis=1)
+
+
+def assign_grades(totals: np.ndarray, grade_minmarks: dict) -> np.ndarray:
+    """
+    the grade of each total: the grade with the lowest minimum mark above the
+    total, or the grade with the highest minimum mark when no minimum mark is
+    above it. grade_minmarks must be ordered by ascending minimum marks.
+    """
+    if not grade_minmarks:
+        return np.full(len(totals), None, dtype=object)
+    grades = np.array(list(grade_minmarks.keys()), dtype=object)
+    min_marks = np.array(list(grade_minmarks.values()), dtype=float)
+    positions = np.searchsorted(min_marks, totals, side="right")
+    return grades[np.minimum(positions, len(grades) - 1)]
+
+
+def not_disqualified(disqualified: np.ndarray) -> np.ndarray:
+    """rows whose DISQUALIFIED value is false or 0; missing values count as disqualified"""
+    return np.asarray(disqualified == False, dtype=bool)  # noqa: E712
+
+
+def dense_ranks(totals: np.ndarray, eligible: np.ndarray) -> np.ndarray:
+    """dense rank of each eligible total, highest total first; 0 for rows that are not eligible"""
+    ranks = np.zeros(len(totals), dtype=np.int64)
+    distinct_totals = np.unique(totals[eligible])[::-1]
+    ranks[eligible] = np.searchsorted(-distinct_totals, -totals[eligible]) + 1
+    return ranks
+
+
+def rank_labels(ranks: np.ndarray) -> np.ndarray:
+    """FIRST, SECOND or THIRD for ranks 1 to 3, None for every other rank"""
+    return RANK_LABELS[np.where(ranks <= 3, ranks, 0)]
+
+
+def apply_consolation(
+    labels: np.ndarray,
+    totals: np.ndarray,
+    min_marks_for_prize,
+    consolation_allowed,
+) -> np.ndarray:
+    """
+    prize winners below the minimum marks for a prize get CONSOLATION when it is
+    allowed and no prize otherwise. consolation_allowed is a bool, or one per row.
+    """
+    below_minimum = totals < min_marks_for_prize
+    allowed = np.broadcast_to(np.asarray(consolation_allowed, dtype=bool), labels.shape)
+    labels = labels.copy()
+    labels[below_minimum & allowed & (labels != None)] = CONSOLATION  # noqa: E711
+    labels[below_minimum & ~allowed] = None
+    return labels
+
+
+def score_judgement(
+    dataframe: DataFrame,
+    judge_labels: list,
+    grade_minmarks: dict,
+    min_marks_for_prize,
+    consolation_allowed: bool,
+) -> DataFrame:
+    """a copy of the judgement sheet with TOTAL_MARKS, GRADE and RANK filled in"""
+    df = dataframe.copy()
+    df["TOTAL_MARKS"] = total_marks(df, judge_labels)
+    totals = df["TOTAL_MARKS"].to_numpy(dtype=float)
+    ranks = dense_ranks(totals, not_disqualified(df["DISQUALIFIED"].to_numpy()))
+
+    df["GRADE"] = assign_grades(totals, grade_minmarks)
+    df["RANK"] = apply_consolation(
+        rank_labels(ranks), totals, min_marks_for_prize, consolation_allowed
+    )
+    return df
+
+
+def score_judgements(
+    dataframe: DataFrame,
+    judge_labels: list,
+    grade_minmarks: dict,
+    min_marks_for_prize,
+    consolation_allowed,
+    by: list,
+) -> DataFrame:
+    """
+    score_judgement for many sheets at once: rows are ranked within their `by`
+    group (eg. CATEGORY and EVENT_NAME), everything else is computed in one pass.
+    """
+    df = dataframe.copy()
+    df["TOTAL_MARKS"] = total_marks(df, judge_labels)
+    totals = df["TOTAL_MARKS"].to_numpy(dtype=float)
+    eligible = not_disqualified(df["DISQUALIFIED"].to_numpy())
+    ranks = np.zeros(len(df), dtype=np.int64)
+    ranks[eligible] = (
+        df[eligible]
+        .groupby(by, sort=False)["TOTAL_MARKS"]
+        .rank(method="dense", ascending=False)
+        .to_numpy(dtype=np.int64)
+    )
+
+    df["GRADE"] = assign_grades(totals, grade_minmarks)
+    df["RANK"] = apply_consolation(
+        rank_labels(ranks), totals, min_marks_for_prize, consolation_allowed
+    )
+    return df
+
+
+class IncrementalScorer:
+    """
+    Keeps a scored judgement sheet across reruns and applies the `edited_rows`
+    delta of its st.data_editor to it. Only the rows whose edits changed since
+    the last update get a new total and grade. Dense ranks are maintained as the
+    sorted distinct totals of the eligible rows with the rows holding each total,
+    so an edit relabels the edited rows and, when the top three totals move, the
+    rows holding them, instead of re-ranking the whole event.
+    """
+
+    def __init__(
+        self,
+        dataframe: DataFrame,
+        judge_labels: list,
+        grade_minmarks: dict,
+        min_marks_for_prize,
+        consolation_allowed: bool,
+    ) -> None:
+        self.loaded = dataframe
+        self.judge_labels = list(judge_labels)
+        self.judge_locations = [dataframe.columns.get_loc(judge) for judge in judge_labels]
+        self.grade_minmarks = grade_minmarks
+        self.min_marks_for_prize = min_marks_for_prize
+        self.consolation_allowed = consolation_allowed
+        self.applied_edits: dict[int, dict] = {}
+
+        self.scored = score_judgement(
+            dataframe, judge_labels, grade_minmarks, min_marks_for_prize, consolation_allowed
+        ).reset_index(drop=True)
+        self.totals = self.scored["TOTAL_MARKS"].to_numpy(dtype=float).copy()
+        self.eligible = not_disqualified(self.scored["DISQUALIFIED"].to_numpy()).copy()
+        self.rows_of_total: dict[float, set[int]] = {}
+        for position in np.flatnonzero(self.eligible):
+            self.rows_of_total.setdefault(self.totals[position], set()).add(int(position))
+        self.distinct_totals = sorted(self.rows_of_total)
+
+    def update(
+        self, edited_rows: dict, min_marks_for_prize, consolation_allowed: bool
+    ) -> DataFrame:
+        """the scored sheet with `edited_rows` ({row position: {column: value}}) applied"""
+        edited_rows = {int(position): edits for position, edits in edited_rows.items()}
+        changed_rows = [
+            position
+            for position in set(edited_rows) | set(self.applied_edits)
+            if edited_rows.get(position) != self.applied_edits.get(position)
+        ]
+        top_totals = self.__top_totals()
+        for position in changed_rows:
+            self.__rescore_row(position, edited_rows.get(position, {}))
+        self.applied_edits = {position: dict(edits) for position, edits in edited_rows.items()}
+
+        if (min_marks_for_prize, consolation_allowed) != (
+            self.min_marks_for_prize,
+            self.consolation_allowed,
+        ):
+            self.min_marks_for_prize = min_marks_for_prize
+            self.consolation_allowed = consolation_allowed
+            self.scored["RANK"] = apply_consolation(
+                rank_labels(dense_ranks(self.totals, self.eligible)),
+                self.totals,
+                min_marks_for_prize,
+                consolation_allowed,
+            )
+            return self.scored
+
+        relabelled_rows = set(changed_rows)
+        if top_totals != self.__top_totals():
+            for total in set(top_totals) | set(self.__top_totals()):
+                relabelled_rows |= self.rows_of_total.get(total, set())
+        for position in relabelled_rows:
+            self.__set_cell(position, "RANK", self.__label_of(position))
+        return self.scored
+
+    def __top_totals(self) -> list:
+        return self.distinct_totals[:-4:-1]
+
+    def __label_of(self, position: int):
+        top_totals = self.__top_totals()
+        total = self.totals[position]
+        label = None
+        if self.eligible[position] and total in top_totals:
+            label = RANK_LABELS[top_totals.index(total) + 1]
+        if total < self.min_marks_for_prize:
+            return CONSOLATION if self.consolation_allowed and label else None
+        return label
+
+    def __rescore_row(self, position: int, edits: dict):
+        reverted = set(self.applied_edits.get(position, {})) - set(edits)
+        for column in reverted:
+            self.__set_cell(position, column, self.loaded[column].iat[position])
+        for column, value in edits.items():
+            self.__set_cell(position, column, value)
+
+        self.__forget_total(position)
+        marks = self.scored.iloc[position, self.judge_locations].to_numpy(dtype=float)
+        total = np.nansum(marks)
+        self.totals[position] = total
+        self.eligible[position] = self.scored["DISQUALIFIED"].iat[position] == False  # noqa: E712
+        self.__remember_total(position)
+
+        self.__set_cell(position, "TOTAL_MARKS", int(total) if total.is_integer() else total)
+        self.__set_cell(
+            position,
+            "GRADE",
+            assign_grades(np.array([total]), self.grade_minmarks)[0],
+        )
+
+    def __forget_total(self, position: int):
+        if not self.eligible[position]:
+            return
+        total = self.totals[position]
+        rows = self.rows_of_total[total]
+        rows.discard(position)
+        if not rows:
+            del self.rows_of_total[total]
+            del self.distinct_totals[bisect_left(self.distinct_totals, total)]
+
+    def __remember_total(self, position: int):
+        if not self.eligible[position]:
+            return
+        total = self.totals[position]
+        if total not in self.rows_of_total:
+            self.rows_of_total[total] = set()
+            insort(self.distinct_totals, total)
+        self.rows_of_total[total].add(position)
+
+    def __set_cell(self, position: int, column: str, value):
+        location = self.scored.columns.get_loc(column)
+        try:
+            self.scored.iat[position, location] = value
+        except (TypeError, ValueError):
+            self.scored[column] = self.scored[column].astype(object)
+            self.scored.iat[position, location] = value
@@ -1,6 +1,13 @@
 import os
 import sqlite3
-from backend.constants import DATABASE_DIRECTORY_PATH, DATABASE_EXTENSION
+import threading
+from backend.constants import (
+    DATABASE_DIRECTORY_PATH,
+    DATABASE_EXTENSION,
+    STATEMENT_CACHE_SIZE,
+)
+from backend.database_writer import stop_writer
+from backend.migrations import apply_migrations, forget_database, upgrade_database
 from backend.data_processing import (
     process_grade_marks,
     process_student_data_from,
@@ -12,31 +19,143 @@ from components.messages import show_error_message, show_general_message
 from components.navigation import go_to_home_page
 
 
+class ConnectionPool:
+    """
+    Keeps one sqlite3 connection per thread per database path and hands it out
+    again on every request from the same thread, instead of reconnecting for
+    each query. Connections belonging to threads that have finished are closed
+    lazily, and every connection to a path can be closed at once with
+    `invalidate` when that database is archived or deleted.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.connections: dict[str, dict[threading.Thread, sqlite3.Connection]] = {}
+
+    def get_connection(self, file_path: str) -> sqlite3.Connection:
+        thread = threading.current_thread()
+        with self.lock:
+            thread_connections = self.connections.setdefault(file_path, {})
+            connection = thread_connections.get(thread)
+            if connection is None:
+                self.__close_connections_of_finished_threads(thread_connections)
+                upgrade_database(file_path)
+                connection = sqlite3.connect(
+                    database=file_path,
+                    check_same_thread=False,
+                    cached_statements=STATEMENT_CACHE_SIZE,
+                )
+                thread_connections[thread] = connection
+        return connection
+
+    def invalidate(self, file_path: str):
+        with self.lock:
+            thread_connections = self.connections.pop(file_path, {})
+        for connection in thread_connections.values():
+            connection.close()
+
+    @staticmethod
+    def __close_connections_of_finished_threads(thread_connections: dict):
+        for thread in [thread for thread in thread_connections if not thread.is_alive()]:
+            thread_connections.pop(thread).close()
+
+
+class DataVersionMonitor:
+    """
+    Holds one idle connection per database that never writes, so its
+    `PRAGMA data_version` changes whenever any other connection, in this
+    process or another one, commits to the database. data_version starts
+    again on a new connection, so it is paired with a generation of the path
+    that goes up whenever the connection is invalidated, eg. when the database
+    is deleted, archived or recreated under the same name.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.connections: dict[str, sqlite3.Connection] = {}
+        self.generations: dict[str, int] = {}
+
+    def get_data_version(self, file_path: str) -> tuple[int, int]:
+        with self.lock:
+            connection = self.connections.get(file_path)
+            if connection is None:
+                upgrade_database(file_path)
+                connection = self.connections[file_path] = sqlite3.connect(
+                    database=file_path, check_same_thread=False
+                )
+            return (
+                self.generations.get(file_path, 0),
+                connection.execute("PRAGMA data_version").fetchone()[0],
+            )
+
+    def invalidate(self, file_path: str):
+        with self.lock:
+            connection = self.connections.pop(file_path, None)
+            self.generations[file_path] = self.generations.get(file_path, 0) + 1
+        if connection is not None:
+            connection.close()
+
+
+CONNECTION_POOL = ConnectionPool()
+DATA_VERSION_MONITOR = DataVersionMonitor()
+
+
+def get_connection(file_path=None) -> sqlite3.Connection:
+    return CONNECTION_POOL.get_connection(file_path or get_current_database_path())
+
+
+def get_data_version(file_path=None) -> tuple[int, int]:
+    """
+    (generation, data_version) of the database, which changes whenever it is changed
+    by a commit, or closed with close_connections and possibly replaced.
+    """
+    return DATA_VERSION_MONITOR.get_data_version(
+        file_path or get_current_database_path()
+    )
+
+
+def close_connections(file_path=None):
+    """close every pooled connection and the writer of the database, eg. before it is moved or removed."""
+    from backend.database_reader import QUERY_CACHE
+
+    file_path = file_path or get_current_database_path()
+    stop_writer(file_path)
+    CONNECTION_POOL.invalidate(file_path)
+    DATA_VERSION_MONITOR.invalidate(file_path)
+    QUERY_CACHE.forget(file_path)
+    forget_database(file_path)
+
+
 class SQliteConnectCursor:
-    def __init__(self, file_path=get_current_database_path()) -> None:
-        self.file_path = file_path
-        self.connection = sqlite3.connect(database=self.file_path)
+    def __init__(self, file_path=None) -> None:
+        self.file_path = file_path or get_current_database_path()
+        self.connection = get_connection(self.file_path)
 
     def __enter__(self):
-        cursor = self.connection.cursor()
-        return cursor
+        self.cursor = self.connection.cursor()
+        return self.cursor
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.connection.commit()
-        self.connection.close()
+        self.cursor.close()
+        if exc_type is None:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
 
 
 class SQliteConnectConnection:
-    def __init__(self, file_path=get_current_database_path()) -> None:
-        self.file_path = file_path
-        self.connection = sqlite3.connect(database=self.file_path)
+    def __init__(self, file_path=None) -> None:
+        self.file_path = file_path or get_current_database_path()
+        self.connection = get_connection(self.file_path)
 
     def __enter__(self):
         return self.connection
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.connection.commit()
-        self.connection.close()
+        if exc_type is None:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
 
 
 class DatabaseEngine:
@@ -74,175 +193,193 @@ class DatabaseEngine:
         self.max_number_of_events = max_number_of_events
         self.uploaded_csv = uploaded_csv
 
-        self.student_data = process_student_data_from(
+        self.student_ingestion_report = process_student_data_from(
             self.uploaded_csv, self.class_category_dict
         )
+        self.student_data = self.student_ingestion_report.student_data
         self.database_file_path = (
             DATABASE_DIRECTORY_PATH
             + f"{database_name}-{self.current_year}"
             + DATABASE_EXTENSION
         )
 
-    def create_database(self):
+    def create_database(self, go_to_home=True):
+        """
+        builds the whole database in a temporary file within one transaction and
+        renames it into place, so a failure never leaves a partial database behind.
+        """
+        temporary_file_path = self.database_file_path + ".tmp"
         try:
-            if os.path.exists(self.database_file_path):
-                os.remove(path=self.database_file_path)
-
-            
-            self.create_participant_table()
-            self.create_event_name_table()
-            self.create_parameter_table()
-            self.create_class_category_table()
-            self.create_grade_marks_table()
-            self.create_house_table()
-            self.create_student_table()
+            if os.path.exists(temporary_file_path):
+                os.remove(temporary_file_path)
+
+            connection = sqlite3.connect(
+                database=temporary_file_path, isolation_level=None
+            )
+            try:
+                cursor = connection.cursor()
+                # the temporary file is discarded on failure, so the load needs no journal
+                cursor.execute("PRAGMA journal_mode = OFF")
+                cursor.execute("PRAGMA synchronous = OFF")
+                cursor.execute("BEGIN")
+                self.create_participant_table(cursor)
+                self.create_event_name_table(cursor)
+                self.create_parameter_table(cursor)
+                self.create_class_category_table(cursor)
+                self.create_grade_marks_table(cursor)
+                self.create_house_table(cursor)
+                self.create_student_table(cursor)
+                apply_migrations(cursor)
+                cursor.execute("COMMIT")
+            finally:
+                connection.close()
+
+            with open(temporary_file_path, "r+b") as file:
+                os.fsync(file.fileno())
+            close_connections(self.database_file_path)
+            os.replace(temporary_file_path, self.database_file_path)
 
             show_general_message("Database Created Successfully!")
-            go_to_home_page()
+            if go_to_home:
+                go_to_home_page()
 
         except Exception as e:
+            if os.path.exists(temporary_file_path):
+                os.remove(temporary_file_path)
             show_error_message(e)
 
-    def create_student_table(self):
-        with SQliteConnectCursor(self.database_file_path) as cursor:
-            query1 = """
-            --sql
-            CREATE TABLE STUDENT(
-                ADMISSION_NUMBER TEXT PRIMARY KEY,
-                STUDENT_NAME TEXT,
-                CLASS TEXT,
-                DIVISION TEXT,
-                HOUSE TEXT,
-                CATEGORY TEXT
-            )
-            ;
-            """
-            query2 = """
-            --sql
-            INSERT INTO STUDENT VALUES (?,?,?,?,?,?)
-            ;
-            """
-            cursor.execute(query1)
-            student_data = list(set(self.student_data))
-            cursor.executemany(query2, student_data)
-
-    def create_participant_table(self):
-        with SQliteConnectCursor(self.database_file_path) as cursor:
-            query1 = f"""
-            --sql
-            CREATE TABLE PARTICIPANT(
-                ADMISSION_NUMBER TEXT,
-                EVENT_NAME TEXT ,
-                {', '.join([f'JUDGE{NUM+1} INT' for NUM in range(self.number_of_judges)])},
-                TOTAL_MARKS INT,
-                GRADE INT,
-                RANK TEXT,
-                DISQUALIFIED BOOLEAN DEFAULT 0,
-                REMARKS TEXT DEFAULT "",
-                PRIMARY KEY(ADMISSION_NUMBER, EVENT_NAME)
-            )
-            ;
-            """
-            cursor.execute(query1)
-
-    def create_event_name_table(self):
-        with SQliteConnectCursor(self.database_file_path) as cursor:
-            query1 = """
-            --sql
-            CREATE TABLE EVENT_NAME (EVENT_NAME TEXT)
-            ;
-            """
-            query2 = """
-            --sql
-            INSERT INTO EVENT_NAME VALUES (?)
-            ;
-            """
-            cursor.execute(query1)
-            cursor.executemany(query2, self.available_events)
+    def create_student_table(self, cursor):
+        query1 = """
+        --sql
+        CREATE TABLE STUDENT(
+            ADMISSION_NUMBER TEXT PRIMARY KEY,
+            STUDENT_NAME TEXT,
+            CLASS TEXT,
+            DIVISION TEXT,
+            HOUSE TEXT,
+            CATEGORY TEXT
+        )
+        ;
+        """
+        query2 = """
+        --sql
+        INSERT INTO STUDENT VALUES (?,?,?,?,?,?)
+        ;
+        """
+        cursor.execute(query1)
+        cursor.executemany(query2, self.student_data)
+
+    def create_participant_table(self, cursor):
+        query1 = f"""
+        --sql
+        CREATE TABLE PARTICIPANT(
+            ADMISSION_NUMBER TEXT,
+            EVENT_NAME TEXT ,
+            {', '.join([f'JUDGE{NUM+1} INT' for NUM in range(self.number_of_judges)])},
+            TOTAL_MARKS INT,
+            GRADE INT,
+            RANK TEXT,
+            DISQUALIFIED BOOLEAN DEFAULT 0,
+            REMARKS TEXT DEFAULT "",
+            PRIMARY KEY(ADMISSION_NUMBER, EVENT_NAME)
+        )
+        ;
+        """
+        cursor.execute(query1)
+
+    def create_event_name_table(self, cursor):
+        query1 = """
+        --sql
+        CREATE TABLE EVENT_NAME (EVENT_NAME TEXT)
+        ;
+        """
+        query2 = """
+        --sql
+        INSERT INTO EVENT_NAME VALUES (?)
+        ;
+        """
+        cursor.execute(query1)
+        cursor.executemany(query2, self.available_events)
     
 
 
-    def create_parameter_table(self):
-        with SQliteConnectCursor(self.database_file_path) as cursor:
-            query1 = """
-            --sql
-            CREATE TABLE PARAMETER (
-                DATABASENAME TEXT, 
-                NUMBER_OF_JUDGES INT, 
-                MAX_MARKS_FOR_EACH_JUDGE INT, 
-                MIN_MARKS_FOR_PRIZE INT, 
-                TOTAL_MARKS,
-                RESULTS_READY BOOLEAN,
-                MAXIMUM_EVENTS_FOR_PARTICIPATION INT
-            )
-            ;
-            """
-            query2 = """
-            --sql
-            INSERT INTO PARAMETER VALUES (?, ?, ?, ?, ?, ?, ?)
-            ;
-            """
-            cursor.execute(query1)
-            cursor.execute(
-                query2,
-                (
-                    f"{self.database_name}-{self.current_year}.eventpro.db",
-                    self.number_of_judges,
-                    self.max_marks_for_each_judge,
-                    self.min_marks_for_prize,
-                    self.max_marks_for_each_judge * self.number_of_judges,
-                    False,
-                    self.max_number_of_events,
-                ),
-            )
+    def create_parameter_table(self, cursor):
+        query1 = """
+        --sql
+        CREATE TABLE PARAMETER (
+            DATABASENAME TEXT, 
+            NUMBER_OF_JUDGES INT, 
+            MAX_MARKS_FOR_EACH_JUDGE INT, 
+            MIN_MARKS_FOR_PRIZE INT, 
+            TOTAL_MARKS,
+            RESULTS_READY BOOLEAN,
+            MAXIMUM_EVENTS_FOR_PARTICIPATION INT
+        )
+        ;
+        """
+        query2 = """
+        --sql
+        INSERT INTO PARAMETER VALUES (?, ?, ?, ?, ?, ?, ?)
+        ;
+        """
+        cursor.execute(query1)
+        cursor.execute(
+            query2,
+            (
+                f"{self.database_name}-{self.current_year}.eventpro.db",
+                self.number_of_judges,
+                self.max_marks_for_each_judge,
+                self.min_marks_for_prize,
+                self.max_marks_for_each_judge * self.number_of_judges,
+                False,
+                self.max_number_of_events,
+            ),
+        )
 
-    def create_class_category_table(self):
-        with SQliteConnectCursor(self.database_file_path) as cursor:
-            query1 = """
-            --sql
-            CREATE TABLE CLASS_CATEGORY (
-                CLASS TEXT,
-                CATEGORY TEXT
-            )
-            ;
-            """
-            query2 = """
-            --sql
-            INSERT INTO CLASS_CATEGORY VALUES (?, ?)
-            ;
-            """
-            cursor.execute(query1)
-            cursor.executemany(query2, list(self.class_category_dict.items()))
-
-    def create_grade_marks_table(self):
-        with SQliteConnectCursor(self.database_file_path) as cursor:
-            query1 = """
-            --sql
-            CREATE TABLE GRADE_MARKS(
-                GRADE TEXT,
-                MIN_MARKS INT
-            )
-            ;
-            """
-            query2 = """
-            --sql
-            INSERT INTO GRADE_MARKS VALUES (?, ?)
-            ;
-            """
-            cursor.execute(query1)
-            cursor.executemany(query2, list(self.grades_min_marks.items()))
-
-    def create_house_table(self):
-        with SQliteConnectCursor(self.database_file_path) as cursor:
-            query1 = """
-            --sql
-            CREATE TABLE HOUSE(HOUSE TEXT)
-            ;
-            """
-            query2 = """
-            --sql
-            INSERT INTO HOUSE VALUES (?)
-            ;
-            """
-            cursor.execute(query1)
-            cursor.executemany(query2, get_houses())
+    def create_class_category_table(self, cursor):
+        query1 = """
+        --sql
+        CREATE TABLE CLASS_CATEGORY (
+            CLASS TEXT,
+            CATEGORY TEXT
+        )
+        ;
+        """
+        query2 = """
+        --sql
+        INSERT INTO CLASS_CATEGORY VALUES (?, ?)
+        ;
+        """
+        cursor.execute(query1)
+        cursor.executemany(query2, list(self.class_category_dict.items()))
+
+    def create_grade_marks_table(self, cursor):
+        query1 = """
+        --sql
+        CREATE TABLE GRADE_MARKS(
+            GRADE TEXT,
+            MIN_MARKS INT
+        )
+        ;
+        """
+        query2 = """
+        --sql
+        INSERT INTO GRADE_MARKS VALUES (?, ?)
+        ;
+        """
+        cursor.execute(query1)
+        cursor.executemany(query2, list(self.grades_min_marks.items()))
+
+    def create_house_table(self, cursor):
+        query1 = """
+        --sql
+        CREATE TABLE HOUSE(HOUSE TEXT)
+        ;
+        """
+        query2 = """
+        --sql
+        INSERT INTO HOUSE VALUES (?)
+        ;
+        """
+        cursor.execute(query1)
+        cursor.executemany(query2, get_houses())
@@ -1,8 +1,9 @@
 from time import sleep
-from pandas import DataFrame
+from pandas import DataFrame, isna
 import streamlit as st
-from backend.file_operations import get_current_database_path
-from backend.sqlite_connections import SQliteConnectCursor
+from backend.database_writer import submit_write
+from backend.queries import execute, execute_many, read_cursor_dataframe
+from backend.scoring import CONSOLATION, score_judgement
 from components.messages import show_success_message
 
 
@@ -18,106 +19,273 @@ def submit_student_details_to_participant_table(
     if events_selected != []:
         pass
 
-    def submit():
-        with SQliteConnectCursor(get_current_database_path()) as cursor:
-            query = """
-            --sql
-            DELETE FROM PARTICIPANT WHERE ADMISSION_NUMBER = ?
-            ;
-            """
-            cursor.execute(query, (admission_number,))
-
-        with SQliteConnectCursor(get_current_database_path()) as cursor:
-            query = """
-            --sql
-            UPDATE STUDENT 
-            SET HOUSE = ?
-            WHERE ADMISSION_NUMBER = ?
-            ;
-            """
-            cursor.execute(query, (house_selected, admission_number))
-            st.toast("House : " + str(house_selected), icon="✨")
-
-            for event in events_selected:
-                query = """
-                --sql
-                INSERT INTO PARTICIPANT (ADMISSION_NUMBER, EVENT_NAME)
-                VALUES (?, ?)
-                ;
-                """
-                cursor.execute(query, (admission_number, event))
-                st.toast(
-                    "Participant has been registered for " + event,
-                    icon="➡️",
-                )
+    def submit(cursor):
+        execute(cursor, "delete_participations_of_student", (admission_number,))
+        execute(cursor, "update_student_house", (house_selected, admission_number))
+        execute_many(
+            cursor,
+            "insert_participation",
+            [(admission_number, event) for event in events_selected],
+        )
 
     with event_column:
         with st.spinner("Updating Database..."):
-            submit()
+            submit_write(submit).result()
 
+        st.toast("House : " + str(house_selected), icon="✨")
+        for event in events_selected:
+            st.toast(
+                "Participant has been registered for " + event,
+                icon="➡️",
+            )
         st.toast(
             "The student details has been submitted to the database successfully",
             icon="✅",
         )
 
 
-def push_judgement_to_participant_table(df: DataFrame, JUDGELABELS, EVENT_NAME):
-    data = df.to_dict(orient="records")
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        UPDATE PARTICIPANT
-        SET TOTAL_MARKS = ?,
-        GRADE = ?,
-        RANK = ?,
-        DISQUALIFIED = ?,
-        REMARKS = ?
-
-        WHERE ADMISSION_NUMBER = ?
-        AND EVENT_NAME = ?
-        ;
-        """
-
-        for rec in data:
-            cursor.execute(
-                query,
-                (
-                    rec["TOTAL_MARKS"],
-                    rec["GRADE"],
-                    rec["RANK"],
-                    rec["DISQUALIFIED"],
-                    rec["REMARKS"],
-                    rec["ADMISSION_NUMBER"],
-                    EVENT_NAME,
-                ),
+JUDGEMENT_RESULT_COLUMNS = ["GRADE", "RANK", "DISQUALIFIED", "REMARKS"]
+
+
+def get_changed_cells(df: DataFrame, loaded_df: DataFrame, columns) -> DataFrame:
+    """
+    a boolean frame shaped like df[columns] marking the cells that differ from the
+    row with the same ADMISSION_NUMBER in loaded_df; rows missing from loaded_df are all marked.
+    """
+    loaded = (
+        loaded_df.drop_duplicates("ADMISSION_NUMBER")
+        .set_index("ADMISSION_NUMBER")
+        .reindex(df["ADMISSION_NUMBER"])
+    )
+    new_rows = ~df["ADMISSION_NUMBER"].isin(loaded_df["ADMISSION_NUMBER"]).to_numpy()
+    changed = DataFrame(index=df.index)
+    for column in columns:
+        if column not in loaded.columns:
+            changed[column] = True
+            continue
+        edited_values = df[column].astype(object).to_numpy()
+        loaded_values = loaded[column].astype(object).to_numpy()
+        both_missing = isna(edited_values) & isna(loaded_values)
+        changed[column] = new_rows | ~((edited_values == loaded_values) | both_missing)
+    return changed
+
+
+def to_sql_value(value):
+    if isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def push_judgement_to_participant_table(
+    df: DataFrame, JUDGELABELS, EVENT_NAME, loaded_df: DataFrame | None = None
+) -> int:
+    """
+    writes the cells that differ from loaded_df (every cell when it is not given):
+    changed judge marks go to their own JUDGE_MARK rows and changed results to
+    PARTICIPANT_ENTRY, in one transaction. returns the number of rows that changed.
+    """
+    judge_labels = list(JUDGELABELS)
+    columns = judge_labels + JUDGEMENT_RESULT_COLUMNS
+    if loaded_df is None:
+        changed = DataFrame(True, index=df.index, columns=columns)
+    else:
+        changed = get_changed_cells(df, loaded_df, columns)
+
+    marks, removed_marks = [], []
+    for judge in judge_labels:
+        judge_id = int(judge.removeprefix("JUDGE"))
+        rows = df[changed[judge]]
+        for admission_number, mark in zip(rows["ADMISSION_NUMBER"], rows[judge]):
+            if isna(mark):
+                removed_marks.append((admission_number, EVENT_NAME, judge_id))
+            else:
+                marks.append(
+                    (admission_number, EVENT_NAME, judge_id, to_sql_value(mark))
+                )
+
+    results = [
+        tuple(to_sql_value(rec[column]) for column in JUDGEMENT_RESULT_COLUMNS)
+        + (rec["ADMISSION_NUMBER"], EVENT_NAME)
+        for rec in df[changed[JUDGEMENT_RESULT_COLUMNS].any(axis=1)].to_dict(
+            orient="records"
+        )
+    ]
+
+    def push(cursor):
+        execute_many(cursor, "upsert_judge_mark", marks)
+        execute_many(cursor, "delete_judge_mark", removed_marks)
+        execute_many(cursor, "update_participant_result", results)
+
+    changed_rows = int(changed.any(axis=1).sum())
+    if changed_rows:
+        submit_write(push).result()
+    st.toast(f"{changed_rows} changed rows have been updated at the server", icon="✅")
+    return changed_rows
+
+
+def push_group_judgement(df: DataFrame, JUDGELABELS, category, EVENT_NAME) -> int:
+    """
+    stores the marks and results of each house of a group event once, in GROUP_MARK
+    and GROUP_JUDGEMENT, then copies them to every participant of the house with
+    one set-based statement each, in one transaction. returns the number of
+    participant results that changed.
+    """
+    group_marks = [
+        (
+            category,
+            EVENT_NAME,
+            house,
+            int(judge.removeprefix("JUDGE")),
+            to_sql_value(mark),
+        )
+        for judge in JUDGELABELS
+        for house, mark in zip(df["HOUSE"], df[judge])
+        if not isna(mark)
+    ]
+    group_results = [
+        (category, EVENT_NAME, rec["HOUSE"])
+        + tuple(to_sql_value(rec[column]) for column in JUDGEMENT_RESULT_COLUMNS)
+        for rec in df.to_dict(orient="records")
+    ]
+
+    def push(cursor):
+        execute_many(cursor, "upsert_group_mark", group_marks)
+        execute_many(cursor, "upsert_group_judgement", group_results)
+        execute(cursor, "propagate_group_marks", (category, EVENT_NAME))
+        execute(cursor, "propagate_group_judgement", (category, EVENT_NAME))
+        return cursor.rowcount
+
+    changed_rows = submit_write(push).result()
+    st.toast(
+        f"The judgement of {len(df)} houses has been updated for all their participants",
+        icon="✅",
+    )
+    return changed_rows
+
+
+def rescore_completed_event(cursor, category, EVENT_NAME) -> bool:
+    """
+    once every judge has marked every participant of the event in the category,
+    recomputes their grades and ranks inside the caller's write. consolation is
+    kept for events that already awarded it. returns whether the event was rescored.
+    """
+    number_of_judges, _, min_marks_for_prize = execute(
+        cursor, "judging_parameters"
+    ).fetchone()
+    judge_labels = [f"JUDGE{number}" for number in range(1, number_of_judges + 1)]
+    sheet = read_cursor_dataframe(
+        cursor,
+        "judgement_sheet_of_category_event",
+        (category, EVENT_NAME),
+        judge_columns=", ".join(judge_labels),
+    )
+    if sheet.empty or sheet[judge_labels].isna().to_numpy().any():
+        return False
+
+    grade_minmarks = dict(execute(cursor, "grade_marks_ascending").fetchall())
+    scored = score_judgement(
+        sheet,
+        judge_labels,
+        grade_minmarks,
+        min_marks_for_prize,
+        consolation_allowed=bool((sheet["RANK"] == CONSOLATION).any()),
+    )
+    changed = get_changed_cells(scored, sheet, ["GRADE", "RANK"]).any(axis=1)
+    execute_many(
+        cursor,
+        "update_participant_grade_rank",
+        [
+            (
+                to_sql_value(rec["GRADE"]),
+                to_sql_value(rec["RANK"]),
+                rec["ADMISSION_NUMBER"],
+                EVENT_NAME,
             )
-            for judge in JUDGELABELS:
-                Q2 = f"""
-                --sql
-                UPDATE PARTICIPANT SET {judge} = ? WHERE ADMISSION_NUMBER = ? AND EVENT_NAME = ?
-                ;
-                """
-                cursor.execute(Q2, (rec[judge], rec["ADMISSION_NUMBER"], EVENT_NAME))
-        st.toast("The data has been updated at the server", icon="✅")
+            for rec in scored[changed].to_dict(orient="records")
+        ],
+    )
+    return True
+
+
+def recompute_results(cursor) -> int:
+    """
+    recomputes the grade and rank of every participant of every judged event
+    (graded before, or marked by every judge) from the current GRADE_MARKS and
+    MIN_MARKS_FOR_PRIZE, inside the caller's write, and copies them to the group
+    judgements. consolation is kept for events that already awarded it. returns
+    the number of participants whose grade or rank changed.
+    """
+    execute(cursor, "recompute_participant_results")
+    # rowcount is -1 for an UPDATE that starts with WITH
+    changed_rows = execute(cursor, "changed_rows").fetchone()[0]
+    execute(cursor, "refresh_group_judgement_results")
+    return changed_rows
+
+
+def submit_judge_marks(
+    df: DataFrame, loaded_df: DataFrame, judge_id: int, category, EVENT_NAME
+) -> DataFrame:
+    """
+    merges one judge's edited MARKS column into JUDGE_MARK. a mark is saved when its
+    row's VERSION is still the loaded one, or when the judge's mark in the database
+    still equals the loaded mark (only other judges touched the row); otherwise it
+    is a conflict and is returned instead of overwriting the newer mark. the event
+    is rescored in the same write once all judges' marks are present.
+    """
+    changed = get_changed_cells(df, loaded_df, ["MARKS"])["MARKS"]
+    edits = [
+        (rec["ADMISSION_NUMBER"], rec["STUDENT_NAME"], to_sql_value(rec["MARKS"]))
+        for rec in df[changed].to_dict(orient="records")
+    ]
+    loaded = {
+        rec["ADMISSION_NUMBER"]: (to_sql_value(rec["MARKS"]), rec["VERSION"])
+        for rec in loaded_df.to_dict(orient="records")
+    }
+
+    def merge(cursor):
+        current = {
+            row[0]: (row[4], row[5])
+            for row in execute(
+                cursor,
+                "judge_sheet_of_category_event",
+                (judge_id, category, EVENT_NAME),
+            ).fetchall()
+        }
+        marks, removed_marks, conflicts = [], [], []
+        for admission_number, name, mark in edits:
+            loaded_mark, loaded_version = loaded.get(admission_number, (None, None))
+            current_mark, current_version = current.get(admission_number, (None, None))
+            if current_version is None or (
+                current_version != loaded_version and current_mark != loaded_mark
+            ):
+                conflicts.append((admission_number, name, mark, current_mark))
+            elif mark is None:
+                removed_marks.append((admission_number, EVENT_NAME, judge_id))
+            else:
+                marks.append((admission_number, EVENT_NAME, judge_id, mark))
+
+        execute_many(cursor, "upsert_judge_mark", marks)
+        execute_many(cursor, "delete_judge_mark", removed_marks)
+        rescored = bool(marks or removed_marks) and rescore_completed_event(
+            cursor, category, EVENT_NAME
+        )
+        return len(marks) + len(removed_marks), conflicts, rescored
+
+    saved, conflicts, rescored = submit_write(merge).result()
+    st.toast(f"{saved} marks of Judge {judge_id} have been saved", icon="✅")
+    if rescored:
+        st.toast("All judges have marked the event, results recomputed", icon="🏆")
+    return DataFrame(
+        conflicts,
+        columns=["ADMISSION_NUMBER", "STUDENT_NAME", "YOUR_MARKS", "CURRENT_MARKS"],
+    )
 
 
 def update_student_details_to_student_table(
     admission_number, name, class_, division, house, category
 ):
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        UPDATE STUDENT
-        SET STUDENT_NAME = ?,
-        CLASS = ?,
-        DIVISION = ?,
-        HOUSE = ?,
-        CATEGORY = ?
-        WHERE ADMISSION_NUMBER = ?
-        ;
-        """
-        data = (name, class_, division, house, category, admission_number)
-        cursor.execute(query, data)
+    data = (name, class_, division, house, category, admission_number)
+    submit_write(lambda cursor: execute(cursor, "update_student", data)).result()
     show_success_message("Successfully updated!...", icon="✅")
     sleep(2)
     st.rerun()
@@ -5,6 +5,7 @@ from streamlit import session_state
 def get_authenticated_pages_database_present():
     USERTYPE = session_state["user_info"]["user_type"]
     ADMIN = "admin"
+    JUDGE = "judge"
     USER = "user"
 
     with st.sidebar:
@@ -45,6 +46,24 @@ def get_authenticated_pages_database_present():
                     use_container_width=True,
                 )
 
+                st.page_link(
+                    label="Judge Marks Entry",
+                    page="./pages/judge-marks-entry.py",
+                    icon="🧑‍⚖️",
+                    disabled=USERTYPE not in (ADMIN, JUDGE),
+                    help="Judges enter their own marks from their own devices.",
+                    use_container_width=True,
+                )
+
+                st.page_link(
+                    label="Import Judgement Sheets",
+                    page="./pages/import-judgement-sheets.py",
+                    icon="📥",
+                    disabled=USERTYPE != ADMIN,
+                    help="Import marks from judgement sheets filled in offline.",
+                    use_container_width=True,
+                )
+
                 st.page_link(
                     label="Group Judgement",
                     page="./pages/group-judge-events.py",
@@ -63,6 +82,23 @@ def get_authenticated_pages_database_present():
                     use_container_width=True,
                 )
 
+                st.page_link(
+                    label="Live Results Board",
+                    page="./pages/live-results-board.py",
+                    icon="📺",
+                    help="Show the latest results and house standings on a screen.",
+                    use_container_width=True,
+                )
+
+                st.page_link(
+                    label="Jobs",
+                    page="./pages/jobs.py",
+                    icon="⏳",
+                    disabled=USERTYPE != ADMIN,
+                    help="Queue report and certificate generation and follow its progress.",
+                    use_container_width=True,
+                )
+
                 st.page_link(
                     label="Manage Users",
                     page="./pages/manage-users.py",
@@ -79,7 +115,7 @@ def get_authenticated_pages_database_present():
                     label="Current Database",
                     page="./pages/current-database-specifications.py",
                     icon="🚀",
-                    disabled=USERTYPE == USER,
+                    disabled=USERTYPE in (USER, JUDGE),
                     help="Shows the current database specifications.",
                     use_container_width=True,
                 )
@@ -88,7 +124,7 @@ def get_authenticated_pages_database_present():
                     label="View & Edit Tables",
                     page="./pages/edit-database-tables.py",
                     icon="📝",
-                    disabled=USERTYPE == USER,
+                    disabled=USERTYPE in (USER, JUDGE),
                     help="View the participants entered in the database & edit student details",
                     use_container_width=True,
                 )
@@ -97,7 +133,7 @@ def get_authenticated_pages_database_present():
                     label="View Previous Databases",
                     page="./pages/view-previous-databases.py",
                     icon="👈",
-                    disabled=USERTYPE == USER,
+                    disabled=USERTYPE in (USER, JUDGE),
                     help="View results and namelist from previous databases.",
                     use_container_width=True,
                 )
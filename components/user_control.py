@@ -41,6 +41,7 @@ class Authenticator:
             "username": username,
             "name": self.usersdata[username]["name"],
             "user_type": self.usersdata[username]["user_type"],
+            "judge_id": self.usersdata[username].get("judge_id"),
             "handle": "@" + username,
             "avatar": "🛡️"
             if self.usersdata[username]["user_type"] == "admin"
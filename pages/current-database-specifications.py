@@ -4,8 +4,10 @@ from backend.database_reader import (
     DatabaseFetch,
     DatabaseFetchDataframe,
     ParameterUpdator,
+    get_cache_stats,
 )
 from backend.file_operations import get_current_database_name
+from backend.queries import get_query_stats
 from components.navigation import show_go_back_to_home_in_sidebar
 from components.page_configuration_component import page_configuration
 
@@ -49,6 +51,25 @@ def show_database_updates():
                 value=participants_number,
                 delta=participants_number,
             )
+    cache_stats = get_cache_stats()
+    st.caption(
+        f"Lookup cache : {cache_stats['hits']} hits, {cache_stats['misses']} misses"
+    )
+    st.subheader("House Standings", divider=True)
+    st.dataframe(
+        df_fetch.get_house_standings_df(),
+        column_config={
+            "HOUSE": "House",
+            "POINTS": "Points",
+            "FIRSTS": "Firsts",
+            "SECONDS": "Seconds",
+            "THIRDS": "Thirds",
+        },
+        use_container_width=True,
+        hide_index=True,
+    )
+    with st.expander("Query timings"):
+        st.dataframe(get_query_stats(), use_container_width=True, hide_index=True)
 
 
 def show_parameter_info():
@@ -133,12 +154,19 @@ def edit_section():
     params = fetch.get_database_specs()
     total_marks = params[0] * params[1]
     grades = df_fetch.get_grade_marks_df()
+    standing_points = df_fetch.get_standing_points_df()
     available_events = DataFrame({"EVENT_NAME": fetch.get_events()})
 
     with st.container(border=True):
         st.subheader("Edit Parameters Section", divider=True)
-        events_tab, grade_tab, parameter_tab = st.tabs(
-            ["Edit Events", "Edit Grades", "Edit Other Parameters"]
+        events_tab, grade_tab, points_tab, parameter_tab, recompute_tab = st.tabs(
+            [
+                "Edit Events",
+                "Edit Grades",
+                "Edit House Points",
+                "Edit Other Parameters",
+                "Recompute Results",
+            ]
         )
         with events_tab:
             edit_events_df: DataFrame = st.data_editor(
@@ -177,6 +205,27 @@ def edit_section():
             if not edited_grades_df.equals(grades):
                 if st.button("Update Grades"):
                     push_parameters.update_grades_min_marks(edited_grades_df)
+        with points_tab:
+            edited_points_df: DataFrame = st.data_editor(
+                data=standing_points,
+                column_config={
+                    "KIND": st.column_config.SelectboxColumn(
+                        label="Awarded for", options=["RANK", "GRADE"], required=True
+                    ),
+                    "VALUE": st.column_config.TextColumn(
+                        label="Rank / Grade", required=True
+                    ),
+                    "POINTS": st.column_config.NumberColumn(
+                        label="House Points", required=True, min_value=0, step=1
+                    ),
+                },
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,
+            )
+            if not edited_points_df.equals(standing_points):
+                if st.button("Update House Points"):
+                    push_parameters.update_standing_points(edited_points_df)
         with parameter_tab:
             max_marks_for_each_judge = st.number_input(
                 label="Maximum marks that can be awarded by a single judge",
@@ -185,7 +234,13 @@ def edit_section():
                 step=1,
                 value=params[0],
             )
-            number_of_judges = params[1]
+            number_of_judges = st.number_input(
+                label="Number of judges for each event",
+                min_value=1,
+                max_value=10,
+                step=1,
+                value=params[1],
+            )
 
             total_marks = number_of_judges * max_marks_for_each_judge  # type:ignore
             st.info("Total marks :" + str(total_marks), icon="✅")
@@ -210,6 +265,7 @@ def edit_section():
                     max_no_of_events != params[3],
                     min_marks_for_prize != params[2],
                     max_marks_for_each_judge != params[0],
+                    number_of_judges != params[1],
                 )
             ):
                 if st.button("Update Parameters"):
@@ -218,7 +274,17 @@ def edit_section():
                         total_marks=total_marks,
                         min_marks_for_prize=min_marks_for_prize,
                         max_no_of_events=max_no_of_events,
+                        number_of_judges=number_of_judges,
                     )
+        with recompute_tab:
+            st.info(
+                "Recomputes the grade and rank of every judged event from the current "
+                "grades and minimum marks for a prize. Changing them recomputes the "
+                "results as well.",
+                icon="ℹ️",
+            )
+            if st.button("Recompute All Results"):
+                push_parameters.recompute_results()
 
 
 fetch = DatabaseFetch()
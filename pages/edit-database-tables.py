@@ -1,10 +1,7 @@
 import streamlit as st
 from streamlit import session_state
-from backend.database_reader import (
-    DatabaseFetch,
-    DatabaseFetchDataframe,
-    SQliteConnectCursor,
-)
+from backend.database_reader import DatabaseFetch, DatabaseFetchDataframe
+from backend.queries import fetch_all, fetch_one
 from backend.submit_functions import update_student_details_to_student_table
 from components.navigation import show_go_back_to_home_in_sidebar
 from components.page_configuration_component import page_configuration
@@ -37,7 +34,7 @@ def main() -> None:
         )
 
     # student-database-edit
-    if USER_TYPE != "user":
+    if USER_TYPE not in ("user", "judge"):
         show_student_editor()
 
 
@@ -102,27 +99,11 @@ def show_student_editor():
 
 
 def get_name_class_division_house_from_admission_number(admission_number):
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        SELECT STUDENT_NAME, CLASS, DIVISION, HOUSE FROM STUDENT
-        WHERE ADMISSION_NUMBER = ?
-        ;
-        """
-        cursor.execute(query, (admission_number,))
-        return cursor.fetchone()
+    return fetch_one("student_details", (admission_number,))
 
 
 def get_class_category_dict_from_database():
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        SELECT CLASS, CATEGORY
-        FROM CLASS_CATEGORY
-        ;
-        """
-        cursor.execute(query)
-        return dict(cursor.fetchall())
+    return dict(fetch_all("class_category"))
 
 
 USER_TYPE = session_state.user_info["user_type"]
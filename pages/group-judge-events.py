@@ -10,11 +10,13 @@ this is just an easier way to mark events where multiple participants can partic
 """
 import streamlit as st
 from streamlit import session_state
-from pandas import DataFrame, read_sql
+from pandas import DataFrame
 from backend.database_reader import DatabaseFetch
 from backend.file_operations import get_current_database_path
-from backend.sqlite_connections import SQliteConnectConnection, SQliteConnectCursor
-from backend.submit_functions import push_judgement_to_participant_table
+from backend.judgement_journal import JudgementJournal
+from backend.queries import fetch_all, fetch_column, fetch_one, read_dataframe
+from backend.scoring import score_judgement
+from backend.submit_functions import push_group_judgement
 from components.navigation import show_go_back_to_home_in_sidebar
 from components.page_configuration_component import page_configuration
 
@@ -25,43 +27,19 @@ def get_group_events_from_category(category):
     """
     fetches the group events from the database based on the category selected.
     """
-    with SQliteConnectCursor() as cursor:
-        query = f"""
-        --sql
-        SELECT DISTINCT EVENT_NAME 
-            FROM PARTICIPANT,STUDENT
-            WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-            AND STUDENT.CATEGORY = ?
-            ;
-        """
-        cursor.execute(query, (category,))
-        data = [row[0] for row in cursor.fetchall()]
-    return data
-
-def submit_group_judgement(processed_dataframe: DataFrame, judge_labels: list, event_name: str):
+    return fetch_column("events_of_category", (category,))
+
+def submit_group_judgement(processed_dataframe: DataFrame, category, event_name: str):
     """
-    Submit group judgement by updating individual participant records.
-    Each participant in a house gets the same marks as their house.
+    stores the house judgement and copies it to every participant of each house.
     """
     try:
-        # Get individual student data from session state
-        individual_data = st.session_state.get('original_individual_data')
-        if individual_data is None:
-            st.error("Error: Individual participant data not found. Please refresh and try again.")
-            return
-        
-        # Merge house judgement data with individual participant data
-        final_data = individual_data.merge(
-            processed_dataframe[["HOUSE"] + judge_labels + ["TOTAL_MARKS", "GRADE", "RANK", "DISQUALIFIED", "REMARKS"]], 
-            on="HOUSE", 
-            how="left"
-        )
-        
-        # Submit to participant table using the existing function
-        push_judgement_to_participant_table(final_data, judge_labels, event_name)
-        
+        push_group_judgement(processed_dataframe, JUDGELABELS, category, event_name)
+        return True
+
     except Exception as e:
         st.error(f"Error submitting group judgement: {str(e)}")
+        return False
 
 
 def main() -> None:
@@ -96,7 +74,7 @@ def main() -> None:
             )
     
     
-    st.session_state.original_df = fetch_data(category_selected, event_selected)
+    load_event(category_selected, event_selected)
     if event_selected is not None:
         
         with table_container:
@@ -110,15 +88,24 @@ def main() -> None:
             """
 
             edited_df = st.data_editor(
-                data=st.session_state.original_df,
+                data=st.session_state.group_editor_df,
                 num_rows="fixed",
-                key="edited_df",
+                key=session_state.group_editor_key,
                 use_container_width=True,
                 hide_index=True,
                 disabled=DISABLED_COLUMNS_JUDGEMENT_TABLE,
                 column_config=column_info,
                 height=TABLE_MAX_HEIGHT,
             )
+            session_state.group_judgement_journal.record(
+                session_state[session_state.group_editor_key]["edited_rows"]
+            )
+            if session_state.group_judgement_journal.error:
+                st.warning(
+                    "Your edits could not be autosaved, they will be lost if this page "
+                    f"is reloaded before submitting: {session_state.group_judgement_journal.error}",
+                    icon="⚠️",
+                )
 
         with final_sheet_view_container:
             st.subheader(
@@ -135,7 +122,7 @@ def main() -> None:
                 key="min_marks_for_prize",
             )
 
-            processed_dataframe = process_dataframe(edited_df, st.session_state.get('original_individual_data', st.session_state.original_df))
+            processed_dataframe = process_dataframe(edited_df)
             st.dataframe(
                 processed_dataframe,
                 hide_index=True,
@@ -148,22 +135,16 @@ def main() -> None:
                 type="primary",  # type:ignore
             )
 
-            if submit_judgement:
-                submit_group_judgement(processed_dataframe, JUDGELABELS, event_selected)
+            if submit_judgement and submit_group_judgement(
+                processed_dataframe, category_selected, event_selected
+            ):
+                session_state.group_judgement_journal.clear()
+                session_state.pop("group_judgement_key", None)
 
 def display_table(category_selected, event_selected):
-    with SQliteConnectCursor() as cursor:
-        query = f"""
-        --sql
-        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, TOTAL_MARKS, GRADE, RANK, DISQUALIFIED, REMARKS
-        FROM STUDENT, PARTICIPANT 
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        AND CATEGORY = '{category_selected}'
-        AND EVENT_NAME = '{event_selected}'
-        ;
-        """
-        data = read_sql(query, cursor.connection)
-    return data
+    return read_dataframe(
+        "results_of_category_event", (category_selected, event_selected)
+    )
 
 
 def get_column_info():
@@ -211,171 +192,68 @@ def get_column_info():
 
 
 def get_grades_minmarks():
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        SELECT GRADE, MIN_MARKS FROM GRADE_MARKS ORDER BY MIN_MARKS ASC
-        ;
-        """
-        cursor.execute(query)
-        data = dict(cursor.fetchall())
-    return data
-
-
-def process_dataframe(dataframe: DataFrame, original_df: DataFrame):
+    return dict(fetch_all("grade_marks_ascending"))
+
+
+def process_dataframe(dataframe: DataFrame):
     """
     processes the dataframe to calculate total marks, grade, and rank for each group.
     it adds the marks given by each judge, calculates the total marks,
-    assigns a grade based on the total marks, and ranks the groups based on their total marks
-    assigns mark to all the individuals in the group.
+    assigns a grade based on the total marks, and ranks the groups based on their total marks.
     It also handles disqualification and consolation prizes.
-    add name, id, cl from orginal_df to dataframe on the basis of house column
+    the house results are copied to the individuals of each house at the server on submit.
     """
-    dataframe = dataframe.copy()
-    columns_to_add = JUDGELABELS
-    df = dataframe
-
-    # calculate total marks of all students
-    df["TOTAL_MARKS"] = df[columns_to_add].sum(axis=1)
-
-    # grade all students based on their total-marks
-    df["GRADE"] = df["TOTAL_MARKS"].apply(assign_grade)
-
-    # rank un-disqualified students on the basis of their total-marks
-    df["RANK"] = df[df["DISQUALIFIED"] == False]["TOTAL_MARKS"].rank(
-        method="dense", ascending=False
+    return score_judgement(
+        dataframe,
+        JUDGELABELS,
+        GRADE_MINMARKS,
+        session_state.min_marks_for_prize,
+        session_state.consolation_allowed,
     )
-    df["RANK"] = df["RANK"].fillna(-1)
-
-    # beautify and turn the decimal rank denoted by .rank() method to an appropriate string
-    df["RANK"] = df[["RANK", "DISQUALIFIED"]].apply(assign_rank, axis=1)  # type: ignore
 
-    df["RANK"] = df[["RANK", "TOTAL_MARKS"]].apply(
-        evaluate_consolation, axis=1  # type: ignore
-    )
 
-    # sort students on the basis of total-marks in descending order
-    df.sort_values(by="TOTAL_MARKS", ascending=False, inplace=False)
-
-    # add admn_no, name, class and division column and assign marks as per the individuals house
-    # Merge with individual data to show all participants with their house's marks
-    if hasattr(st.session_state, 'original_individual_data') and st.session_state.original_individual_data is not None:
-        individual_data = st.session_state.original_individual_data
-        df = individual_data.merge(
-            df[["HOUSE"] + JUDGELABELS + ["TOTAL_MARKS", "GRADE", "RANK", "DISQUALIFIED", "REMARKS"]], 
-            on="HOUSE", 
-            how="left"
+def load_event(category, event):
+    """
+    fetches the event only when another event is selected or after a submit, and
+    replays the marks journaled for it before a reload or a lost session.
+    """
+    group_judgement_key = (CURRENT_DATABASE_PATH, category, event)
+    if session_state.get("group_judgement_key") != group_judgement_key:
+        session_state.group_judgement_key = group_judgement_key
+        st.session_state.original_df = fetch_data(category, event)
+        session_state.group_judgement_journal = JudgementJournal(
+            CURRENT_DATABASE_PATH, category, event, key_column="HOUSE"
         )
-    else:
-        # Fallback: merge with original_df if available
-        df = df.merge(original_df[["ADMISSION_NUMBER", "STUDENT_NAME", "CLASS", "DIVISION", "HOUSE"]], on="HOUSE", how="left")
-
-
-    return df
-
-
-def assign_grade(marks):
-    bigger_numbers = [n for n in GRADE_MINMARKS.values() if n > marks]
-    if bigger_numbers == []:
-        max_num = max(GRADE_MINMARKS.values())
-    else:
-        max_num = min(bigger_numbers)
-
-    for key, min_marks in GRADE_MINMARKS.items():
-        if min_marks == max_num:
-            grade = key
-            break
-
-    return grade
-
-
-def evaluate_consolation(x):
-    if (x["RANK"] is not None) and (
-        x["TOTAL_MARKS"] < session_state.min_marks_for_prize
-        and session_state.consolation_allowed
-    ):
-        return "CONSOLATION"  # consolation RANK IF RANK IS 1,2,3 BUT LESS THAN MIN_MARKS_FOR_PRIZE
-    elif x["TOTAL_MARKS"] < session_state.min_marks_for_prize:
-        return None
-    else:
-        return x["RANK"]  # NONE OR FIRST, SECOND OR THIRD
-
-
-def assign_rank(x):
-    if x["DISQUALIFIED"] == False:
-        if x["RANK"] == 1.0:
-            return "FIRST"
-        elif x["RANK"] == 2.0:
-            return "SECOND"
-        elif x["RANK"] == 3.0:
-            return "THIRD"
-        else:
-            return None
-    else:
-        return None
+        session_state.group_editor_df = session_state.group_judgement_journal.replay(
+            st.session_state.original_df
+        )
+        session_state.group_judgement_loads = session_state.get("group_judgement_loads", 0) + 1
+        session_state.group_editor_key = f"group_edited_df_{session_state.group_judgement_loads}"
 
 
 def fetch_data(category, event):
     """
     Fetch group data for group events, aggregated by house.
-    For group events, we need house-level data, not individual student data.
+    For group events, we need house-level data, not individual student data:
+    the marks and results stored for each house, or zero marks for a house not yet judged.
     """
-    with SQliteConnectConnection() as conn:
-        # First get the original individual data for later merging
-        original_query = f"""
-        --sql
-        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE
-        FROM STUDENT, PARTICIPANT 
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        AND CATEGORY = '{category}' 
-        AND EVENT_NAME = '{event}'
-        ;
-        """
-        original_data = read_sql(original_query, conn)
-        
-        # Store original data in session state for later use
-        st.session_state.original_individual_data = original_data
-        
-        # Get unique houses with their judging data
-        house_query = f"""
-        --sql
-        SELECT DISTINCT HOUSE, {", ".join([f"0 as {judge}" for judge in JUDGELABELS])}, 
-               0 as DISQUALIFIED, '' as REMARKS
-        FROM STUDENT, PARTICIPANT 
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        AND CATEGORY = '{category}' 
-        AND EVENT_NAME = '{event}'
-        ;
-        """
-        house_data = read_sql(house_query, conn)
-    return house_data
+    return read_dataframe(
+        "group_judgement_sheet_of_category_event",
+        (category, event),
+        group_judge_columns=", ".join(
+            f"COALESCE(MAX(GROUP_MARK.MARKS) FILTER (WHERE GROUP_MARK.JUDGE_ID = {number}), 0) AS {judge}"
+            for number, judge in enumerate(JUDGELABELS, start=1)
+        ),
+    )
 
 
 @st.cache_data
 def get_class_category_from(database_path):
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        SELECT CLASS, CATEGORY FROM CLASS_CATEGORY
-        ;
-        """
-        cursor.execute(query)
-        data = dict(cursor.fetchall())
-    return data
+    return dict(fetch_all("class_category", file_path=database_path))
 
 
 def get_params_from_database():
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        SELECT  NUMBER_OF_JUDGES, MAX_MARKS_FOR_EACH_JUDGE ,MIN_MARKS_FOR_PRIZE
-        FROM PARAMETER
-        ;
-        """
-        cursor.execute(query)
-        TUP = cursor.fetchone()
-
-    return TUP
+    return fetch_one("judging_parameters")
 
 
 fetch = DatabaseFetch()
@@ -0,0 +1,85 @@
+"""
+imports the marks of judgement sheets filled in offline: many workbooks, or one
+workbook with a sheet per event, are read together and every event is written and
+rescored in one transaction.
+"""
+import streamlit as st
+from streamlit import session_state
+from backend.database_reader import DatabaseFetch
+from backend.file_operations import get_current_database_path
+from backend.judgement_import import import_judgement_marks, read_judgement_workbooks
+from components.navigation import show_go_back_to_home_in_sidebar
+from components.page_configuration_component import page_configuration
+
+
+page_configuration("📥", "Import Judgement Sheets")
+show_go_back_to_home_in_sidebar()
+
+UPLOAD_HELP = """Upload the judgement sheets exported from Reports or Results, with
+the JUDGE columns filled in. Each worksheet must be named after its event. Blank
+marks are left as they are in the database."""
+
+
+def main() -> None:
+    st.title("Import Judgement Sheets")
+    st.divider()
+
+    with st.container(border=True):
+        uploaded_files = st.file_uploader(
+            label="Upload Filled Judgement Sheets",
+            type="xlsx",
+            accept_multiple_files=True,
+            help=UPLOAD_HELP,
+            key=f"judgement_workbooks_{session_state.get('judgement_imports', 0)}",
+        )
+        if not uploaded_files:
+            return
+        report = read_uploaded_workbooks(uploaded_files)
+
+    with st.container(border=True):
+        st.subheader("📄 Sheets Read", divider=True)
+        st.dataframe(report.sheets_dataframe(), hide_index=True, use_container_width=True)
+        if report.errors:
+            st.warning(
+                f"{len(report.errors)} rows or sheets will be skipped.", icon="⚠️"
+            )
+            st.dataframe(report.errors_dataframe(), hide_index=True, use_container_width=True)
+
+        st.write(f"**➡️ {len(report.marks)} rows of marks are ready to import.**")
+        if st.button(
+            "Import Marks",
+            type="primary",  # type:ignore
+            disabled=report.marks.empty,
+        ):
+            marks_written, events_rescored = import_judgement_marks(
+                report, CURRENT_DATABASE_PATH
+            )
+            st.toast(f"{marks_written} marks imported.", icon="✅")
+            st.toast(f"{events_rescored} completed events ranked.", icon="🎯")
+            session_state.judgement_imports = session_state.get("judgement_imports", 0) + 1
+            session_state.pop("judgement_import_report", None)
+
+
+def read_uploaded_workbooks(uploaded_files):
+    """reads the workbooks once per upload instead of on every rerun"""
+    upload_key = (CURRENT_DATABASE_PATH, tuple(file.file_id for file in uploaded_files))
+    cached_key, report = session_state.get("judgement_import_report", (None, None))
+    if cached_key != upload_key:
+        NUMBER_OF_JUDGES, MAX_MARKS_FOR_EACH_JUDGE, *_ = fetch.get_parameters()
+        report = read_judgement_workbooks(
+            uploaded_files,
+            fetch.get_events(),
+            NUMBER_OF_JUDGES,
+            MAX_MARKS_FOR_EACH_JUDGE,
+            CURRENT_DATABASE_PATH,
+        )
+        session_state.judgement_import_report = (upload_key, report)
+    return report
+
+
+fetch = DatabaseFetch()
+CURRENT_DATABASE_PATH = get_current_database_path()
+
+
+if __name__ == "__main__":
+    main()
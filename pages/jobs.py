@@ -0,0 +1,143 @@
+"""
+queues report, result and certificate generation as background jobs and shows their
+progress. only the job list fragment reruns every few seconds, and it reads the
+in-memory state of the job runner, never the database or the job files.
+"""
+import os
+import streamlit as st
+from streamlit import session_state
+from backend.jobs import CANCELLED, DONE, FAILED, FINISHED, INTERRUPTED, JOB_RUNNER
+from backend.queries import fetch_column
+from backend.report_workers import get_output_formats
+from components.navigation import show_go_back_to_home_in_sidebar
+from components.page_configuration_component import page_configuration
+
+
+page_configuration("⏳", "Jobs")
+show_go_back_to_home_in_sidebar()
+
+USER_HANDLE = session_state.user_info["handle"]
+USERTYPE = session_state.user_info["user_type"]
+REFRESH_INTERVAL_SECONDS = 2
+ALL = "All"
+OUTPUT_FORMAT_HELP = (
+    "xlsx writes formatted workbooks. csv, csv.gz and parquet are much faster and "
+    "write a folder per workbook with a file per sheet."
+)
+STATUS_ICONS = {
+    DONE: "✅",
+    FAILED: "❌",
+    CANCELLED: "🚫",
+    INTERRUPTED: "⚠️",
+}
+
+
+def main() -> None:
+    st.title("⏳ Jobs")
+    st.divider()
+
+    if USERTYPE != "admin":
+        st.error("Only admins can queue jobs.")
+        return
+
+    with st.container(border=True):
+        show_queue_jobs()
+
+    with st.container(border=True):
+        show_jobs()
+
+
+def show_queue_jobs():
+    st.subheader("➕ Queue a Job", divider=True)
+    st.caption(
+        "Jobs run on the server, so they finish even if this page is closed. "
+        "Jobs writing the same files run one after another."
+    )
+    reports_tab, results_tab, certificates_tab = st.tabs(
+        ["Reports", "Results", "Certificates"]
+    )
+
+    with reports_tab:
+        category_based_report_needed = st.toggle("Category based report", value=True)
+        judgement_sheets_needed = st.toggle("Judgement sheets", value=True)
+        prize_winners_report_needed = st.toggle("Prize winners sheets")
+        output_format = st.selectbox(
+            label="Format", options=get_output_formats(), help=OUTPUT_FORMAT_HELP
+        )
+        if st.button("Queue Reports", type="primary"):
+            queue(
+                "reports",
+                "Reports",
+                category_based_report_needed=category_based_report_needed,
+                judgement_sheets_needed=judgement_sheets_needed,
+                prize_winners_report_needed=prize_winners_report_needed,
+                output_format=output_format,
+            )
+
+    with results_tab:
+        gen_all_certificates = st.toggle("Also create all certificates")
+        if st.button("Queue Results", type="primary"):
+            queue("results", "Results", gen_all_certificates=gen_all_certificates)
+
+    with certificates_tab:
+        category = st.selectbox(
+            label="Category", options=[ALL] + fetch_column("judged_categories")
+        )
+        events = [] if category == ALL else fetch_column(
+            "judged_events_of_category", (category,)
+        )
+        event = st.selectbox(label="Event", options=[ALL] + events)
+        if st.button("Queue Certificates", type="primary"):
+            queue(
+                "certificates",
+                " - ".join(["Certificates"] + [item for item in (category, event) if item != ALL]),
+                category=None if category == ALL else category,
+                event=None if event == ALL else event,
+            )
+
+
+def queue(kind: str, title: str, **parameters):
+    job = JOB_RUNNER.submit(kind, title, USER_HANDLE, **parameters)
+    st.toast(f"Queued {job.title}", icon="⏳")
+
+
+@st.fragment(run_every=REFRESH_INTERVAL_SECONDS)
+def show_jobs():
+    st.subheader("📋 Jobs", divider=True)
+    jobs = JOB_RUNNER.list_jobs()
+    if not jobs:
+        st.info("No jobs have been queued yet.", icon="⏳")
+    for job in jobs:
+        with st.container(border=True):
+            title_column, button_column = st.columns([4, 1])
+            with title_column:
+                st.write(
+                    f"**{STATUS_ICONS.get(job.status, '⏳')} {job.title}** · "
+                    f"{job.status} · by {job.submitted_by} at {job.submitted_at}"
+                    + f" · {os.path.basename(job.parameters.get('database_path', ''))}"
+                )
+            with button_column:
+                if job.status not in FINISHED and st.button(
+                    "Cancel",
+                    key=f"cancel_{job.id}",
+                    disabled=job.cancel_requested,
+                    use_container_width=True,
+                ):
+                    JOB_RUNNER.cancel(job.id)
+                    st.rerun(scope="fragment")
+            if job.status not in FINISHED or job.total:
+                st.progress(
+                    1.0 if job.status == DONE else job.fraction,
+                    text=f"{job.done} of {job.total} · {job.step}" if job.total else job.step,
+                )
+            if job.error:
+                with st.expander("Error"):
+                    st.code(job.error)
+
+    if any(job.status in FINISHED for job in jobs) and st.button("Clear finished jobs"):
+        JOB_RUNNER.clear_finished()
+        st.rerun(scope="fragment")
+
+
+if __name__ == "__main__":
+    main()
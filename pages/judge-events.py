@@ -1,9 +1,11 @@
 import streamlit as st
 from streamlit import session_state
-from pandas import DataFrame, read_sql
+from pandas import DataFrame
 from backend.database_reader import DatabaseFetch
 from backend.file_operations import get_current_database_path
-from backend.sqlite_connections import SQliteConnectConnection, SQliteConnectCursor
+from backend.judgement_journal import JudgementJournal
+from backend.queries import fetch_all, fetch_one, read_dataframe
+from backend.scoring import IncrementalScorer
 from backend.submit_functions import push_judgement_to_participant_table
 from components.navigation import show_go_back_to_home_in_sidebar
 from components.page_configuration_component import page_configuration
@@ -34,7 +36,7 @@ def main() -> None:
         event_selected = st.selectbox(
             label="Select the Event", options=EVENTS, index=0, key="judgement_event"
         )
-    st.session_state.orginal_df = fetch_data(category_selected, event_selected)
+    load_event(category_selected, event_selected)
     if event_selected is not None:
         with table_container:
             st.subheader(
@@ -42,16 +44,25 @@ def main() -> None:
                 divider=True,
             )
 
-            edited_df = st.data_editor(
-                data=st.session_state.orginal_df,
+            st.data_editor(
+                data=st.session_state.editor_df,
                 num_rows="fixed",
-                key="edited_df",
+                key=session_state.editor_key,
                 use_container_width=True,
                 hide_index=True,
                 disabled=DISABLED_COLUMNS_JUDGEMENT_TABLE,
                 column_config=column_info,
                 height=TABLE_MAX_HEIGHT,
             )
+            session_state.judgement_journal.record(
+                session_state[session_state.editor_key]["edited_rows"]
+            )
+            if session_state.judgement_journal.error:
+                st.warning(
+                    "Your edits could not be autosaved, they will be lost if this page "
+                    f"is reloaded before submitting: {session_state.judgement_journal.error}",
+                    icon="⚠️",
+                )
 
         with final_sheet_view_container:
             st.subheader(
@@ -68,7 +79,7 @@ def main() -> None:
                 key="min_marks_for_prize",
             )
 
-            processed_dataframe = process_dataframe(edited_df)
+            processed_dataframe = process_dataframe()
             st.dataframe(
                 processed_dataframe,
                 hide_index=True,
@@ -82,7 +93,14 @@ def main() -> None:
             )
 
             if submit_judgement:
-                push_judgement_to_participant_table(processed_dataframe, JUDGELABELS, event_selected)
+                push_judgement_to_participant_table(
+                    processed_dataframe,
+                    JUDGELABELS,
+                    event_selected,
+                    loaded_df=st.session_state.orginal_df,
+                )
+                session_state.judgement_journal.clear()
+                st.session_state.pop("judgement_key", None)
 
 
 def get_column_info():
@@ -121,127 +139,62 @@ def get_column_info():
 
 
 def get_grades_minmarks():
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        SELECT GRADE, MIN_MARKS FROM GRADE_MARKS ORDER BY MIN_MARKS ASC
-        ;
-        """
-        cursor.execute(query)
-        data = dict(cursor.fetchall())
-    return data
-
-
-def process_dataframe(dataframe: DataFrame):
-    dataframe = dataframe.copy()
-    columns_to_add = JUDGELABELS
-    df = dataframe
-
-    # calculate total marks of all students
-    df["TOTAL_MARKS"] = df[columns_to_add].sum(axis=1)
-
-    # grade all students based on their total-marks
-    df["GRADE"] = df["TOTAL_MARKS"].apply(assign_grade)
-
-    # rank un-disqualified students on the basis of their total-marks
-    df["RANK"] = df[df["DISQUALIFIED"] == False]["TOTAL_MARKS"].rank(
-        method="dense", ascending=False
-    )
-    df["RANK"] = df["RANK"].fillna(-1)
-
-    # beautify and turn the decimal rank denoted by .rank() method to an appropriate string
-    df["RANK"] = df[["RANK", "DISQUALIFIED"]].apply(assign_rank, axis=1)  # type: ignore
-
-    df["RANK"] = df[["RANK", "TOTAL_MARKS"]].apply(
-        evaluate_consolation, axis=1  # type: ignore
+    return dict(fetch_all("grade_marks_ascending"))
+
+
+def load_event(category, event):
+    """
+    fetches the event only when another event is selected or after a submit, so
+    the editor keeps its data and the scorer its state across the reruns of typing.
+    edits journaled before a reload or a lost session are replayed onto the sheet.
+    """
+    judgement_key = (CURRENT_DATABASE_PATH, category, event)
+    if session_state.get("judgement_key") != judgement_key:
+        session_state.judgement_key = judgement_key
+        session_state.orginal_df = fetch_data(category, event)
+        session_state.judgement_journal = JudgementJournal(
+            CURRENT_DATABASE_PATH, category, event, key_column="ADMISSION_NUMBER"
+        )
+        session_state.editor_df = session_state.judgement_journal.replay(
+            session_state.orginal_df
+        )
+        session_state.judgement_loads = session_state.get("judgement_loads", 0) + 1
+        session_state.editor_key = f"edited_df_{session_state.judgement_loads}"
+        session_state.pop("judgement_scorer", None)
+
+
+def process_dataframe() -> DataFrame:
+    """rescores only the rows the judges edited since the last rerun"""
+    if "judgement_scorer" not in session_state:
+        session_state.judgement_scorer = IncrementalScorer(
+            session_state.editor_df,
+            JUDGELABELS,
+            GRADE_MINMARKS,
+            session_state.min_marks_for_prize,
+            session_state.consolation_allowed,
+        )
+    return session_state.judgement_scorer.update(
+        session_state[session_state.editor_key]["edited_rows"],
+        session_state.min_marks_for_prize,
+        session_state.consolation_allowed,
     )
 
-    # sort students on the basis of total-marks in descending order
-    df.sort_values(by="TOTAL_MARKS", ascending=False, inplace=False)
-    return df
-
-
-def assign_grade(marks):
-    bigger_numbers = [n for n in GRADE_MINMARKS.values() if n > marks]
-    if bigger_numbers == []:
-        max_num = max(GRADE_MINMARKS.values())
-    else:
-        max_num = min(bigger_numbers)
-
-    for key, min_marks in GRADE_MINMARKS.items():
-        if min_marks == max_num:
-            grade = key
-            break
-
-    return grade
-
-
-def evaluate_consolation(x):
-    if (x["RANK"] is not None) and (
-        x["TOTAL_MARKS"] < session_state.min_marks_for_prize
-        and session_state.consolation_allowed
-    ):
-        return "CONSOLATION"  # consolation RANK IF RANK IS 1,2,3 BUT LESS THAN MIN_MARKS_FOR_PRIZE
-    elif x["TOTAL_MARKS"] < session_state.min_marks_for_prize:
-        return None
-    else:
-        return x["RANK"]  # NONE OR FIRST, SECOND OR THIRD
-
-
-def assign_rank(x):
-    if x["DISQUALIFIED"] == False:
-        if x["RANK"] == 1.0:
-            return "FIRST"
-        elif x["RANK"] == 2.0:
-            return "SECOND"
-        elif x["RANK"] == 3.0:
-            return "THIRD"
-        else:
-            return None
-    else:
-        return None
-
 
 def fetch_data(category, event):
-    with SQliteConnectConnection() as conn:
-        query = f"""
-        --sql
-        SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, {", ".join(JUDGELABELS)}, DISQUALIFIED, REMARKS
-        FROM STUDENT, PARTICIPANT 
-        WHERE STUDENT.ADMISSION_NUMBER = PARTICIPANT.ADMISSION_NUMBER
-        AND CATEGORY = '{category}' 
-        AND EVENT_NAME = '{event}'
-        ;
-        """
-        data = read_sql(query, conn)
-    return data
+    return read_dataframe(
+        "judgement_sheet_of_category_event",
+        (category, event),
+        judge_columns=", ".join(JUDGELABELS),
+    )
 
 
 @st.cache_data
 def get_class_category_from(database_path):
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        SELECT CLASS, CATEGORY FROM CLASS_CATEGORY
-        ;
-        """
-        cursor.execute(query)
-        data = dict(cursor.fetchall())
-    return data
+    return dict(fetch_all("class_category", file_path=database_path))
 
 
 def get_params_from_database():
-    with SQliteConnectCursor() as cursor:
-        query = """
-        --sql
-        SELECT  NUMBER_OF_JUDGES, MAX_MARKS_FOR_EACH_JUDGE ,MIN_MARKS_FOR_PRIZE
-        FROM PARAMETER
-        ;
-        """
-        cursor.execute(query)
-        TUP = cursor.fetchone()
-
-    return TUP
+    return fetch_one("judging_parameters")
 
 
 fetch = DatabaseFetch()
@@ -257,7 +210,14 @@ CATEGORIES.sort()
 JUDGELABELS = [f"JUDGE{number}" for number in range(1, NUMBER_OF_JUDGES + 1)]
 
 TABLE_MAX_HEIGHT = None
-DISABLED_COLUMNS_JUDGEMENT_TABLE = ["ADMISSION_NUMBER", "STUDENT_NAME", "CLASS"]
+DISABLED_COLUMNS_JUDGEMENT_TABLE = [
+    "ADMISSION_NUMBER",
+    "STUDENT_NAME",
+    "CLASS",
+    "TOTAL_MARKS",
+    "GRADE",
+    "RANK",
+]
 GRADE_MINMARKS = get_grades_minmarks()
 
 
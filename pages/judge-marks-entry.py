@@ -0,0 +1,141 @@
+"""
+a judgement page where every judge enters only their own marks from their own device.
+judges signed in with a judge number mark their own column; admins choose the judge.
+saves are merged at the server, so judges marking the same event at the same time
+never overwrite each other, and a mark changed elsewhere since it was loaded is
+reported as a conflict instead of being overwritten.
+"""
+import streamlit as st
+from streamlit import session_state
+from backend.database_reader import DatabaseFetch
+from backend.file_operations import get_current_database_path
+from backend.queries import read_dataframe
+from backend.submit_functions import submit_judge_marks
+from components.navigation import show_go_back_to_home_in_sidebar
+from components.page_configuration_component import page_configuration
+
+
+page_configuration("🧑‍⚖️", "Judge Marks Entry")
+show_go_back_to_home_in_sidebar()
+
+ADMIN = "admin"
+JUDGE = "judge"
+if session_state.user_info["user_type"] not in (ADMIN, JUDGE):
+    st.error("Only judges and admins can enter marks.", icon="🛡️")
+    st.stop()
+
+
+def main() -> None:
+    st.title("Judge Marks Entry")
+    st.divider()
+
+    with st.container(border=True):
+        judge_id = select_judge()
+        category_selected = st.selectbox(
+            label="Select the Category",
+            options=CATEGORIES,
+            index=0,
+            key="judge_marks_category",
+        )
+        EVENTS = fetch.get_events_from_category(category_selected)
+        event_selected = st.selectbox(
+            label="Select the Event", options=EVENTS, index=0, key="judge_marks_event"
+        )
+    if judge_id is None or event_selected is None:
+        return
+
+    load_judge_sheet(judge_id, category_selected, event_selected)
+    with st.container(border=True):
+        st.subheader(
+            f"✏️ Judge {judge_id} Marks for :blue[{str(category_selected).title()} - {event_selected}]",
+            divider=True,
+        )
+        edited_df = st.data_editor(
+            data=session_state.judge_marks_df,
+            num_rows="fixed",
+            key=f"judge_marks_editor_{session_state.judge_marks_loads}",
+            use_container_width=True,
+            hide_index=True,
+            disabled=["ADMISSION_NUMBER", "STUDENT_NAME", "CLASS", "DIVISION"],
+            column_order=["ADMISSION_NUMBER", "STUDENT_NAME", "CLASS", "DIVISION", "MARKS"],
+            column_config={
+                "ADMISSION_NUMBER": "Admission Number",
+                "STUDENT_NAME": "Name",
+                "CLASS": "Class",
+                "DIVISION": "Division",
+                "MARKS": st.column_config.NumberColumn(
+                    f"Judge {judge_id}",
+                    max_value=MAX_MARKS_FOR_ONE_JUDGE,
+                    min_value=0,
+                ),
+            },
+        )
+
+        if st.button("Save My Marks", type="primary"):  # type:ignore
+            conflicts = submit_judge_marks(
+                edited_df,
+                session_state.judge_marks_df,
+                judge_id,
+                category_selected,
+                event_selected,
+            )
+            session_state.judge_marks_conflicts = (
+                session_state.pop("judge_marks_key"),
+                conflicts,
+            )
+            st.rerun()
+
+    conflicts_key, conflicts = session_state.get("judge_marks_conflicts", (None, None))
+    if conflicts_key == session_state.judge_marks_key and not conflicts.empty:
+        st.warning(
+            "These marks were changed from another device after you loaded the sheet "
+            "and have not been saved. The sheet now shows the current marks; "
+            "enter yours again if they should replace them.",
+            icon="⚠️",
+        )
+        st.dataframe(conflicts, hide_index=True, use_container_width=True)
+
+
+def select_judge():
+    """the judge number of a judge user, or the one an admin picks"""
+    user_info = session_state.user_info
+    if user_info["user_type"] == ADMIN:
+        return st.selectbox(
+            label="Select the Judge",
+            options=range(1, NUMBER_OF_JUDGES + 1),
+            format_func=lambda number: f"Judge {number}",
+            key="judge_marks_judge",
+        )
+    judge_id = user_info.get("judge_id")
+    if judge_id is None or not 1 <= judge_id <= NUMBER_OF_JUDGES:
+        st.error(
+            "Your account has no judge number of this database. Ask an admin to set it in Manage Users.",
+            icon="🛡️",
+        )
+        return None
+    st.write(f"**➡️ Marking as Judge {judge_id}**")
+    return judge_id
+
+
+def load_judge_sheet(judge_id, category, event):
+    """
+    fetches the judge's column of the event only when the selection changes or after
+    a save; every load gets a fresh editor so edits are never replayed onto new marks.
+    """
+    judge_marks_key = (CURRENT_DATABASE_PATH, judge_id, category, event)
+    if session_state.get("judge_marks_key") != judge_marks_key:
+        session_state.judge_marks_key = judge_marks_key
+        session_state.judge_marks_loads = session_state.get("judge_marks_loads", 0) + 1
+        session_state.judge_marks_df = read_dataframe(
+            "judge_sheet_of_category_event", (judge_id, category, event)
+        )
+
+
+fetch = DatabaseFetch()
+CURRENT_DATABASE_PATH = get_current_database_path()
+CATEGORIES = sorted(fetch.get_categories())
+NUMBER_OF_JUDGES, MAX_MARKS_FOR_ONE_JUDGE, *_ = fetch.get_parameters()
+
+
+if __name__ == "__main__":
+    main()
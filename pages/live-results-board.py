@@ -0,0 +1,110 @@
+"""
+a results board for projector screens. only the board fragment reruns every few
+seconds, and it reads the database only when the database changed since its last
+poll, and then only the events whose results changed, so many screens can stay open.
+"""
+import streamlit as st
+from streamlit import session_state
+from backend.file_operations import get_current_database_path
+from backend.results_board import ResultsBoard
+from backend.queries import fetch_column
+from components.navigation import show_go_back_to_home_in_sidebar
+from components.page_configuration_component import page_configuration
+
+
+page_configuration("📺", "Live Results Board")
+show_go_back_to_home_in_sidebar()
+
+REFRESH_INTERVAL_SECONDS = 5
+RANK_MEDALS = {"FIRST": "🥇", "SECOND": "🥈", "THIRD": "🥉", "CONSOLATION": "🎗️"}
+ALL_CATEGORIES = "All Categories"
+
+
+def main() -> None:
+    st.title("📺 Live Results")
+    st.divider()
+
+    options_column, _ = st.columns([1, 2])
+    with options_column:
+        category = st.selectbox(
+            label="Category",
+            options=[ALL_CATEGORIES] + fetch_column("categories"),
+            key="board_category",
+        )
+        number_of_events = st.number_input(
+            label="Latest events shown",
+            min_value=1,
+            max_value=30,
+            value=6,
+            key="board_number_of_events",
+        )
+    show_board(None if category == ALL_CATEGORIES else category, number_of_events)
+
+
+def get_board() -> ResultsBoard:
+    if session_state.get("results_board") is None or (
+        session_state.results_board.file_path != CURRENT_DATABASE_PATH
+    ):
+        session_state.results_board = ResultsBoard(CURRENT_DATABASE_PATH)
+    return session_state.results_board
+
+
+@st.fragment(run_every=REFRESH_INTERVAL_SECONDS)
+def show_board(category, number_of_events):
+    board = get_board()
+    board.refresh()
+
+    standings_column, results_column = st.columns([1, 2])
+    with standings_column:
+        with st.container(border=True):
+            st.subheader("🏆 House Standings", divider=True)
+            st.dataframe(
+                board.standings,
+                column_config={
+                    "HOUSE": "House",
+                    "POINTS": "Points",
+                    "FIRSTS": "🥇",
+                    "SECONDS": "🥈",
+                    "THIRDS": "🥉",
+                },
+                hide_index=True,
+                use_container_width=True,
+            )
+
+    with results_column:
+        latest_results = board.latest_results(category, number_of_events)
+        if not latest_results:
+            st.info("No results have been published yet.", icon="⏳")
+        for event_category, event, winners in latest_results:
+            with st.container(border=True):
+                st.subheader(
+                    f"{event} - :blue[{str(event_category).title()}]", divider=True
+                )
+                st.dataframe(
+                    winners.assign(RANK=winners["RANK"].map(RANK_MEDALS)),
+                    column_config={
+                        "RANK": "Prize",
+                        "STUDENT_NAME": "Name",
+                        "CLASS": "Class",
+                        "DIVISION": "Division",
+                        "HOUSE": "House",
+                        "GRADE": "Grade",
+                    },
+                    column_order=[
+                        "RANK",
+                        "STUDENT_NAME",
+                        "CLASS",
+                        "DIVISION",
+                        "HOUSE",
+                        "GRADE",
+                    ],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+
+
+CURRENT_DATABASE_PATH = get_current_database_path()
+
+
+if __name__ == "__main__":
+    main()
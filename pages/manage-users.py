@@ -10,7 +10,7 @@ show_go_back_to_home_in_sidebar()
 
 USERNAME = session_state.user_info["username"]
 USERTYPE = session_state.user_info["user_type"]
-USERTYPES = ["admin", "elevated-user", "user"]
+USERTYPES = ["admin", "elevated-user", "judge", "user"]
 
 
 def main() -> None:
@@ -32,6 +32,12 @@ def main() -> None:
             "user_type": column_config.SelectboxColumn(
                 label="User Type", required=True, options=USERTYPES
             ),
+            "judge_id": column_config.NumberColumn(
+                label="Judge Number",
+                help="The judge column a judge user marks, eg. 2 for Judge 2.",
+                min_value=1,
+                step=1,
+            ),
         }
         with st.container():
             updated_user_data_dataframe = st.data_editor(
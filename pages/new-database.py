@@ -172,7 +172,17 @@ def main() -> None:
             edited_class_category_dataframe=edited_class_category_dataframe,
             uploaded_csv=uploaded_csv,
         )
-        engine.create_database()
+        skipped_rows = engine.student_ingestion_report.errors
+        if skipped_rows:
+            st.warning(
+                f"{len(skipped_rows)} rows of the student data were skipped.", icon="⚠️"
+            )
+            st.dataframe(
+                engine.student_ingestion_report.errors_dataframe(),
+                use_container_width=True,
+                hide_index=True,
+            )
+        engine.create_database(go_to_home=not skipped_rows)
 
 
 EVENTS = get_parameters()["events"]
@@ -1,6 +1,10 @@
 import streamlit as st
-from backend.documents_generator import ReportGenerator
-from backend.file_operations import get_current_database_path
+from streamlit import session_state
+from backend.constants import DATABASE_EXTENSION
+from backend.jobs import JOB_RUNNER
+from backend.report_export import export_all_reports
+from backend.report_workers import get_output_formats
+from backend.file_operations import get_current_database_name, get_current_database_path
 from components.navigation import show_go_back_to_home_in_sidebar
 from components.page_configuration_component import page_configuration
 from backend.database_reader import DatabaseFetch, DatabaseFetchDataframe
@@ -16,6 +20,7 @@ def main() -> None:
 
     view_table_container = st.container(border=True)
     options_container = st.container(border=True)
+    export_container = st.container(border=True)
 
     with view_table_container:
         show_table_with_particular_event_and_category()
@@ -23,6 +28,9 @@ def main() -> None:
     with options_container:
         show_report_generation_content()
 
+    with export_container:
+        show_export_content()
+
 
 def show_table_with_particular_event_and_category():
     category = st.selectbox(label="Choose the Category", options=CATEGORIES)
@@ -45,20 +53,51 @@ def show_report_generation_content():
         label="Judgement sheet required", disabled=disabled_condition
     )
 
+    output_format = st.selectbox(
+        label="Format",
+        options=get_output_formats(),
+        help="csv, csv.gz and parquet write a folder per workbook with a file per sheet.",
+    )
+
     st.image("./assets/report-structure.png", width=500)
 
     submit_and_create_reports = st.button(label="Create Reports", type="primary")
     if submit_and_create_reports:
-        with st.spinner(
-            "*Reports are being generated... Do not press any key... Please Wait*"
-        ):
-            disabled_condition = True
-            report_generator = ReportGenerator(
-                category_based_report_needed, judgement_sheet_needed
+        JOB_RUNNER.submit(
+            "reports",
+            "Reports",
+            session_state.user_info["handle"],
+            category_based_report_needed=category_based_report_needed,
+            judgement_sheets_needed=judgement_sheet_needed,
+            prize_winners_report_needed=False,
+            output_format=output_format,
+        )
+        st.toast("Reports queued", icon="⏳")
+        st.page_link("./pages/jobs.py", label="Follow the progress in Jobs", icon="⏳")
+
+
+def show_export_content():
+    st.subheader("📦 Export All", divider=True)
+    st.caption(
+        "Every report workbook, built from the current data, with the results and "
+        "certificates generated on the server, in one ZIP file."
+    )
+    if st.button("Prepare ZIP Export"):
+        progress_bar = st.progress(0.0)
+        session_state.reports_zip = export_all_reports(
+            on_progress=lambda added, total, path: progress_bar.progress(
+                added / total, text=f"{added} of {total} files added"
             )
-            report_generator.generate_reports()
-        st.toast("Reports generated successfully", icon="✅")
-        disabled_condition = False
+        )
+    if session_state.get("reports_zip") is not None:
+        st.download_button(
+            label="Download ZIP",
+            data=session_state.reports_zip,
+            file_name=str(get_current_database_name()).removesuffix(DATABASE_EXTENSION)
+            + " - reports.zip",
+            mime="application/zip",
+            type="primary",
+        )
 
 
 fetch = DatabaseFetch()
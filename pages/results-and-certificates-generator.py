@@ -1,8 +1,9 @@
 import streamlit as st
+from streamlit import session_state
 import os
 from backend.ResultsGenerator import CertificateGenerator
 from backend.database_reader import DatabaseFetch
-from backend.documents_generator import ReportGenerator
+from backend.jobs import JOB_RUNNER
 from components.messages import show_arrow_message, show_success_message
 from components.navigation import show_go_back_to_home_in_sidebar
 from components.page_configuration_component import page_configuration
@@ -59,18 +60,22 @@ def show_generate_reports():
     with st.container(border=True):
         st.subheader("🏅 Generate All Reports", divider=True)
         if st.button("Recreate all Reports"):
-            with st.spinner("Recreating Reports"):
-                rep_obj.generate_reports()
-                show_success_message("Recreated Reports")
+            queue_reports("Reports", category_based_report_needed=True, judgement_sheets_needed=True)
         if st.button("Create Winners Sheets"):
-            with st.spinner("Creating Winners Sheets..."):
-                rep_obj2 = ReportGenerator(
-                    category_based_report_needed=False,
-                    judgement_sheets_needed=False,
-                    prize_winners_report_needed=True
-                )
-                rep_obj2.generate_reports()
-            show_success_message("Winners Sheets Created Successfully")
+            queue_reports(
+                "Winners Sheets",
+                category_based_report_needed=False,
+                judgement_sheets_needed=False,
+                prize_winners_report_needed=True
+            )
+
+
+def queue_reports(title, **parameters):
+    parameters.setdefault("prize_winners_report_needed", False)
+    parameters.setdefault("output_format", "xlsx")
+    JOB_RUNNER.submit("reports", title, session_state.user_info["handle"], **parameters)
+    show_success_message(f"{title} queued")
+    st.page_link("./pages/jobs.py", label="Follow the progress in Jobs", icon="⏳")
 
 
 def create_manual_certificates():
@@ -165,6 +170,5 @@ def show_certificates():
 
 fetch = DatabaseFetch()
 cert_object =CertificateGenerator()
-rep_obj = ReportGenerator(category_based_report_needed = True, judgement_sheets_needed=True)
 if __name__ == "__main__":
     main()
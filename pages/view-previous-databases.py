@@ -1,8 +1,7 @@
 import streamlit as st
 import os
-from pandas import read_sql
 from backend.file_operations import get_current_database_path
-from backend.sqlite_connections import SQliteConnectConnection, SQliteConnectCursor
+from backend.queries import fetch_column, read_dataframe
 from components.navigation import show_go_back_to_home_in_sidebar
 from components.page_configuration_component import page_configuration
 from backend.constants import SAVED_DATABASES_DIRECTORY_PATH, DATABASE_EXTENSION
@@ -78,50 +77,21 @@ def main() -> None:
 
 
 def get_dataframes_from(databasepath: str):
-    with SQliteConnectConnection(databasepath) as conn:
-        student_dataframe = read_sql("SELECT * FROM STUDENT", conn)
-
-    return student_dataframe
+    return read_dataframe("all_students", file_path=databasepath)
 
 
 def get_categories_from(path):
-    with SQliteConnectCursor(path) as cursor:
-        cursor.execute(
-            """
-        --sql
-        SELECT DISTINCT CATEGORY FROM CLASS_CATEGORY
-        ;
-        """
-        )
-        return [a[0] for a in cursor.fetchall()]
+    return fetch_column("categories", file_path=path)
 
 
 def get_events_from(path):
-    with SQliteConnectCursor(path) as cursor:
-        cursor.execute(
-            """
-        --sql
-        SELECT DISTINCT EVENT_NAME FROM EVENT_NAME
-        ;
-        """
-        )
-        return [a[0] for a in cursor.fetchall()]
+    return fetch_column("distinct_events", file_path=path)
 
 
 def get_participant_df(category, event, selected_database_path):
-    query = """
-    --sql
-    SELECT STUDENT.ADMISSION_NUMBER, STUDENT_NAME, CLASS, DIVISION, HOUSE, TOTAL_MARKS, GRADE, RANK, DISQUALIFIED, REMARKS
-    FROM PARTICIPANT, STUDENT
-    WHERE PARTICIPANT.ADMISSION_NUMBER = STUDENT.ADMISSION_NUMBER
-    AND CATEGORY = ?
-    AND EVENT_NAME = ?
-    ORDER BY TOTAL_MARKS DESC
-    ;
-    """
-    with SQliteConnectConnection(selected_database_path) as conn:
-        dataframe = read_sql(query, conn, params=(category, event))
-    return dataframe
+    return read_dataframe(
+        "results_of_category_event", (category, event), selected_database_path
+    )
 
 
 if __name__ == "__main__":